@@ -8,6 +8,7 @@
 import json
 import logging
 import os
+import queue
 import random
 import shlex
 import shutil
@@ -30,6 +31,7 @@ from .db import (
 )
 from .rpc import (
     callrpc,
+    callrpc_batch,
 )
 from .util import (
     TemporaryError,
@@ -76,6 +78,9 @@ class BaseApp(DBMethods):
         self.coin_clients = {}
         self.coin_interfaces = {}
         self.mxDB = threading.RLock()
+        self._db_read_pool_size = self.settings.get("db_read_pool_size", 4)
+        self._db_read_pool = queue.LifoQueue()
+        self._mx_db_read_pool = threading.Lock()
         self.debug = self.settings.get("debug", False)
         self.delay_event = threading.Event()
         self.chainstate_delay_event = threading.Event()
@@ -282,6 +287,17 @@ class BaseApp(DBMethods):
             cc["rpcport"], cc["rpcauth"], method, params, wallet, cc["rpchost"]
         )
 
+    def callcoinrpcbatch(self, coin, calls, wallet=None, raise_errors=True):
+        cc = self.coin_clients[coin]
+        return callrpc_batch(
+            cc["rpcport"],
+            cc["rpcauth"],
+            calls,
+            wallet,
+            cc["rpchost"],
+            raise_errors=raise_errors,
+        )
+
     def callcoincli(self, coin_type, params, wallet=None, timeout=None):
         bindir = self.coin_clients[coin_type]["bindir"]
         datadir = self.coin_clients[coin_type]["datadir"]
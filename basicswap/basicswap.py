@@ -75,16 +75,21 @@ from .offer_tracking import (
     OfferTrackingModes,
     complete_offer_fill,
     get_offer_tracking,
+    get_offer_trackings,
     init_offer_tracking,
     offer_budget_allows,
     offer_in_flight_amount,
     offer_tracking_is_exhausted,
-    offer_tracking_remaining,
+    offer_tracking_summary,
+    offers_in_flight_amounts,
     offerTrackingModeFromString,
-    strOfferTrackingMode,
     validate_offer_budget,
 )
 from .db_util import remove_expired_data
+from .event_bus import EventBus
+from .block_prefetch import BlockPrefetcher
+from .chain_prefetch import ChainQueryPrefetcher
+from .ws_broadcast import WebSocketBroadcaster
 from .http_server import HttpThread
 from .rpc import escape_rpcauth
 from .rpc_xmr import make_xmr_rpc2_func
@@ -116,6 +121,7 @@ from .util.address import (
     pubkeyToAddress,
 )
 from .util.crypto import sha256
+from .util.expiry import ExpiryScheduler
 from .util.logging import LogCategories as LC
 from .util.network import (
     is_private_ip_address,
@@ -156,7 +162,6 @@ from .db import (
     getOrderByStr,
     KnownIdentity,
     MessageLink,
-    Notification,
     Offer,
     pack_state,
     PooledAddress,
@@ -182,7 +187,7 @@ from .network.simplex import (
     getResponseData,
 )
 from .network.bsx_network import BSXNetwork, networkTypeToID
-from .network.util import getMsgPubkey
+from .network.util import getMsgPubkey, getMsgPubkeys
 import basicswap.config as cfg
 import basicswap.network.network as bsn
 import basicswap.protocols.atomic_swap_1 as atomic_swap_1
@@ -270,7 +275,7 @@ def checkAndNotifyBalanceChange(
                     "height": new_height,
                     "trigger": trigger_source,
                 }
-                swap_client.ws_server.send_message_to_all(json.dumps(balance_event))
+                swap_client.ws_broadcaster.broadcast(balance_event)
     except Exception as e:
         swap_client.log.debug(
             f"checkAndNotifyBalanceChange {ci.ticker()}: balance check failed: {e}"
@@ -387,6 +392,8 @@ def threadPollElectrumChainState(swap_client, coin_type):
 
             try:
                 ci.refreshElectrumWalletInfo()
+                # Checked every poll, a funded_only sync misses new receive
+                # addresses and pending totals aren't per address
                 checkAndNotifyBalanceChange(
                     swap_client, coin_type, ci, cc, new_height, "electrum_poll"
                 )
@@ -429,6 +436,7 @@ def threadPollElectrumChainState(swap_client, coin_type):
 
 class BasicSwap(BaseApp, BSXNetwork, UIApp):
     ws_server = None
+    ws_broadcaster = None
     protocolInterfaces = {
         SwapTypes.SELLER_FIRST: atomic_swap_1.AtomicSwapInterface(),
         SwapTypes.XMR_SWAP: xmr_swap_1.XmrSwapInterface(),
@@ -464,6 +472,10 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
         self.check_watched_seconds = self.get_int_setting(
             "check_watched_seconds", 60, 1, 10 * 60
         )
+        # Full check of Electrum watches when all are subscribed to
+        self.check_watched_electrum_seconds = self.get_int_setting(
+            "check_watched_electrum_seconds", 10 * 60, 1, 60 * 60
+        )
         self.check_split_messages_seconds = self.get_int_setting(
             "check_split_messages_seconds", 20, 1, 10 * 60
         )
@@ -481,6 +493,7 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
         self._last_checked_actions = 0
         self._last_checked_expired = 0
         self._last_checked_expiring_bids_offers = 0
+        self._expire_batch_size: int = 500  # Max ids per expiry UPDATE
         self._last_checked_progress = 0
         self._last_checked_watched = 0
         self._last_checked_split_messages = 0
@@ -490,9 +503,22 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
         self._possibly_revoked_offers = collections.deque(
             [], maxlen=48
         )  # TODO: improve
-        self._expiring_bids = []  # List of bids expiring soon
-        self._expiring_offers = []  # List of offers expiring soon
+        self._expiring_bids = ExpiryScheduler()  # Bids expiring soon
+        self._expiring_offers = ExpiryScheduler()  # Offers expiring soon
+        self._expiring_smsgs = ExpiryScheduler()  # Stored smsg ids by expire time
+        self._last_full_smsg_expiry = 0
+        self._full_smsg_expiry_seconds = self.get_int_setting(
+            "full_smsg_expiry_seconds", 24 * 3600, 10 * 60, 7 * 24 * 3600
+        )  # Walk the whole smsg inbox and outbox this often
+        self._smsg_delete_batch_size: int = 500  # Max smsg deletes per rpc batch
+        self._offers_version: int = 0  # Incremented when offers are added or removed
         self._updating_wallets_info = {}
+        # Latest wallet info per (coin_id, balance_type): (wallet_data, created_at)
+        self._wallets_info_cache = None  # Loaded on first use
+        self._wallets_info_cache_lock = threading.Lock()
+        self._keep_wallet_info_records = self.get_int_setting(
+            "keep_wallet_info_records", 3, 1, 1000
+        )  # History rows kept per coin and balance type
         self._last_updated_wallets_info = 0
         self._synced_addresses_from_full_node = set()
         self._cached_electrum_legacy_funds = {}
@@ -620,8 +646,41 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
         self.thread_pool = concurrent.futures.ThreadPoolExecutor(
             max_workers=4, thread_name_prefix="bsp"
         )
+        # Notifications are coalesced and written in batches
+        self._notifications_since_trim: int = self._keep_notifications
+        self._event_bus = EventBus(
+            self._process_notifications_safe,
+            self.settings.get("notification_window", 0.25),
+            self.log,
+        )
         self._electrum_spend_check_futures = {}
 
+        # Electrum watches are checked when their scripthash status changes
+        self._electrum_watch_lock = threading.Lock()
+        self._electrum_watch_scripthashes = {}  # coin_type: {watch key: scripthash}
+        self._electrum_watch_pending = {}  # coin_type: set of changed scripthashes
+        self._electrum_watch_swept = {}  # coin_type: time of the last full check
+        self._electrum_watch_sync_requested = set()
+        self._electrum_watch_sync_futures = {}
+
+        # Number of blocks checkForSpends requests concurrently when catching up
+        self._block_prefetch_window = self.settings.get("block_prefetch_window", 4)
+        self._block_prefetch_pool = None
+        if self._block_prefetch_window > 1:
+            self._block_prefetch_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self._block_prefetch_window, thread_name_prefix="bsp_blk"
+            )
+
+        # Number of threads running chain queries for the bids in progress, 0 to disable
+        self._bid_check_workers = self.settings.get("bid_check_workers", 0)
+        self._bid_check_pool = None
+        if self._bid_check_workers > 0:
+            self._bid_check_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self._bid_check_workers, thread_name_prefix="bsp_bid"
+            )
+        self._chain_query_prefetcher = None
+        self._last_bid_check_seconds: float = 0.0
+
         # Encode key to match network
         wif_prefix = chainparams[Coins.PART][self.chain]["key_prefix"]
         self.network_key = toWIF(wif_prefix, decodeWif(self.settings["network_key"]))
@@ -735,6 +794,7 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
         if self.ws_server:
             try:
                 self.log.info("Stopping websocket server.")
+                self.ws_broadcaster.stop()
                 self.ws_server.shutdown_gracefully()
             except Exception as e:  # noqa: F841
                 traceback.print_exc()
@@ -745,8 +805,10 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
             self.log.info("Background price fetching stopped")
 
         try:
-            from basicswap.rpc_pool import close_all_pools
+            from basicswap.rpc_pool import close_all_pools, get_pool_stats
 
+            for url, stats in get_pool_stats().items():
+                self.log.debug(f"RPC pool stats {url}: {stats}")
             close_all_pools()
         except Exception as e:
             self.log.debug(f"Error closing RPC pools: {e}")
@@ -795,12 +857,18 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 t.stop()
             t.join(timeout=15)
 
+        self._event_bus.stop()
         if sys.version_info[1] >= 9:
             self.thread_pool.shutdown(cancel_futures=True)
         else:
             self.thread_pool.shutdown()
+        if self._block_prefetch_pool:
+            self._block_prefetch_pool.shutdown(cancel_futures=True)
+        if self._bid_check_pool:
+            self._bid_check_pool.shutdown(cancel_futures=True)
 
         self.swaps_in_progress.clear()
+        self.closeDBConnections()
         super().finalise()
 
     def logIDB(self, concept_id: bytes) -> str:
@@ -967,6 +1035,10 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 self.coin_clients[coin]["walletrpcport"] = chain_client_settings.get(
                     "walletrpcport", chainparams[coin][self.chain]["walletrpcport"]
                 )
+                # Extra wallet-rpc instances for swap wallets, see XMRInterface.findTxB
+                self.coin_clients[coin]["swap_wallet_rpc_ports"] = (
+                    chain_client_settings.get("swap_wallet_rpc_ports", [])
+                )
                 if "walletrpcpassword" in chain_client_settings:
                     self.coin_clients[coin]["walletrpcauth"] = (
                         chain_client_settings["walletrpcuser"],
@@ -1499,8 +1571,8 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 ["unread", "", options],
                 timeout=self._smsg_rpc_bulk_timeout,
             )["messages"]
+            self.processMsgs(inbox_messages)
             for msg in inbox_messages:
-                self.processMsg(msg)
                 nm += 1
                 if (
                     "hex" not in msg
@@ -1611,6 +1683,11 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
             self.ws_server.client_port = self.settings.get(
                 "wsclientport", self.settings["wsport"]
             )
+            # Each client is written to from its own queue, so a slow client
+            # can't block the thread raising an event
+            self.ws_broadcaster = WebSocketBroadcaster(
+                self.settings.get("ws_client_queue_size", 256)
+            )
             self.ws_server.set_fn_new_client(self.ws_new_client)
             self.ws_server.set_fn_client_left(self.ws_client_left)
             self.ws_server.set_fn_message_received(self.ws_message_received)
@@ -2086,7 +2163,7 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                         "trigger": "electrum_notification",
                         "address": address[:20] + "..." if address else None,
                     }
-                    self.ws_server.send_message_to_all(json.dumps(balance_event))
+                    self.ws_broadcaster.broadcast(balance_event)
                     self.log.debug(
                         f"Electrum notification: {ci.ticker()} balance updated"
                     )
@@ -3406,6 +3483,9 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
             cursor.execute(query_str, (coin_id, info_type))
         finally:
             self.closeDB(cursor)
+        with self._wallets_info_cache_lock:
+            if self._wallets_info_cache is not None:
+                self._wallets_info_cache.pop((coin_id, info_type), None)
 
     def updateIdentityBidState(self, cursor, address: str, bid) -> None:
         offer = self.getOffer(bid.offer_id, cursor)
@@ -3783,79 +3863,100 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                     f"Coin pair should use adaptor sig swap type: {coin_from.name} -> {coin_to.name}"
                 )
 
-    def _process_notification_safe(self, event_type, event_data) -> None:
+    def _process_notifications_safe(self, events) -> None:
+        # events is a list of (event_type, event_data) collected by the event bus
         try:
-            show_event = event_type not in self._disabled_notification_types
-            if event_type == NT.OFFER_RECEIVED:
-                offer_id: bytes = bytes.fromhex(event_data["offer_id"])
-                self.log.debug(f"Received new offer {self.log.id(offer_id)}")
-                if self.ws_server and show_event:
+            ws_events = []
+            rows = []
+            for event_type, event_data in events:
+                show_event = event_type not in self._disabled_notification_types
+                if event_type == NT.OFFER_RECEIVED:
+                    offer_id: bytes = bytes.fromhex(event_data["offer_id"])
+                    self.log.debug(f"Received new offer {self.log.id(offer_id)}")
                     event_data["event"] = "new_offer"
-                    self.ws_server.send_message_to_all(json.dumps(event_data))
-            elif event_type == NT.BID_RECEIVED:
-                offer_id: bytes = bytes.fromhex(event_data["offer_id"])
-                offer_type: str = event_data["type"]
-                bid_id: bytes = bytes.fromhex(event_data["bid_id"])
-                self.log.info(
-                    f"Received valid bid {self.log.id(bid_id)} for {offer_type} offer {self.log.id(offer_id)}"
-                )
-                if self.ws_server and show_event:
+                elif event_type == NT.BID_RECEIVED:
+                    offer_id: bytes = bytes.fromhex(event_data["offer_id"])
+                    offer_type: str = event_data["type"]
+                    bid_id: bytes = bytes.fromhex(event_data["bid_id"])
+                    self.log.info(
+                        f"Received valid bid {self.log.id(bid_id)} for {offer_type} offer {self.log.id(offer_id)}"
+                    )
                     event_data["event"] = "new_bid"
-                    self.ws_server.send_message_to_all(json.dumps(event_data))
-            elif event_type == NT.BID_ACCEPTED:
-                bid_id: bytes = bytes.fromhex(event_data["bid_id"])
-                self.log.info(f"Received valid bid accept for {self.log.id(bid_id)}")
-                if self.ws_server and show_event:
+                elif event_type == NT.BID_ACCEPTED:
+                    bid_id: bytes = bytes.fromhex(event_data["bid_id"])
+                    self.log.info(
+                        f"Received valid bid accept for {self.log.id(bid_id)}"
+                    )
                     event_data["event"] = "bid_accepted"
-                    self.ws_server.send_message_to_all(json.dumps(event_data))
-            elif event_type == NT.SWAP_COMPLETED:
-                bid_id: bytes = bytes.fromhex(event_data["bid_id"])
-                self.log.info(f"Swap completed for bid {self.log.id(bid_id)}")
-                event_data["event"] = "swap_completed"
-
-                self.completeOfferTrackingForBid(bid_id)
+                elif event_type == NT.SWAP_COMPLETED:
+                    bid_id: bytes = bytes.fromhex(event_data["bid_id"])
+                    self.log.info(f"Swap completed for bid {self.log.id(bid_id)}")
+                    event_data["event"] = "swap_completed"
 
-                if self.ws_server and show_event:
-                    self.ws_server.send_message_to_all(json.dumps(event_data))
-            elif event_type == NT.UPDATE_AVAILABLE:
-                self.log.info(
-                    f"Update available: v{event_data.get('latest_version', 'unknown')}"
-                )
-                if self.ws_server and show_event:
+                    self.completeOfferTrackingForBid(bid_id)
+                elif event_type == NT.UPDATE_AVAILABLE:
+                    self.log.info(
+                        f"Update available: v{event_data.get('latest_version', 'unknown')}"
+                    )
                     event_data["event"] = "update_available"
-                    self.ws_server.send_message_to_all(json.dumps(event_data))
-            elif event_type == NT.SWEEP_COMPLETED:
-                coin_name = event_data.get("coin_name", "Unknown")
-                amount = event_data.get("amount", 0)
-                self.log.info(
-                    f"Sweep completed: {amount} {coin_name} swept to RPC wallet"
-                )
-                if self.ws_server and show_event:
+                elif event_type == NT.SWEEP_COMPLETED:
+                    coin_name = event_data.get("coin_name", "Unknown")
+                    amount = event_data.get("amount", 0)
+                    self.log.info(
+                        f"Sweep completed: {amount} {coin_name} swept to RPC wallet"
+                    )
                     event_data["event"] = "sweep_completed"
-                    self.ws_server.send_message_to_all(json.dumps(event_data))
-            else:
-                self.log.warning(f"Unknown notification {event_type}")
+                else:
+                    self.log.warning(f"Unknown notification {event_type}")
+                    show_event = False
+                if show_event:
+                    ws_events.append(event_data)
+                rows.append((event_type, event_data, show_event))
+
+            if self.ws_server and len(ws_events) > 0:
+                self.ws_broadcaster.broadcastMany(ws_events)
 
+            if len(rows) < 1:
+                return
             now: int = self.getTime()
             use_cursor = self.openDB(None)
             try:
-                self.add(
-                    Notification(
-                        active_ind=1,
-                        created_at=now,
-                        event_type=int(event_type),
-                        event_data=bytes(json.dumps(event_data), "UTF-8"),
-                    ),
-                    use_cursor,
+                use_cursor.executemany(
+                    "INSERT INTO notifications (active_ind, created_at, event_type, event_data) VALUES (1, ?, ?, ?)",
+                    [
+                        (now, int(event_type), bytes(json.dumps(event_data), "UTF-8"))
+                        for event_type, event_data, _ in rows
+                    ],
                 )
+                # Rows are inserted under mxDB, the newest ids are this batch's
+                record_ids = [
+                    r[0]
+                    for r in use_cursor.execute(
+                        "SELECT record_id FROM notifications ORDER BY record_id DESC LIMIT ?",
+                        (len(rows),),
+                    )
+                ]
+                for record_id, (event_type, event_data, show_event) in zip(
+                    reversed(record_ids), rows
+                ):
+                    if show_event:
+                        self._notifications_cache[record_id] = (
+                            now,
+                            event_type,
+                            event_data,
+                        )
 
-                use_cursor.execute(
-                    "DELETE FROM notifications WHERE record_id NOT IN (SELECT record_id FROM notifications WHERE active_ind=1 ORDER BY created_at ASC LIMIT ?)",
-                    (self._keep_notifications,),
-                )
+                # Trim once enough rows have been added, keeping the newest
+                self._notifications_since_trim += len(rows)
+                if self._notifications_since_trim >= max(
+                    self._keep_notifications // 4, 16
+                ):
+                    use_cursor.execute(
+                        "DELETE FROM notifications WHERE record_id <= (SELECT record_id FROM notifications ORDER BY record_id DESC LIMIT 1 OFFSET ?)",
+                        (self._keep_notifications,),
+                    )
+                    self._notifications_since_trim = 0
 
-                if show_event:
-                    self._notifications_cache[now] = (event_type, event_data)
                 while len(self._notifications_cache) > self._show_notifications:
                     # dicts preserve insertion order in Python 3.7+
                     self._notifications_cache.pop(next(iter(self._notifications_cache)))
@@ -3864,40 +3965,44 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 self.closeDB(use_cursor)
 
         except Exception as ex:
-            self.log.error(
-                f"Notification processing failed for event_type {event_type}: {ex}"
-            )
+            self.log.error(f"Notification processing failed: {ex}")
+
+    def notifyBatch(self, event_type, events) -> None:
+        """Queue a batch of notifications of the same type on the event bus."""
+        if len(events) < 1:
+            return
+        self._event_bus.publishMany(event_type, events)
 
     def notify(self, event_type, event_data, cursor=None) -> None:
-        """Submit notification for processing in isolated thread."""
-        try:
-            self.thread_pool.submit(
-                self._process_notification_safe, event_type, event_data
-            )
-        except Exception as ex:
-            self.log.error(f"Failed to submit notification to thread pool: {ex}")
-            try:
-                self._process_notification_safe(event_type, event_data)
-            except Exception as ex2:
-                self.log.error(f"Notification fallback also failed: {ex2}")
+        """Queue a notification on the event bus.
+
+        Events are processed together after a short window, off the caller's thread.
+        """
+        self._event_bus.publish(event_type, event_data)
 
     def buildNotificationsCache(self, cursor):
         self._notifications_cache.clear()
         q = cursor.execute(
-            "SELECT created_at, event_type, event_data FROM notifications WHERE active_ind = 1 ORDER BY created_at ASC LIMIT ?",
-            (self._keep_notifications,),
+            "SELECT record_id, created_at, event_type, event_data FROM notifications WHERE active_ind = 1 ORDER BY record_id DESC LIMIT ?",
+            (self._show_notifications,),
         )
-        for entry in q:
+        # Keyed by record_id, events in one batch share created_at
+        for entry in reversed(q.fetchall()):
             self._notifications_cache[entry[0]] = (
                 entry[1],
-                json.loads(entry[2].decode("UTF-8")),
+                entry[2],
+                json.loads(entry[3].decode("UTF-8")),
             )
 
     def getNotifications(self):
         rv = []
-        for k, v in self._notifications_cache.items():
+        for v in self._notifications_cache.values():
             rv.append(
-                (time.strftime("%d-%m-%y %H:%M:%S", time.localtime(k)), int(v[0]), v[1])
+                (
+                    time.strftime("%d-%m-%y %H:%M:%S", time.localtime(v[0])),
+                    int(v[1]),
+                    v[2],
+                )
             )
         return rv
 
@@ -4471,10 +4576,11 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 )
         finally:
             self.closeDB(cursor)
+        self._offers_version += 1
         self.log.info(f"Sent OFFER {self.log.id(offer_id)}")
 
         if self.ws_server:
-            self.ws_server.send_message_to_all('{"event": "offer_created"}')
+            self.ws_broadcaster.broadcast({"event": "offer_created"})
 
         return offer_id
 
@@ -4521,8 +4627,8 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
             self.closeDB(cursor, commit=False)
 
         if self.ws_server:
-            self.ws_server.send_message_to_all(
-                json.dumps({"event": "offer_revoked", "offer_id": offer_id.hex()})
+            self.ws_broadcaster.broadcast(
+                {"event": "offer_revoked", "offer_id": offer_id.hex()}
             )
 
     def completeOfferTrackingForBid(self, bid_id: bytes) -> None:
@@ -4610,24 +4716,69 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
             if row is None:
                 return None
             in_flight: int = self.getOfferInFlightAmount(offer, use_cursor)
-            remaining = offer_tracking_remaining(row, in_flight)
-            exhausted = offer_tracking_is_exhausted(row, in_flight)
-            return {
-                "mode": int(row.mode),
-                "mode_str": strOfferTrackingMode(row.mode),
-                "per_swap_amount": int(row.per_swap_amount or 0),
-                "total_budget": int(row.total_budget or 0),
-                "filled_amount": int(row.filled_amount or 0),
-                "fills_completed": int(row.fills_completed or 0),
-                "max_fills": int(row.max_fills or 0),
-                "min_wallet_reserve": int(row.min_wallet_reserve or 0),
-                "in_flight_amount": int(in_flight),
-                "remaining": None if remaining is None else int(remaining),
-                "exhausted": bool(exhausted),
-            }
+            return offer_tracking_summary(row, in_flight)
         finally:
             self.closeDB(use_cursor, commit=False)
 
+    def getOffersListInfo(self, offers, cursor, with_extra_info: bool = False) -> dict:
+        """Tracking summaries and extra info for a list of offers in a few queries.
+
+        Returns {offer_id: {"tracking": dict | None, "xmr_offer": XmrOffer | None,
+        "strategy": (strategy_id, label) | None}}, xmr_offer and strategy are only
+        loaded with with_extra_info.
+        """
+        rv = {
+            o.offer_id: {"tracking": None, "xmr_offer": None, "strategy": None}
+            for o in offers
+        }
+        sent_offers = [o for o in offers if o.was_sent]
+        sent_ids = [o.offer_id for o in sent_offers]
+        if len(sent_ids) > 0:
+            tracking_rows = get_offer_trackings(self, sent_ids, cursor)
+            tracked_ids = list(tracking_rows.keys())
+            reverse_ids = set(
+                o.offer_id
+                for o in sent_offers
+                if self.is_reverse_ads_bid(o.coin_from, o.coin_to)
+            )
+            in_flight = offers_in_flight_amounts(
+                cursor,
+                tracked_ids,
+                (
+                    ActionTypes.ACCEPT_BID,
+                    ActionTypes.ACCEPT_XMR_BID,
+                    ActionTypes.ACCEPT_AS_REV_BID,
+                ),
+                reverse_ids,
+            )
+            for offer_id, row in tracking_rows.items():
+                rv[offer_id]["tracking"] = offer_tracking_summary(
+                    row, in_flight.get(offer_id, 0)
+                )
+
+        if not with_extra_info:
+            return rv
+
+        xmr_ids = [o.offer_id for o in offers if o.swap_type == SwapTypes.XMR_SWAP]
+        for i in range(0, len(xmr_ids), 500):
+            batch = xmr_ids[i : i + 500]
+            constraint = batch if len(batch) > 1 else batch[0]
+            for xmr_offer in self.query(XmrOffer, cursor, {"offer_id": constraint}):
+                rv[xmr_offer.offer_id]["xmr_offer"] = xmr_offer
+
+        for i in range(0, len(sent_ids), 500):
+            batch = sent_ids[i : i + 500]
+            ids_in = ", ".join(["?"] * len(batch))
+            query_str = (
+                "SELECT links.linked_id, links.strategy_id, strats.label FROM automationlinks links"
+                + " LEFT JOIN automationstrategies strats ON strats.record_id = links.strategy_id"
+                + f" WHERE links.linked_type = ? AND links.linked_id IN ({ids_in}) AND links.active_ind = 1"
+            )
+            for row in cursor.execute(query_str, [int(Concepts.OFFER)] + batch):
+                if rv[row[0]]["strategy"] is None:
+                    rv[row[0]]["strategy"] = (row[1], row[2])
+        return rv
+
     def validateOfferWalletFloor(
         self, offer, bid_amount: int, cursor, exclude_bid_id=None
     ) -> None:
@@ -4725,6 +4876,7 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
             )
         finally:
             self.closeDB(cursor)
+        self._offers_version += 1
 
     def editOffer(self, offer_id, data) -> None:
         self.log.info(f"Editing offer {self.log.id(offer_id)}")
@@ -5410,8 +5562,8 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
         if not self.ws_server:
             return
         try:
-            self.ws_server.send_message_to_all(
-                json.dumps({"event": "bid_changed", "bid_id": bid_id.hex()})
+            self.ws_broadcaster.broadcast(
+                {"event": "bid_changed", "bid_id": bid_id.hex()}
             )
         except Exception as e:  # noqa: F841
             self.log.debug(f"notifyBidChanged failed: {e}")
@@ -8178,38 +8330,177 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
             return sum_unspent
         return None
 
-    def findTxB(self, ci_to, xmr_swap, bid, cursor, bid_sender: bool) -> bool:
-        bid_changed = False
+    def chainQuery(self, ci, method: str, *args, **kwargs):
+        # Use the result fetched in parallel for this update pass if available
+        if self._chain_query_prefetcher is not None:
+            return self._chain_query_prefetcher.call(ci, method, *args, **kwargs)
+        return getattr(ci, method)(*args, **kwargs)
+
+    def runChainQuery(self, query):
+        ci, method, args, kwargs = query
+        return self.chainQuery(ci, method, *args, **kwargs)
+
+    # The bid state checkers and addBidStateQueries build their chain queries
+    # with these, prefetched results are only used if the arguments match.
+    def initiateTxQuery(self, ci_from, bid) -> tuple:
+        if ci_from.using_segwit():
+            dest_script = ci_from.getScriptDest(bid.initiate_tx.script)
+            addr = ci_from.encodeScriptDest(dest_script)
+        else:
+            addr = ci_from.encode_p2sh(bid.initiate_tx.script)
+        return (
+            ci_from,
+            "getLockTxHeight",
+            (bid.initiate_tx.txid, addr, bid.amount, bid.chain_a_height_start),
+            {"find_index": True, "vout": bid.initiate_tx.vout},
+        )
 
-        found_tx = None
+    def participateTxQuery(self, ci_to, bid) -> tuple:
+        if ci_to.using_segwit():
+            p2wsh = ci_to.getScriptDest(bid.participate_tx.script)
+            addr = ci_to.encodeScriptDest(p2wsh)
+        else:
+            addr = ci_to.encode_p2sh(bid.participate_tx.script)
+        return (
+            ci_to,
+            "getLockTxHeight",
+            (bid.participate_tx.txid, addr, bid.amount_to, bid.chain_b_height_start),
+            {
+                "find_index": True,
+                "vout": bid.participate_tx.vout,
+                "return_invalid_txids": True,
+            },
+        )
+
+    def xmrALockTxQuery(self, ci_from, bid, xmr_swap) -> tuple:
+        double_check_value: bool = True
+        if ci_from.get_connection_type() != "rpc":
+            double_check_value = False
+        if ci_from.interface_type() == Coins.PART_BLIND:
+            double_check_value = False
+        return (
+            ci_from,
+            "getLockTxHeight",
+            (
+                bid.xmr_a_lock_tx.txid,
+                ci_from.getSCLockScriptAddress(xmr_swap.a_lock_tx_script),
+                bid.amount,
+                bid.chain_a_height_start,
+            ),
+            {"vout": bid.xmr_a_lock_tx.vout, "find_index": double_check_value},
+        )
+
+    def xmrBLockTxQuery(self, ci_to, bid, xmr_swap, bid_sender: bool):
+        # None when the chain is watched for the lock tx with a WatchedScript
         check_amount: bool = (
             False if bid.debug_ind == DebugTypes.B_LOCK_TX_MISSED_SEND else True
         )
         if ci_to.watch_blocks_for_scripts():
             if bid.xmr_b_lock_tx is None or bid.xmr_b_lock_tx.txid is None:
-                # Watching chain for dest_address with WatchedScript
-                pass
-            else:
-                dest_address = ci_to.pkh_to_address(ci_to.pkh(xmr_swap.pkbs))
-                found_tx = ci_to.getLockTxHeight(
+                return None
+            return (
+                ci_to,
+                "getLockTxHeight",
+                (
                     bid.xmr_b_lock_tx.txid,
-                    dest_address,
+                    ci_to.pkh_to_address(ci_to.pkh(xmr_swap.pkbs)),
                     bid.amount_to,
                     bid.chain_b_height_start,
-                    find_index=True,
-                    vout=bid.xmr_b_lock_tx.vout,
-                )
-        else:
-            # Have to use findTxB instead of relying on the first seen height to detect chain reorgs
-            found_tx = ci_to.findTxB(
+                ),
+                {"find_index": True, "vout": bid.xmr_b_lock_tx.vout},
+            )
+        # Have to use findTxB instead of relying on the first seen height to detect chain reorgs
+        return (
+            ci_to,
+            "findTxB",
+            (
                 xmr_swap.vkbv,
                 xmr_swap.pkbs,
                 bid.amount_to,
                 ci_to.blocks_confirmed,
                 bid.chain_b_height_start,
                 bid_sender,
-                check_amount=check_amount,
-            )
+            ),
+            {"check_amount": check_amount},
+        )
+
+    def addBidStateQueries(self, prefetcher, bid, offer, cursor) -> None:
+        # Queue the read-only chain queries checkBidState is expected to make.
+        def add(query):
+            ci, method, args, kwargs = query
+            if ci.get_connection_type() == "electrum":
+                return
+            prefetcher.add(ci, method, *args, **kwargs)
+
+        state = BidStates(bid.state)
+        if offer.swap_type != SwapTypes.XMR_SWAP:
+            coin_from = Coins(offer.coin_from)
+            ci_from = self.ci(coin_from)
+            ci_to = self.ci(offer.coin_to)
+            if state == BidStates.BID_ACCEPTED and coin_from != Coins.PART:
+                add(self.initiateTxQuery(ci_from, bid))
+            elif state == BidStates.SWAP_INITIATED and bid.participate_tx is not None:
+                add(self.participateTxQuery(ci_to, bid))
+            return
+
+        if TxTypes.XMR_SWAP_A_LOCK_REFUND in bid.txns:
+            return
+        reverse_bid: bool = self.is_reverse_ads_bid(offer.coin_from, offer.coin_to)
+        ci_from = self.ci(offer.coin_to if reverse_bid else offer.coin_from)
+        ci_to = self.ci(offer.coin_from if reverse_bid else offer.coin_to)
+        was_sent: bool = bid.was_received if reverse_bid else bid.was_sent
+
+        if state == BidStates.XMR_SWAP_MSG_SCRIPT_LOCK_SPEND_TX:
+            if (
+                bid.xmr_a_lock_tx is None
+                or bid.xmr_a_lock_tx.txid is None
+                or not isinstance(bid.xmr_a_lock_tx.vout, int)
+                or bid.xmr_a_lock_tx.vout < 0
+            ):
+                return
+            xmr_swap = self.queryOne(XmrSwap, cursor, {"bid_id": bid.bid_id})
+            if xmr_swap is None:
+                return
+            add(self.xmrALockTxQuery(ci_from, bid, xmr_swap))
+        elif state in (
+            BidStates.XMR_SWAP_SCRIPT_COIN_LOCKED,
+            BidStates.XMR_SWAP_SCRIPT_TX_PREREFUND,
+        ):
+            xmr_swap = self.queryOne(XmrSwap, cursor, {"bid_id": bid.bid_id})
+            if xmr_swap is None:
+                return
+            query = self.xmrBLockTxQuery(ci_to, bid, xmr_swap, was_sent)
+            if query is not None:
+                add(query)
+            add((ci_to, "getChainHeight", (), {}))
+
+    def prefetchBidStateQueries(self):
+        prefetcher = ChainQueryPrefetcher(self._bid_check_pool, self._bid_check_workers)
+        cursor = self.openDBRead()
+        try:
+            for bid_id, v in list(self.swaps_in_progress.items()):
+                bid, offer = v
+                try:
+                    self.addBidStateQueries(prefetcher, bid, offer, cursor)
+                except Exception as e:
+                    self.log.debug(
+                        f"addBidStateQueries {self.log.id(bid_id)} failed: {e}"
+                    )
+        finally:
+            self.closeDBRead(cursor)
+        prefetcher.start()
+        return prefetcher
+
+    def findTxB(self, ci_to, xmr_swap, bid, cursor, bid_sender: bool) -> bool:
+        bid_changed = False
+
+        found_tx = None
+        check_amount: bool = (
+            False if bid.debug_ind == DebugTypes.B_LOCK_TX_MISSED_SEND else True
+        )
+        query = self.xmrBLockTxQuery(ci_to, bid, xmr_swap, bid_sender)
+        if query is not None:
+            found_tx = self.runChainQuery(query)
 
         invalid_tx_found: bool = False
         if isinstance(found_tx, int) and found_tx == -1:
@@ -8637,9 +8928,6 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
 
                 # TODO: Timeout waiting for transactions
                 bid_changed: bool = False
-                a_lock_tx_addr = ci_from.getSCLockScriptAddress(
-                    xmr_swap.a_lock_tx_script
-                )
                 # Lock TX A should have been verified already
                 if (
                     bid.xmr_a_lock_tx is None
@@ -8649,19 +8937,9 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 ):
                     raise ValueError("Lock TX A details missing.")
 
-                double_check_value: bool = True
-                if ci_from.get_connection_type() != "rpc":
-                    double_check_value = False
-                if ci_from.interface_type() == Coins.PART_BLIND:
-                    double_check_value = False
-                lock_tx_chain_info = ci_from.getLockTxHeight(
-                    bid.xmr_a_lock_tx.txid,
-                    a_lock_tx_addr,
-                    bid.amount,
-                    bid.chain_a_height_start,
-                    vout=bid.xmr_a_lock_tx.vout,
-                    find_index=double_check_value,
-                )
+                query = self.xmrALockTxQuery(ci_from, bid, xmr_swap)
+                double_check_value: bool = query[3]["find_index"]
+                lock_tx_chain_info = self.runChainQuery(query)
                 if lock_tx_chain_info is None:
                     return rv
                 # Double check index and amount
@@ -8854,7 +9132,7 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 ):
                     chain_height = None
                     try:
-                        chain_height = ci_to.getChainHeight()
+                        chain_height = self.chainQuery(ci_to, "getChainHeight")
                     except Exception as e:
                         if ci_to.is_transient_error(e):
                             self.log.warning(
@@ -9084,20 +9362,7 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 except Exception:
                     pass
             else:
-                if ci_from.using_segwit():
-                    dest_script = ci_from.getScriptDest(bid.initiate_tx.script)
-                    addr = ci_from.encodeScriptDest(dest_script)
-                else:
-                    addr = ci_from.encode_p2sh(bid.initiate_tx.script)
-
-                found = ci_from.getLockTxHeight(
-                    bid.initiate_tx.txid,
-                    addr,
-                    bid.amount,
-                    bid.chain_a_height_start,
-                    find_index=True,
-                    vout=bid.initiate_tx.vout,
-                )
+                found = self.runChainQuery(self.initiateTxQuery(ci_from, bid))
                 index = None
                 if found:
                     if "index" not in found:
@@ -9172,32 +9437,11 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 return True  # Mark bid for archiving
         elif state == BidStates.SWAP_INITIATED:
             # Waiting for participate txn to be confirmed in 'to' chain
-            if ci_to.using_segwit():
-                p2wsh = ci_to.getScriptDest(bid.participate_tx.script)
-                addr = ci_to.encodeScriptDest(p2wsh)
-            else:
-                addr = ci_to.encode_p2sh(bid.participate_tx.script)
-
             ci_to = self.ci(coin_to)
-            participate_txid = (
-                None
-                if bid.participate_tx is None or bid.participate_tx.txid is None
-                else bid.participate_tx.txid
-            )
-            participate_txvout = (
-                None
-                if bid.participate_tx is None or bid.participate_tx.vout is None
-                else bid.participate_tx.vout
-            )
-            found = ci_to.getLockTxHeight(
-                participate_txid,
-                addr,
-                bid.amount_to,
-                bid.chain_b_height_start,
-                find_index=True,
-                vout=participate_txvout,
-                return_invalid_txids=True,
-            )
+            query = self.participateTxQuery(ci_to, bid)
+            participate_txid = query[2][0]
+            participate_txvout = query[3]["vout"]
+            found = self.runChainQuery(query)
             if found and "invalid" in found:
                 # Keep looking for a valid tx
                 cursor = None
@@ -9472,6 +9716,7 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 return
 
         watched.append(WatchedOutput(bid_id, txid_hex, vout, tx_type, swap_type))
+        self._requestElectrumWatchSync(coin_type)
 
     def removeWatchedOutput(self, coin_type, bid_id: bytes, txid_hex: str) -> None:
         # Remove all for bid if txid is None
@@ -9487,6 +9732,8 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 self.log.debug(
                     f"Removed watched output {Coins(coin_type).name} {self.log.id(bid_id)} {self.logIDT(wo.txid_hex)}"
                 )
+        if len(watched) != old_len:
+            self._requestElectrumWatchSync(coin_type)
 
     def addWatchedScript(
         self, coin_type, bid_id, script: bytes, tx_type, swap_type=None
@@ -9502,6 +9749,7 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 return
 
         watched.append(WatchedScript(bid_id, script, tx_type, swap_type))
+        self._requestElectrumWatchSync(coin_type)
 
     def removeWatchedScript(
         self, coin_type, bid_id: bytes, script: bytes, tx_type: TxTypes = None
@@ -9527,6 +9775,8 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 self.log.debug(
                     f"Removed watched script {Coins(coin_type).name} {self.log.id(bid_id)}"
                 )
+        if len(watched) != old_len:
+            self._requestElectrumWatchSync(coin_type)
 
     def initiateTxnSpent(
         self, bid_id: bytes, spend_txid: str, spend_n: int, spend_txn
@@ -10137,45 +10387,83 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
 
         # TODO: Check for spends on watchonly txns where possible
         if self.coin_clients[coin_type].get("have_spent_index", False):
-            # TODO: batch getspentinfo
-            for o in c["watched_outputs"]:
-                found_spend = None
-                try:
-                    found_spend = self.callcoinrpc(
-                        Coins.PART,
-                        "getspentinfo",
-                        [{"txid": o.txid_hex, "index": o.vout}],
-                    )
-                except Exception as ex:
-                    if "Unable to get spent info" not in str(ex):
-                        self.log.warning(f"getspentinfo {ex}")
-                if found_spend is not None:
-                    if found_spend.get("height", 0) <= 0:
-                        self.log.debug(
-                            f"Waiting for spend of {o.txid_hex}:{o.vout} to confirm: {self.logIDT(found_spend['txid'])}"
-                        )
-                        continue
-                    spend_txid = found_spend["txid"]
-                    spend_n = found_spend["index"]
+            watched_outputs = list(c["watched_outputs"])
+            try:
+                found_spends = self.callcoinrpcbatch(
+                    Coins.PART,
+                    [
+                        ("getspentinfo", [{"txid": o.txid_hex, "index": o.vout}])
+                        for o in watched_outputs
+                    ],
+                    raise_errors=False,
+                )
+            except Exception as ex:
+                self.log.warning(f"getspentinfo {ex}")
+                return
+            confirmed_spends = []
+            for o, found_spend in zip(watched_outputs, found_spends):
+                if isinstance(found_spend, Exception):
+                    if "Unable to get spent info" not in str(found_spend):
+                        self.log.warning(f"getspentinfo {found_spend}")
+                    continue
+                if found_spend is None:
+                    continue
+                if found_spend.get("height", 0) <= 0:
                     self.log.debug(
-                        f"Found spend in spentindex {self.logIDT(o.txid_hex)} {o.vout} in {self.logIDT(spend_txid)} {spend_n}"
-                    )
-                    spend_txn = self.callcoinrpc(
-                        Coins.PART, "getrawtransaction", [spend_txid, True]
-                    )
-                    self.processSpentOutput(
-                        coin_type, o, spend_txid, spend_n, spend_txn
+                        f"Waiting for spend of {o.txid_hex}:{o.vout} to confirm: {self.logIDT(found_spend['txid'])}"
                     )
+                    continue
+                self.log.debug(
+                    f"Found spend in spentindex {self.logIDT(o.txid_hex)} {o.vout} in {self.logIDT(found_spend['txid'])} {found_spend['index']}"
+                )
+                confirmed_spends.append((o, found_spend))
+
+            spend_txns = self.callcoinrpcbatch(
+                Coins.PART,
+                [
+                    ("getrawtransaction", [found_spend["txid"], True])
+                    for _, found_spend in confirmed_spends
+                ],
+            )
+            for (o, found_spend), spend_txn in zip(confirmed_spends, spend_txns):
+                self.processSpentOutput(
+                    coin_type, o, found_spend["txid"], found_spend["index"], spend_txn
+                )
             return
 
         ci = self.ci(coin_type)
         chain_blocks = ci.getChainHeight()
         last_height_checked: int = c["last_height_checked"]
-        block_check_min_time: int = c["block_check_min_time"]
         self.log.debug(
             f"{ci.ticker()} chain_blocks, last_height_checked {chain_blocks} {last_height_checked}."
         )
 
+        use_raw_block_scan: bool = ci.use_raw_block_scan()
+        prefetcher = BlockPrefetcher(
+            self._block_prefetch_pool,
+            lambda height: self.fetchBlockForScan(ci, height, use_raw_block_scan),
+            self._block_prefetch_window,
+        )
+        try:
+            self.scanBlocksForSpends(
+                coin_type, ci, c, chain_blocks, last_height_checked, prefetcher
+            )
+        finally:
+            prefetcher.close()
+
+    def fetchBlockForScan(self, ci, height: int, use_raw_block_scan: bool):
+        block_hash = ci.rpc("getblockhash", [height])
+        block = None
+        if use_raw_block_scan:
+            block = self.getRawBlockForScan(ci, block_hash, height)
+        if block is None:
+            block = ci.getBlockWithTxns(block_hash)
+        return block
+
+    def scanBlocksForSpends(
+        self, coin_type, ci, c, chain_blocks: int, last_height_checked: int, prefetcher
+    ) -> None:
+        block_check_min_time: int = c["block_check_min_time"]
         blocks_checked: int = 0
         while last_height_checked < chain_blocks:
             if self.delay_event.is_set():
@@ -10191,9 +10479,8 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 )
                 break
 
-            block_hash = ci.rpc("getblockhash", [last_height_checked + 1])
             try:
-                block = ci.getBlockWithTxns(block_hash)
+                block = prefetcher.getBlock(last_height_checked + 1, chain_blocks)
             except Exception as e:
                 if "Block not available (pruned data)" in str(e):
                     # TODO: Better solution?
@@ -10219,43 +10506,169 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 )
                 continue
 
-            for tx in block["tx"]:
-                for t in c["watched_transactions"]:
-                    if t.block_hash is not None:
+            if "raw_block" in block:
+                self.checkRawBlockForSpends(coin_type, ci, c, block, chain_blocks)
+            else:
+                self.checkBlockForSpends(coin_type, c, block, chain_blocks)
+
+            last_height_checked += 1
+            self.updateCheckedBlock(ci, c, block)
+
+    def getRawBlockForScan(self, ci, block_hash: str, height: int):
+        # Returns None if the block can't be parsed and should be fetched verbose
+        block_bytes = ci.getBlockRaw(block_hash)
+        try:
+            raw_block = ci.loadBlock(block_bytes)
+        except Exception as e:
+            self.log.warning(
+                f"Failed to parse raw {ci.ticker()} block {block_hash}, falling back to verbose: {e}"
+            )
+            return None
+        return {
+            "hash": block_hash,
+            "height": height,
+            "time": raw_block.nTime,
+            "previousblockhash": f"{raw_block.hashPrevBlock:064x}",
+            "raw_block": raw_block,
+        }
+
+    def checkBlockForSpends(self, coin_type, c, block, chain_blocks: int) -> None:
+        block_hash = block["hash"]
+        for tx in block["tx"]:
+            for t in c["watched_transactions"]:
+                if t.block_hash is not None:
+                    continue
+                if tx["txid"] == t.txid_hex:
+                    self.processFoundTransaction(
+                        t, block_hash, block["height"], chain_blocks
+                    )
+
+            for s in c["watched_scripts"]:
+                for i, txo in enumerate(tx["vout"]):
+                    if "scriptPubKey" in txo and "hex" in txo["scriptPubKey"]:
+                        if bytes.fromhex(txo["scriptPubKey"]["hex"]) == s.script:
+                            txid_bytes = bytes.fromhex(tx["txid"])
+                            self.log.debug(
+                                f"Found script from search for bid {self.log.id(s.bid_id)}: {self.logIDT(txid_bytes)} {i}."
+                            )
+                            if s.tx_type == TxTypes.BCH_MERCY:
+                                self.processMercyTx(coin_type, s, txid_bytes, i, tx)
+                            else:
+                                self.processFoundScript(coin_type, s, txid_bytes, i)
+
+            for o in c["watched_outputs"]:
+                for i, inp in enumerate(tx["vin"]):
+                    inp_txid = inp.get("txid", None)
+                    if inp_txid is None:  # Coinbase
                         continue
-                    if tx["txid"] == t.txid_hex:
-                        self.processFoundTransaction(
-                            t, block_hash, block["height"], chain_blocks
+                    if inp_txid == o.txid_hex and inp["vout"] == o.vout:
+                        txid = tx["txid"]
+                        self.log.debug(
+                            f"Found spend from search {self.logIDT(o.txid_hex)} {o.vout} in {self.logIDT(txid)} {i}."
                         )
+                        self.processSpentOutput(coin_type, o, txid, i, tx)
 
-                for s in c["watched_scripts"]:
-                    for i, txo in enumerate(tx["vout"]):
-                        if "scriptPubKey" in txo and "hex" in txo["scriptPubKey"]:
-                            # TODO: Optimise by loading rawtx in CTransaction
-                            if bytes.fromhex(txo["scriptPubKey"]["hex"]) == s.script:
-                                txid_bytes = bytes.fromhex(tx["txid"])
-                                self.log.debug(
-                                    f"Found script from search for bid {self.log.id(s.bid_id)}: {self.logIDT(txid_bytes)} {i}."
-                                )
-                                if s.tx_type == TxTypes.BCH_MERCY:
-                                    self.processMercyTx(coin_type, s, txid_bytes, i, tx)
-                                else:
-                                    self.processFoundScript(coin_type, s, txid_bytes, i)
+    def checkRawBlockForSpends(
+        self, coin_type, ci, c, block, chain_blocks: int
+    ) -> None:
+        # Index the watch lists so each txn is matched in constant time
+        watched_txids = {}
+        for t in c["watched_transactions"]:
+            if t.block_hash is None:
+                watched_txids.setdefault(t.txid_hex, []).append(t)
+        watched_scripts = {}
+        for s in c["watched_scripts"]:
+            watched_scripts.setdefault(s.script, []).append(s)
+        watched_outpoints = {}
+        for o in c["watched_outputs"]:
+            outpoint = (int(o.txid_hex, 16), o.vout)
+            watched_outpoints.setdefault(outpoint, []).append(o)
+
+        if not (watched_txids or watched_scripts or watched_outpoints):
+            return
+
+        def decodeTx(tx):
+            # Only txns with a match are decoded to the format the process* methods expect
+            tx_hex: str = tx.serialize_with_witness().hex()
+            tx_dict = ci.rpc("decoderawtransaction", [tx_hex])
+            tx_dict["hex"] = tx_hex
+            return tx_dict
+
+        block_hash = block["hash"]
+        for tx in block["raw_block"].vtx:
+            # Only hash txns when needed
+            txid_hex = ci.getTxid(tx).hex() if watched_txids else None
+
+            for t in watched_txids.get(txid_hex, ()):
+                # A handler may have processed or removed the watch
+                if t.block_hash is not None or t not in c["watched_transactions"]:
+                    continue
+                self.processFoundTransaction(
+                    t, block_hash, block["height"], chain_blocks
+                )
 
-                for o in c["watched_outputs"]:
-                    for i, inp in enumerate(tx["vin"]):
-                        inp_txid = inp.get("txid", None)
-                        if inp_txid is None:  # Coinbase
+            tx_dict = None
+            if watched_scripts:
+                for i, txo in enumerate(tx.vout):
+                    for s in watched_scripts.get(txo.scriptPubKey, ()):
+                        if s not in c["watched_scripts"]:
                             continue
-                        if inp_txid == o.txid_hex and inp["vout"] == o.vout:
-                            txid = tx["txid"]
-                            self.log.debug(
-                                f"Found spend from search {self.logIDT(o.txid_hex)} {o.vout} in {self.logIDT(txid)} {i}."
-                            )
-                            self.processSpentOutput(coin_type, o, txid, i, tx)
+                        if txid_hex is None:
+                            txid_hex = ci.getTxid(tx).hex()
+                        txid_bytes = bytes.fromhex(txid_hex)
+                        self.log.debug(
+                            f"Found script from search for bid {self.log.id(s.bid_id)}: {self.logIDT(txid_bytes)} {i}."
+                        )
+                        if s.tx_type == TxTypes.BCH_MERCY:
+                            if tx_dict is None:
+                                tx_dict = decodeTx(tx)
+                            self.processMercyTx(coin_type, s, txid_bytes, i, tx_dict)
+                        else:
+                            self.processFoundScript(coin_type, s, txid_bytes, i)
 
-            last_height_checked += 1
-            self.updateCheckedBlock(ci, c, block)
+            if watched_outpoints:
+                for i, inp in enumerate(tx.vin):
+                    prevout = inp.prevout
+                    for o in watched_outpoints.get((prevout.hash, prevout.n), ()):
+                        if o not in c["watched_outputs"]:
+                            continue
+                        if txid_hex is None:
+                            txid_hex = ci.getTxid(tx).hex()
+                        self.log.debug(
+                            f"Found spend from search {self.logIDT(o.txid_hex)} {o.vout} in {self.logIDT(txid_hex)} {i}."
+                        )
+                        if tx_dict is None:
+                            tx_dict = decodeTx(tx)
+                        self.processSpentOutput(coin_type, o, txid_hex, i, tx_dict)
+
+    def _electrumSpendTxDict(self, ci, spend_info):
+        tx = spend_info["tx"]
+        vin_list = []
+        for idx, inp in enumerate(tx.vin):
+            vin_entry = {
+                "txid": f"{inp.prevout.hash:064x}",
+                "vout": inp.prevout.n,
+            }
+            if tx.wit and idx < len(tx.wit.vtxinwit):
+                wit = tx.wit.vtxinwit[idx]
+                if wit.scriptWitness and wit.scriptWitness.stack:
+                    vin_entry["txinwitness"] = [
+                        item.hex() for item in wit.scriptWitness.stack
+                    ]
+            vin_list.append(vin_entry)
+        return {
+            "txid": spend_info["txid"],
+            "hex": spend_info["hex"],
+            "vin": vin_list,
+            "vout": [
+                {
+                    "value": ci.format_amount(out.nValue),
+                    "n": i,
+                    "scriptPubKey": {"hex": out.scriptPubKey.hex()},
+                }
+                for i, out in enumerate(tx.vout)
+            ],
+        }
 
     def checkForSpendsElectrum(self, coin_type, c):
         ci = self.ci(coin_type)
@@ -10268,80 +10681,18 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 f"checkForSpendsElectrum {ci.coin_name()}: watching {num_outputs} outputs, {num_scripts} scripts at height {chain_blocks}"
             )
 
-        for o in list(c["watched_outputs"]):
-            try:
-                self.log.debug(f"Checking output {o.txid_hex}:{o.vout} for spend")
-                spend_info = ci.checkWatchedOutput(o.txid_hex, o.vout)
-                if spend_info:
-                    if spend_info.get("height", 0) <= 0:
-                        self.log.debug(
-                            f"Waiting for spend of {o.txid_hex}:{o.vout} to confirm: {self.logIDT(spend_info['txid'])}"
-                        )
-                        continue
-                    self.log.debug(
-                        f"Found spend via Electrum {self.logIDT(o.txid_hex)} {o.vout} in {self.logIDT(spend_info['txid'])} {spend_info['vin']}"
-                    )
-                    raw_tx = ci.getBackend().getTransactionRaw(spend_info["txid"])
-                    if not raw_tx:
-                        self.log.debug(
-                            f"Failed to get spend tx {spend_info['txid']}, will retry"
-                        )
-                        continue
-                    tx = ci.loadTx(bytes.fromhex(raw_tx))
-                    vin_list = []
-                    for idx, inp in enumerate(tx.vin):
-                        vin_entry = {
-                            "txid": f"{inp.prevout.hash:064x}",
-                            "vout": inp.prevout.n,
-                        }
-                        if tx.wit and idx < len(tx.wit.vtxinwit):
-                            wit = tx.wit.vtxinwit[idx]
-                            if wit.scriptWitness and wit.scriptWitness.stack:
-                                vin_entry["txinwitness"] = [
-                                    item.hex() for item in wit.scriptWitness.stack
-                                ]
-                        vin_list.append(vin_entry)
-                    tx_dict = {
-                        "txid": spend_info["txid"],
-                        "hex": raw_tx,
-                        "vin": vin_list,
-                        "vout": [
-                            {
-                                "value": ci.format_amount(out.nValue),
-                                "n": i,
-                                "scriptPubKey": {"hex": out.scriptPubKey.hex()},
-                            }
-                            for i, out in enumerate(tx.vout)
-                        ],
-                    }
-                    self.processSpentOutput(
-                        coin_type, o, spend_info["txid"], spend_info["vin"], tx_dict
-                    )
-                else:
-                    self.log.debug(f"No spend found for {o.txid_hex}:{o.vout}")
-            except Exception as e:
-                self.log.debug(f"checkWatchedOutput error: {e}")
+        results = self._fetchSpendsElectrum(
+            coin_type,
+            list(c["watched_outputs"]),
+            list(c["watched_scripts"]),
+            wait_for_script_conf=True,
+        )
+        results["chain_blocks"] = chain_blocks
+        self._processFetchedSpends(coin_type, results)
 
-        for s in list(c["watched_scripts"]):
-            try:
-                found = ci.checkWatchedScript(s.script)
-                if found:
-                    if found.get("height", 0) <= 0:
-                        self.log.debug(
-                            f"Waiting for watched script tx to confirm for bid {self.log.id(s.bid_id)}: {self.logIDT(bytes.fromhex(found['txid']))}"
-                        )
-                        continue
-                    txid_bytes = bytes.fromhex(found["txid"])
-                    self.log.debug(
-                        f"Found script via Electrum for bid {self.log.id(s.bid_id)}: {self.logIDT(txid_bytes)} {found['vout']}."
-                    )
-                    self.processFoundScript(coin_type, s, txid_bytes, found["vout"])
-            except Exception as e:
-                self.log.debug(f"checkWatchedScript error: {e}")
-
-        c["last_height_checked"] = chain_blocks
-
-    def _fetchSpendsElectrum(self, coin_type, watched_outputs, watched_scripts):
+    def _fetchSpendsElectrum(
+        self, coin_type, watched_outputs, watched_scripts, wait_for_script_conf=False
+    ):
         ci = self.ci(coin_type)
         results = {"outputs": [], "scripts": [], "chain_blocks": 0}
 
@@ -10351,61 +10702,174 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
             self.log.debug(f"_fetchSpendsElectrum getChainHeight error: {e}")
             return results
 
+        if self.delay_event.is_set():
+            return results
+        try:
+            spends, found_scripts = ci.checkWatchedBatch(
+                [(o.txid_hex, o.vout) for o in watched_outputs],
+                [s.script for s in watched_scripts],
+            )
+        except Exception as e:
+            self.log.debug(f"_fetchSpendsElectrum checkWatchedBatch error: {e}")
+            return results
+
         for o in watched_outputs:
-            if self.delay_event.is_set():
-                return results
+            spend_info = spends.get((o.txid_hex, o.vout))
+            if spend_info is None:
+                continue
+            if spend_info.get("height", 0) <= 0:
+                self.log.debug(
+                    f"Waiting for spend of {o.txid_hex}:{o.vout} to confirm: {self.logIDT(spend_info['txid'])}"
+                )
+                continue
             try:
-                spend_info = ci.checkWatchedOutput(o.txid_hex, o.vout)
-                if spend_info:
-                    if spend_info.get("height", 0) <= 0:
-                        self.log.debug(
-                            f"Waiting for spend of {o.txid_hex}:{o.vout} to confirm: {self.logIDT(spend_info['txid'])}"
-                        )
-                        continue
-                    raw_tx = ci.getBackend().getTransactionRaw(spend_info["txid"])
-                    if raw_tx:
-                        tx = ci.loadTx(bytes.fromhex(raw_tx))
-                        vin_list = []
-                        for idx, inp in enumerate(tx.vin):
-                            vin_entry = {
-                                "txid": f"{inp.prevout.hash:064x}",
-                                "vout": inp.prevout.n,
-                            }
-                            if tx.wit and idx < len(tx.wit.vtxinwit):
-                                wit = tx.wit.vtxinwit[idx]
-                                if wit.scriptWitness and wit.scriptWitness.stack:
-                                    vin_entry["txinwitness"] = [
-                                        item.hex() for item in wit.scriptWitness.stack
-                                    ]
-                            vin_list.append(vin_entry)
-                        tx_dict = {
-                            "txid": spend_info["txid"],
-                            "hex": raw_tx,
-                            "vin": vin_list,
-                            "vout": [
-                                {
-                                    "value": ci.format_amount(out.nValue),
-                                    "n": i,
-                                    "scriptPubKey": {"hex": out.scriptPubKey.hex()},
-                                }
-                                for i, out in enumerate(tx.vout)
-                            ],
-                        }
-                        results["outputs"].append((o, spend_info, tx_dict))
+                tx_dict = self._electrumSpendTxDict(ci, spend_info)
+                results["outputs"].append((o, spend_info, tx_dict))
             except Exception as e:
-                self.log.debug(f"_fetchSpendsElectrum checkWatchedOutput error: {e}")
+                self.log.debug(f"_fetchSpendsElectrum spend tx error: {e}")
 
         for s in watched_scripts:
-            if self.delay_event.is_set():
-                return results
+            found = found_scripts.get(s.script)
+            if found is None:
+                continue
+            if wait_for_script_conf and found.get("height", 0) <= 0:
+                self.log.debug(
+                    f"Waiting for watched script tx to confirm for bid {self.log.id(s.bid_id)}: {self.logIDT(bytes.fromhex(found['txid']))}"
+                )
+                continue
+            results["scripts"].append((s, found))
+
+        return results
+
+    @staticmethod
+    def _electrumWatchKeys(watched_outputs, watched_scripts) -> list:
+        keys = [("output", o.txid_hex, o.vout) for o in watched_outputs]
+        keys.extend(("script", s.script) for s in watched_scripts)
+        return keys
+
+    def _requestElectrumWatchSync(self, coin_type) -> None:
+        if self.coin_clients[coin_type].get("connection_type") == "electrum":
+            self._electrum_watch_sync_requested.add(coin_type)
+
+    def _queueElectrumWatchCheck(self, coin_type, scripthash: str) -> None:
+        # Called from the Electrum listener thread
+        with self._electrum_watch_lock:
+            self._electrum_watch_pending.setdefault(coin_type, set()).add(scripthash)
+
+    def _syncElectrumWatchSubscriptions(self, coin_type) -> None:
+        # Subscribe to the scripthash of each watched output and script and drop
+        # subscriptions no longer watched.
+        ci = self.ci(coin_type)
+        backend = ci.getBackend()
+        if backend is None:
+            return
+        c = self.coin_clients[coin_type]
+        if coin_type not in self._electrum_watch_scripthashes:
+            backend.setWatchCallback(self._queueElectrumWatchCheck)
+            self._electrum_watch_scripthashes[coin_type] = {}
+        subscribed = self._electrum_watch_scripthashes[coin_type]
+
+        keys = self._electrumWatchKeys(
+            list(c["watched_outputs"]), list(c["watched_scripts"])
+        )
+        for key in keys:
+            if key in subscribed or self.delay_event.is_set():
+                continue
             try:
-                found = ci.checkWatchedScript(s.script)
-                if found:
-                    results["scripts"].append((s, found))
+                if key[0] == "script":
+                    scripthash = ci.scriptToScripthash(key[1])
+                else:
+                    scripthash = ci.getWatchedOutputScripthash(key[1], key[2])
+                    if scripthash is None:
+                        # Retried after the next full check
+                        continue
+                status = backend.subscribeWatchScripthash(scripthash)
             except Exception as e:
-                self.log.debug(f"_fetchSpendsElectrum checkWatchedScript error: {e}")
+                self.log.debug(f"_syncElectrumWatchSubscriptions subscribe error: {e}")
+                continue
+            with self._electrum_watch_lock:
+                subscribed[key] = scripthash
+                if status is not None:
+                    # Has history already, check without waiting for a change
+                    self._electrum_watch_pending.setdefault(coin_type, set()).add(
+                        scripthash
+                    )
 
-        return results
+        removed = set(subscribed.keys()).difference(keys)
+        if len(removed) < 1:
+            return
+        with self._electrum_watch_lock:
+            old_scripthashes = set(subscribed[key] for key in removed)
+            for key in removed:
+                del subscribed[key]
+            old_scripthashes.difference_update(subscribed.values())
+        for scripthash in old_scripthashes:
+            try:
+                backend.unsubscribeWatchScripthash(scripthash)
+            except Exception as e:
+                self.log.debug(
+                    f"_syncElectrumWatchSubscriptions unsubscribe error: {e}"
+                )
+
+    def checkWatchedElectrum(self, coin_type, c, now: int) -> None:
+        # Check the watches whose scripthash status changed, all watches are
+        # checked every check_watched_electrum_seconds as a fallback.
+        sync_future = self._electrum_watch_sync_futures.get(coin_type)
+        if coin_type in self._electrum_watch_sync_requested and (
+            sync_future is None or sync_future.done()
+        ):
+            self._electrum_watch_sync_requested.discard(coin_type)
+            self._electrum_watch_sync_futures[coin_type] = self.thread_pool.submit(
+                self._syncElectrumWatchSubscriptions, coin_type
+            )
+
+        future = self._electrum_spend_check_futures.get(coin_type)
+        if future is not None and not future.done():
+            return
+        watched_outputs = list(c["watched_outputs"])
+        watched_scripts = list(c["watched_scripts"])
+        if len(watched_outputs) < 1 and len(watched_scripts) < 1:
+            return
+
+        with self._electrum_watch_lock:
+            subscribed = dict(self._electrum_watch_scripthashes.get(coin_type, {}))
+            pending = self._electrum_watch_pending.pop(coin_type, set())
+        keys = self._electrumWatchKeys(watched_outputs, watched_scripts)
+        all_subscribed: bool = all(key in subscribed for key in keys)
+        sweep_seconds: int = (
+            self.check_watched_electrum_seconds
+            if all_subscribed
+            else self.check_watched_seconds
+        )
+        last_sweep: int = self._electrum_watch_swept.get(coin_type, 0)
+        backend = self.ci(coin_type).getBackend()
+        # Notifications may have been missed while reconnecting
+        reconnected: bool = (
+            backend is not None and int(backend.getLastReconnectTime()) > last_sweep
+        )
+        if now - last_sweep >= sweep_seconds or reconnected:
+            self._electrum_watch_swept[coin_type] = now
+            if not all_subscribed:
+                self._electrum_watch_sync_requested.add(coin_type)
+        elif len(pending) > 0:
+            watched_outputs = [
+                o
+                for o in watched_outputs
+                if subscribed.get(("output", o.txid_hex, o.vout)) in pending
+            ]
+            watched_scripts = [
+                s
+                for s in watched_scripts
+                if subscribed.get(("script", s.script)) in pending
+            ]
+            if len(watched_outputs) < 1 and len(watched_scripts) < 1:
+                return
+        else:
+            return
+
+        self._electrum_spend_check_futures[coin_type] = self.thread_pool.submit(
+            self._fetchSpendsElectrum, coin_type, watched_outputs, watched_scripts
+        )
 
     def _processFetchedSpends(self, coin_type, results):
         c = self.coin_clients[coin_type]
@@ -10506,11 +10970,50 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 )
             )
 
+    def trackSmsgExpiry(self, msg) -> None:
+        # Messages missed here are found by the full sweep
+        if "sent" in msg and "ttl" in msg:
+            self._expiring_smsgs.add(msg["msgid"], msg["sent"] + msg["ttl"])
+
     def expireMessages(self) -> None:
         if self._is_locked is True:
             self.log.debug("Not expiring messages while system is locked")
             return
 
+        now: int = self.getTime()
+        if now - self._last_full_smsg_expiry >= self._full_smsg_expiry_seconds:
+            self.expireAllMessages(now)
+            self._last_full_smsg_expiry = now
+            return
+
+        # Delete only indexed messages that are due, mxDB is not needed
+        msg_ids = self._expiring_smsgs.popDue(now - 1)
+        if len(msg_ids) < 1:
+            return
+        options = {"encoding": "none", "delete": True}
+        num_removed: int = 0
+        try:
+            for i in range(0, len(msg_ids), self._smsg_delete_batch_size):
+                batch = msg_ids[i : i + self._smsg_delete_batch_size]
+                results = self.callcoinrpcbatch(
+                    Coins.PART,
+                    [("smsg", [msg_id, options]) for msg_id in batch],
+                    raise_errors=False,
+                )
+                for msg_id, result in zip(batch, results):
+                    if isinstance(result, Exception):
+                        # Likely already removed by the node
+                        self.log.debug(f"Failed to delete message {msg_id}: {result}")
+                        continue
+                    num_removed += 1
+        except Exception as e:
+            self.log.warning(f"Expiring indexed messages failed: {e}")
+            # Remaining popped ids are picked up by a full sweep
+            self._last_full_smsg_expiry = 0
+        self.log.info(f"Expired {num_removed} / {len(msg_ids)} messages.")
+
+    def expireAllMessages(self, now: int) -> None:
+        # Walk the whole inbox and outbox, rebuilds the expiry index
         self.mxDB.acquire()
         rpc_conn = None
         try:
@@ -10538,15 +11041,16 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                     if expire_at < now:
                         options = {"encoding": "none", "delete": True}
                         ci_part.json_request(rpc_conn, "smsg", [msg["msgid"], options])
+                        self._expiring_smsgs.remove(msg["msgid"])
                         num_removed += 1
                         return True
+                    self._expiring_smsgs.add(msg["msgid"], expire_at)
                     return False
                 except Exception as e:  # noqa: F841
                     if self.debug:
                         self.log.error(traceback.format_exc())
                         self.log.error(f"Failed to process message {msg}")
 
-            now: int = self.getTime()
             options = {
                 "encoding": "none",
                 "updatestatus": False,
@@ -10579,7 +11083,9 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 options["offset"] += len(outbox_messages) - loop_removed
 
             if num_messages + num_removed > 0:
-                self.log.info(f"Expired {num_removed} / {num_messages} messages.")
+                self.log.info(
+                    f"Expired {num_removed} / {num_messages} messages in full sweep."
+                )
 
         finally:
             if rpc_conn:
@@ -10912,7 +11418,8 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
             self.closeDBCursor(bids_cursor)
             self.closeDB(cursor)
 
-    def processOffer(self, msg) -> None:
+    def decodeOfferMsg(self, msg):
+        # Returns None if the offer should be ignored, raises if invalid
         offer_bytes = self.getSmsgMsgBytes(msg)
 
         msg_payload_version = self.getSmsgMsgPayloadVersion(msg)
@@ -10930,7 +11437,7 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                     getattr(offer_data, "protocol_version", -1)
                 )
             )
-            return
+            return None
         try:
             offer_data.from_bytes(offer_bytes)
         except Exception as e:
@@ -10939,7 +11446,7 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                     getattr(offer_data, "protocol_version", -1), str(e)
                 )
             )
-            return
+            return None
 
         # Validate offer data
         now: int = self.getTime()
@@ -10970,7 +11477,7 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
 
         if msg["sent"] + offer_data.time_valid < now:
             self.log.debug("Ignoring expired offer.")
-            return
+            return None
 
         self.validateMessageNets(offer_data.message_nets)
 
@@ -11013,6 +11520,110 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
         else:
             raise ValueError(f"Unknown swap type {offer_data.swap_type}.")
 
+        return offer_data, offer_bytes, msg_payload_version, offer_rate
+
+    def storeReceivedOffer(self, msg, decoded, pk_from: bytes, existing_offer, cursor):
+        # Returns the offer received notification data if the offer is new
+        offer_data, offer_bytes, msg_payload_version, offer_rate = decoded
+        offer_id = bytes.fromhex(msg["msgid"])
+        coin_from = Coins(offer_data.coin_from)
+        ci_from = self.ci(coin_from)
+        coin_to = Coins(offer_data.coin_to)
+        ci_to = self.ci(coin_to)
+        reverse_bid: bool = self.is_reverse_ads_bid(coin_from, coin_to)
+
+        notification = None
+        if existing_offer is None:
+
+            bid_reversed: bool = (
+                offer_data.swap_type == SwapTypes.XMR_SWAP
+                and self.is_reverse_ads_bid(offer_data.coin_from, offer_data.coin_to)
+            )
+            offer = Offer(
+                offer_id=offer_id,
+                active_ind=1,
+                protocol_version=offer_data.protocol_version,
+                coin_from=offer_data.coin_from,
+                coin_to=offer_data.coin_to,
+                amount_from=offer_data.amount_from,
+                amount_to=offer_data.amount_to,
+                rate=offer_rate,
+                min_bid_amount=offer_data.min_bid_amount,
+                time_valid=offer_data.time_valid,
+                lock_type=int(offer_data.lock_type),
+                lock_value=offer_data.lock_value,
+                swap_type=offer_data.swap_type,
+                amount_negotiable=offer_data.amount_negotiable,
+                rate_negotiable=offer_data.rate_negotiable,
+                addr_to=msg["to"],
+                addr_from=msg["from"],
+                pk_from=pk_from,
+                created_at=msg["sent"],
+                expire_at=msg["sent"] + offer_data.time_valid,
+                was_sent=False,
+                bid_reversed=bid_reversed,
+                auto_accept_type=(
+                    offer_data.auto_accept_type if b"\xa0\x01" in offer_bytes else None
+                ),
+                message_nets=offer_data.message_nets,
+                smsg_payload_version=msg_payload_version,
+            )
+            offer.setState(OfferStates.OFFER_RECEIVED)
+            self.add(offer, cursor)
+
+            if offer.swap_type == SwapTypes.XMR_SWAP:
+                xmr_offer = XmrOffer()
+
+                xmr_offer.offer_id = offer_id
+
+                chain_a_ci = ci_to if reverse_bid else ci_from
+                lock_value_2 = offer_data.lock_value
+                if (None, DebugTypes.OFFER_LOCK_2_VALUE_INC) in self._debug_cases:
+                    lock_value_2 += 1000
+                xmr_offer.lock_time_1 = chain_a_ci.getExpectedSequence(
+                    offer_data.lock_type, offer_data.lock_value
+                )
+                xmr_offer.lock_time_2 = chain_a_ci.getExpectedSequence(
+                    offer_data.lock_type, lock_value_2
+                )
+
+                xmr_offer.a_fee_rate = offer_data.fee_rate_from
+                xmr_offer.b_fee_rate = offer_data.fee_rate_to
+
+                self.add(xmr_offer, cursor)
+
+            notification = {
+                "offer_id": offer_id.hex(),
+                "coin_from": offer_data.coin_from,
+                "coin_to": offer_data.coin_to,
+                "amount_from": offer_data.amount_from,
+                "amount_to": offer_data.amount_to,
+            }
+        else:
+            if existing_offer.active_ind != 1:
+                raise RevokedOffer(
+                    f"Ignoring inactive offer {offer_id.hex()}, active_ind: {existing_offer.active_ind}."
+                )
+            if existing_offer.state != OfferStates.OFFER_RECEIVED:
+                existing_offer.setState(OfferStates.OFFER_RECEIVED)
+                existing_offer.pk_from = pk_from
+                self.add(existing_offer, cursor, upsert=True)
+        received_on_net: str = networkTypeToID(msg.get("type", "smsg"))
+        self.addMessageNetworkLink(
+            Concepts.OFFER,
+            offer_id,
+            MessageNetworkLinkTypes.RECEIVED_ON,
+            received_on_net,
+            cursor,
+        )
+        self._offers_version += 1
+        return notification
+
+    def processOffer(self, msg) -> None:
+        decoded = self.decodeOfferMsg(msg)
+        if decoded is None:
+            return
+
         offer_id = bytes.fromhex(msg["msgid"])
 
         if self.isOfferRevoked(offer_id, msg["from"]):
@@ -11021,7 +11632,7 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
         pk_from: bytes = getMsgPubkey(self, msg)
         try:
             cursor = self.openDB()
-            # Offers must be received on the public network_addr or manually created addresses
+            # Offers must be received on network_addr or manually created addresses
             if msg["to"] != self.network_addr:
                 # Double check active_ind, shouldn't be possible to receive message if not active
                 query_str = "SELECT COUNT(addr_id) FROM smsgaddresses WHERE addr = :addr AND use_type = :use_type AND active_ind = 1"
@@ -11034,97 +11645,11 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
 
             # Check for sent
             existing_offer = self.getOffer(offer_id, cursor=cursor)
-            if existing_offer is None:
-
-                bid_reversed: bool = (
-                    offer_data.swap_type == SwapTypes.XMR_SWAP
-                    and self.is_reverse_ads_bid(
-                        offer_data.coin_from, offer_data.coin_to
-                    )
-                )
-                offer = Offer(
-                    offer_id=offer_id,
-                    active_ind=1,
-                    protocol_version=offer_data.protocol_version,
-                    coin_from=offer_data.coin_from,
-                    coin_to=offer_data.coin_to,
-                    amount_from=offer_data.amount_from,
-                    amount_to=offer_data.amount_to,
-                    rate=offer_rate,
-                    min_bid_amount=offer_data.min_bid_amount,
-                    time_valid=offer_data.time_valid,
-                    lock_type=int(offer_data.lock_type),
-                    lock_value=offer_data.lock_value,
-                    swap_type=offer_data.swap_type,
-                    amount_negotiable=offer_data.amount_negotiable,
-                    rate_negotiable=offer_data.rate_negotiable,
-                    addr_to=msg["to"],
-                    addr_from=msg["from"],
-                    pk_from=pk_from,
-                    created_at=msg["sent"],
-                    expire_at=msg["sent"] + offer_data.time_valid,
-                    was_sent=False,
-                    bid_reversed=bid_reversed,
-                    auto_accept_type=(
-                        offer_data.auto_accept_type
-                        if b"\xa0\x01" in offer_bytes
-                        else None
-                    ),
-                    message_nets=offer_data.message_nets,
-                    smsg_payload_version=msg_payload_version,
-                )
-                offer.setState(OfferStates.OFFER_RECEIVED)
-                self.add(offer, cursor)
-
-                if offer.swap_type == SwapTypes.XMR_SWAP:
-                    xmr_offer = XmrOffer()
-
-                    xmr_offer.offer_id = offer_id
-
-                    chain_a_ci = ci_to if reverse_bid else ci_from
-                    lock_value_2 = offer_data.lock_value
-                    if (None, DebugTypes.OFFER_LOCK_2_VALUE_INC) in self._debug_cases:
-                        lock_value_2 += 1000
-                    xmr_offer.lock_time_1 = chain_a_ci.getExpectedSequence(
-                        offer_data.lock_type, offer_data.lock_value
-                    )
-                    xmr_offer.lock_time_2 = chain_a_ci.getExpectedSequence(
-                        offer_data.lock_type, lock_value_2
-                    )
-
-                    xmr_offer.a_fee_rate = offer_data.fee_rate_from
-                    xmr_offer.b_fee_rate = offer_data.fee_rate_to
-
-                    self.add(xmr_offer, cursor)
-
-                self.notify(
-                    NT.OFFER_RECEIVED,
-                    {
-                        "offer_id": offer_id.hex(),
-                        "coin_from": offer_data.coin_from,
-                        "coin_to": offer_data.coin_to,
-                        "amount_from": offer_data.amount_from,
-                        "amount_to": offer_data.amount_to,
-                    },
-                    cursor,
-                )
-            else:
-                if existing_offer.active_ind != 1:
-                    raise RevokedOffer(
-                        f"Ignoring inactive offer {offer_id.hex()}, active_ind: {existing_offer.active_ind}."
-                    )
-                if existing_offer.state != OfferStates.OFFER_RECEIVED:
-                    existing_offer.setState(OfferStates.OFFER_RECEIVED)
-                    existing_offer.pk_from = pk_from
-                    self.add(existing_offer, cursor, upsert=True)
-            received_on_net: str = networkTypeToID(msg.get("type", "smsg"))
-            self.addMessageNetworkLink(
-                Concepts.OFFER,
-                offer_id,
-                MessageNetworkLinkTypes.RECEIVED_ON,
-                received_on_net,
-                cursor,
+            notification = self.storeReceivedOffer(
+                msg, decoded, pk_from, existing_offer, cursor
             )
+            if notification is not None:
+                self.notify(NT.OFFER_RECEIVED, notification, cursor)
         finally:
             self.closeDB(cursor)
 
@@ -11182,14 +11707,14 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
         finally:
             self.closeDB(cursor)
 
+        if revoked:
+            self._offers_version += 1
         if revoked and self.ws_server:
-            self.ws_server.send_message_to_all(
-                json.dumps(
-                    {
-                        "event": "offer_revoked",
-                        "offer_id": msg_data.offer_msg_id.hex(),
-                    }
-                )
+            self.ws_broadcaster.broadcast(
+                {
+                    "event": "offer_revoked",
+                    "offer_id": msg_data.offer_msg_id.hex(),
+                }
             )
 
     def getCompletedAndActiveBidsValue(self, offer, cursor):
@@ -14030,6 +14555,7 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
             self.saveBidInSession(bid_id, bid, cursor)
 
     def processMsg(self, msg) -> None:
+        msg_type = None
         try:
             if "hex" not in msg:
                 if self.debug:
@@ -14081,13 +14607,17 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
             elif msg_type == MessageTypes.PORTAL_SEND:
                 self.processPortalMessage(msg)
 
-        except InactiveCoin as ex:
+        except Exception as ex:
+            self.handleMsgError(msg, msg_type, ex)
+
+    def handleMsgError(self, msg, msg_type, ex) -> None:
+        if isinstance(ex, InactiveCoin):
             self.log.debug(
                 f"Ignoring message involving inactive coin {Coins(ex.coinid).name}, type {MessageTypes(msg_type).name}."
             )
-        except RevokedOffer as ex:
+        elif isinstance(ex, RevokedOffer):
             self.log.debug(str(ex))
-        except Exception as ex:
+        else:
             self.log.error(f"processMsg {ex}")
             if self.debug:
                 self.log.error(traceback.format_exc())
@@ -14099,6 +14629,115 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                     None,
                 )
 
+    def processMsgs(self, msgs) -> None:
+        # Runs of consecutive smsg offers are stored in one batch, message order is kept
+        offer_msgs = []
+        for msg in msgs:
+            self.trackSmsgExpiry(msg)
+            if self.isSmsgOfferMsg(msg):
+                offer_msgs.append(msg)
+                continue
+            if len(offer_msgs) > 0:
+                self.processOffers(offer_msgs)
+                offer_msgs = []
+            self.processMsg(msg)
+        if len(offer_msgs) > 0:
+            self.processOffers(offer_msgs)
+
+    def isSmsgOfferMsg(self, msg) -> bool:
+        if "hex" not in msg or msg.get("msg_net", "smsg") != "smsg":
+            return False
+        try:
+            return int(msg["hex"][:2], 16) == MessageTypes.OFFER
+        except ValueError:
+            return False
+
+    def processOffers(self, msgs) -> None:
+        if len(msgs) < 2:
+            for msg in msgs:
+                self.processMsg(msg)
+            return
+
+        received = []
+        for msg in msgs:
+            self.num_smsg_messages_received += 1
+            try:
+                decoded = self.decodeOfferMsg(msg)
+                if decoded is not None:
+                    received.append((msg, bytes.fromhex(msg["msgid"]), decoded))
+            except Exception as ex:
+                self.handleMsgError(msg, MessageTypes.OFFER, ex)
+        if len(received) < 1:
+            return
+
+        possibly_revoked = set(pair[0] for pair in self._possibly_revoked_offers)
+        try:
+            pubkeys = getMsgPubkeys(self, [msg for msg, _, _ in received])
+        except Exception as ex:
+            for msg, _, _ in received:
+                self.handleMsgError(msg, MessageTypes.OFFER, ex)
+            return
+
+        notifications = []
+        try:
+            cursor = self.openDB()
+            existing_ids = self.getExistingOfferIds(
+                [offer_id for _, offer_id, _ in received], cursor
+            )
+            # Offers must be received on network_addr or manually created addresses
+            recv_addrs = self.getActiveRecvOfferAddrs(
+                {msg["to"] for msg, _, _ in received if msg["to"] != self.network_addr},
+                cursor,
+            )
+            for msg, offer_id, decoded in received:
+                try:
+                    if offer_id in possibly_revoked and self.isOfferRevoked(
+                        offer_id, msg["from"]
+                    ):
+                        raise RevokedOffer(f"Offer has been revoked {offer_id.hex()}.")
+                    if msg["to"] != self.network_addr and msg["to"] not in recv_addrs:
+                        raise ValueError("Offer received on incorrect address")
+                    pk_from = pubkeys[msg["from"]]
+                    if isinstance(pk_from, Exception):
+                        raise pk_from
+
+                    existing_offer = None
+                    if offer_id in existing_ids:
+                        existing_offer = self.getOffer(offer_id, cursor=cursor)
+                    notification = self.storeReceivedOffer(
+                        msg, decoded, pk_from, existing_offer, cursor
+                    )
+                    existing_ids.add(offer_id)
+                    if notification is not None:
+                        notifications.append(notification)
+                except Exception as ex:
+                    self.handleMsgError(msg, MessageTypes.OFFER, ex)
+        finally:
+            self.closeDB(cursor)
+
+        self.notifyBatch(NT.OFFER_RECEIVED, notifications)
+
+    def getExistingOfferIds(self, offer_ids, cursor) -> set:
+        rv = set()
+        for i in range(0, len(offer_ids), 500):
+            batch = offer_ids[i : i + 500]
+            ids_str = ", ".join(["?"] * len(batch))
+            query = f"SELECT offer_id FROM offers WHERE offer_id IN ({ids_str})"
+            for row in cursor.execute(query, batch):
+                rv.add(row[0])
+        return rv
+
+    def getActiveRecvOfferAddrs(self, addrs, cursor) -> set:
+        addrs = list(addrs)
+        rv = set()
+        for i in range(0, len(addrs), 500):
+            batch = addrs[i : i + 500]
+            addrs_str = ", ".join(["?"] * len(batch))
+            query = f"SELECT addr FROM smsgaddresses WHERE addr IN ({addrs_str}) AND use_type = ? AND active_ind = 1"
+            for row in cursor.execute(query, batch + [int(AddressTypes.RECV_OFFER)]):
+                rv.add(row[0])
+        return rv
+
     def processZmqHashwtx(self, message) -> None:
         try:
             if Coins.PART not in self.coin_clients:
@@ -14125,19 +14764,10 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 self.log.error(traceback.format_exc())
 
     def expireBidsAndOffers(self, now) -> None:
-        bids_to_expire = set()
-        offers_to_expire = set()
+        bids_to_expire = set(self._expiring_bids.popDue(now))
+        offers_to_expire = set(self._expiring_offers.popDue(now))
         check_records: bool = False
 
-        for i, (bid_id, expired_at) in enumerate(self._expiring_bids):
-            if expired_at <= now:
-                bids_to_expire.add(bid_id)
-                self._expiring_bids.pop(i)
-        for i, (offer_id, expired_at) in enumerate(self._expiring_offers):
-            if expired_at <= now:
-                offers_to_expire.add(offer_id)
-                self._expiring_offers.pop(i)
-
         if (
             now - self._last_checked_expiring_bids_offers
             >= self.check_expiring_bids_offers_seconds
@@ -14176,63 +14806,50 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                     expire_at = entry[2]
                     if entry[0] == 1:
                         if expire_at > now:
-                            self._expiring_bids.append((record_id, expire_at))
+                            self._expiring_bids.add(record_id, expire_at)
                         else:
                             bids_to_expire.add(record_id)
                     elif entry[0] == 2:
                         if expire_at > now:
-                            self._expiring_offers.append((record_id, expire_at))
+                            self._expiring_offers.add(record_id, expire_at)
                         else:
                             offers_to_expire.add(record_id)
 
-            for bid_id in bids_to_expire:
-                query = "SELECT b.states FROM bids AS b, bidstates AS s WHERE b.bid_id = :bid_id AND b.active_ind = 1 AND s.state_id = b.state AND s.can_expire"
+            bid_ids = list(bids_to_expire)
+            for i in range(0, len(bid_ids), self._expire_batch_size):
+                batch = bid_ids[i : i + self._expire_batch_size]
+                ids_str = ", ".join(["?"] * len(batch))
+                query = f"""UPDATE bids SET state = ?, states = CAST(COALESCE(states, X'') || ? AS BLOB)
+                            WHERE bid_id IN ({ids_str}) AND active_ind = 1
+                            AND state IN (SELECT state_id FROM bidstates WHERE can_expire)"""
+                new_state: int = int(BidStates.BID_EXPIRED)
+                cursor.execute(query, [new_state, pack_state(new_state, now)] + batch)
+                bids_expired += cursor.rowcount
+
+            offer_ids = list(offers_to_expire)
+            for i in range(0, len(offer_ids), self._expire_batch_size):
+                batch = offer_ids[i : i + self._expire_batch_size]
+                ids_str = ", ".join(["?"] * len(batch))
+                query = f"SELECT offer_id FROM offers WHERE offer_id IN ({ids_str}) AND active_ind = 1 AND state IN (?, ?)"
                 rows = cursor.execute(
                     query,
-                    {
-                        "bid_id": bid_id,
-                    },
-                ).fetchall()
-                if len(rows) > 0:
-                    new_state: int = int(BidStates.BID_EXPIRED)
-                    states = (
-                        bytes() if rows[0][0] is None else rows[0][0]
-                    ) + pack_state(new_state, now)
-                    query = "UPDATE bids SET state = :new_state, states = :states WHERE bid_id = :bid_id"
-                    cursor.execute(
-                        query,
-                        {"bid_id": bid_id, "new_state": new_state, "states": states},
-                    )
-                    bids_expired += 1
-            for offer_id in offers_to_expire:
-                query = "SELECT states FROM offers WHERE offer_id = :offer_id AND active_ind = 1 AND state IN (:offer_received, :offer_sent)"
-                rows = cursor.execute(
-                    query,
-                    {
-                        "offer_id": offer_id,
-                        "offer_received": int(OfferStates.OFFER_RECEIVED),
-                        "offer_sent": int(OfferStates.OFFER_SENT),
-                    },
+                    batch
+                    + [int(OfferStates.OFFER_RECEIVED), int(OfferStates.OFFER_SENT)],
                 ).fetchall()
-                if len(rows) > 0:
-                    new_state: int = int(OfferStates.OFFER_EXPIRED)
-                    states = (
-                        bytes() if rows[0][0] is None else rows[0][0]
-                    ) + pack_state(new_state, now)
-                    query = "UPDATE offers SET state = :new_state, states = :states WHERE offer_id = :offer_id"
-                    cursor.execute(
-                        query,
-                        {
-                            "offer_id": offer_id,
-                            "new_state": new_state,
-                            "states": states,
-                        },
-                    )
-                    offers_expired += 1
-                    expired_offer_ids.append(offer_id)
+                if len(rows) < 1:
+                    continue
+                batch = [row[0] for row in rows]
+                ids_str = ", ".join(["?"] * len(batch))
+                query = f"UPDATE offers SET state = ?, states = CAST(COALESCE(states, X'') || ? AS BLOB) WHERE offer_id IN ({ids_str})"
+                new_state: int = int(OfferStates.OFFER_EXPIRED)
+                cursor.execute(query, [new_state, pack_state(new_state, now)] + batch)
+                offers_expired += len(batch)
+                expired_offer_ids.extend(batch)
         finally:
             self.closeDB(cursor)
 
+        if offers_expired > 0:
+            self._offers_version += 1
         if bids_expired + offers_expired > 0:
             mb = "" if bids_expired == 1 else "s"
             mo = "" if offers_expired == 1 else "s"
@@ -14245,8 +14862,8 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 offer_id_hex = (
                     offer_id.hex() if hasattr(offer_id, "hex") else str(offer_id)
                 )
-                self.ws_server.send_message_to_all(
-                    json.dumps({"event": "offer_expired", "offer_id": offer_id_hex})
+                self.ws_broadcaster.broadcast(
+                    {"event": "offer_expired", "offer_id": offer_id_hex}
                 )
 
     def update(self) -> None:
@@ -14286,27 +14903,51 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
 
             to_remove = []
             if now - self._last_checked_progress >= self.check_progress_seconds:
-                for bid_id, v in list(self.swaps_in_progress.items()):
-                    bid, offer = v
-                    try:
-                        if self.checkBidState(bid_id, bid, offer) is True:
-                            to_remove.append((bid_id, bid, offer))
-                    except Exception as ex:
-                        if self.debug:
-                            self.log.error("checkBidState %s", traceback.format_exc())
-                        if self.is_transient_error(ex):
-                            self.log.warning(
-                                f"checkBidState {self.log.id(bid_id)} {ex}."
-                            )
-                            self.logBidEvent(
-                                bid_id,
-                                EventLogTypes.SYSTEM_WARNING,
-                                "No connection to daemon",
-                                cursor=None,
-                            )
-                        else:
-                            self.log.error(f"checkBidState {self.log.id(bid_id)} {ex}.")
-                            self.setBidError(bid, str(ex))
+                pass_start = time.time()
+                self._chain_query_prefetcher = None
+                if self._bid_check_pool and len(self.swaps_in_progress) > 1:
+                    self._chain_query_prefetcher = self.prefetchBidStateQueries()
+                try:
+                    for bid_id, v in list(self.swaps_in_progress.items()):
+                        bid, offer = v
+                        try:
+                            if self.checkBidState(bid_id, bid, offer) is True:
+                                to_remove.append((bid_id, bid, offer))
+                        except Exception as ex:
+                            if self.debug:
+                                self.log.error(
+                                    "checkBidState %s", traceback.format_exc()
+                                )
+                            if self.is_transient_error(ex):
+                                self.log.warning(
+                                    f"checkBidState {self.log.id(bid_id)} {ex}."
+                                )
+                                self.logBidEvent(
+                                    bid_id,
+                                    EventLogTypes.SYSTEM_WARNING,
+                                    "No connection to daemon",
+                                    cursor=None,
+                                )
+                            else:
+                                self.log.error(
+                                    f"checkBidState {self.log.id(bid_id)} {ex}."
+                                )
+                                self.setBidError(bid, str(ex))
+                finally:
+                    # Never leave stale results installed for other callers
+                    prefetcher = self._chain_query_prefetcher
+                    self._chain_query_prefetcher = None
+                    if prefetcher is not None:
+                        prefetcher.close()
+                self._last_bid_check_seconds = time.time() - pass_start
+                if len(self.swaps_in_progress) > 0:
+                    self.log.debug(
+                        f"Checked {len(self.swaps_in_progress)} bids in {self._last_bid_check_seconds:.3f}s."
+                    )
+                if self._last_bid_check_seconds > self.check_progress_seconds:
+                    self.log.warning(
+                        f"Checking bids took {self._last_bid_check_seconds:.1f}s, longer than check_progress_seconds."
+                    )
 
                 for bid_id, bid, offer in to_remove:
                     self.deactivateBid(None, offer, bid)
@@ -14337,24 +14978,21 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                         or k == Coins.LTC_MWEB
                     ):
                         continue
+                    if c.get("connection_type") == "electrum":
+                        continue
                     if len(c["watched_outputs"]) > 0 or len(c["watched_scripts"]):
-                        if c.get("connection_type") == "electrum":
-                            if (
-                                k not in self._electrum_spend_check_futures
-                                or self._electrum_spend_check_futures[k].done()
-                            ):
-                                self._electrum_spend_check_futures[k] = (
-                                    self.thread_pool.submit(
-                                        self._fetchSpendsElectrum,
-                                        k,
-                                        list(c["watched_outputs"]),
-                                        list(c["watched_scripts"]),
-                                    )
-                                )
-                        else:
-                            self.checkForSpends(k, c)
+                        self.checkForSpends(k, c)
                 self._last_checked_watched = now
 
+            for k, c in self.coin_clients.items():
+                if c.get("connection_type") != "electrum" or k in (
+                    Coins.PART_ANON,
+                    Coins.PART_BLIND,
+                    Coins.LTC_MWEB,
+                ):
+                    continue
+                self.checkWatchedElectrum(k, c, now)
+
             if now - self._last_checked_expired >= self.check_expired_seconds:
                 self.expireMessages()
                 self.expireMessageRoutes()
@@ -15224,20 +15862,31 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
     def addWalletInfoRecord(self, coin, info_type, wi) -> None:
         coin_id = int(coin)
         now: int = self.getTime()
+        wallet_data: str = json.dumps(wi)
         cursor = self.openDB()
         try:
             self.add(
                 Wallets(
                     coin_id=coin,
                     balance_type=info_type,
-                    wallet_data=json.dumps(wi),
+                    wallet_data=wallet_data,
                     created_at=now,
                 ),
                 cursor,
             )
-            query_str = "DELETE FROM wallets WHERE (coin_id = :coin_id AND balance_type = :info_type) AND record_id NOT IN (SELECT record_id FROM wallets WHERE coin_id = :coin_id AND balance_type = :info_type ORDER BY created_at DESC LIMIT 3 )"
-            cursor.execute(query_str, {"coin_id": coin_id, "info_type": info_type})
+            query_str = "DELETE FROM wallets WHERE (coin_id = :coin_id AND balance_type = :info_type) AND record_id NOT IN (SELECT record_id FROM wallets WHERE coin_id = :coin_id AND balance_type = :info_type ORDER BY created_at DESC LIMIT :keep )"
+            cursor.execute(
+                query_str,
+                {
+                    "coin_id": coin_id,
+                    "info_type": info_type,
+                    "keep": self._keep_wallet_info_records,
+                },
+            )
             self.commitDB()
+            with self._wallets_info_cache_lock:
+                if self._wallets_info_cache is not None:
+                    self._wallets_info_cache[(coin_id, info_type)] = (wallet_data, now)
         except Exception as e:
             self.log.error(f"addWalletInfoRecord {e}.")
         finally:
@@ -15329,9 +15978,17 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 cached_address=cached_address,
             )
 
+            # Find used addresses past the pre-derived range
+            addresses_found = 0
+            if ci.useBackend():
+                addresses_found = self._wallet_manager.scanForFundedAddresses(
+                    coin_type, ci.getBackend()
+                )
+
             return {
                 "success": True,
                 "addresses_imported": added,
+                "addresses_found": addresses_found,
                 "full_node_available": len(full_node_addresses) > 0,
             }
         except Exception as e:
@@ -15441,60 +16098,84 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
 
         return rv
 
+    def getWalletsInfoCache(self, cursor) -> dict:
+        with self._wallets_info_cache_lock:
+            if self._wallets_info_cache is None:
+                # Only read once, addWalletInfoRecord keeps the cache current
+                inner_str = "SELECT coin_id, balance_type, MAX(created_at) as max_created_at FROM wallets GROUP BY coin_id, balance_type"
+                query_str = f"SELECT a.coin_id, a.balance_type, wallet_data, created_at FROM wallets a, ({inner_str}) b WHERE a.coin_id = b.coin_id AND a.balance_type = b.balance_type AND a.created_at = b.max_created_at"
+                self._wallets_info_cache = {
+                    (row[0], row[1]): (row[2], row[3])
+                    for row in cursor.execute(query_str)
+                }
+            return dict(self._wallets_info_cache)
+
     def getCachedWalletsInfo(self, opts=None):
         rv = {}
+        filter_coin_id = None
+        if opts is not None and "coin_id" in opts:
+            filter_coin_id = int(opts["coin_id"])
+        cursor = self.openDBRead()
         try:
-            cursor = self.openDB()
-            query_data: dict = {}
-            where_str = ""
-            if opts is not None and "coin_id" in opts:
-                where_str = "WHERE coin_id = :coin_id"
-                query_data["coin_id"] = opts["coin_id"]
-            inner_str = f"SELECT coin_id, balance_type, MAX(created_at) as max_created_at FROM wallets {where_str} GROUP BY coin_id, balance_type"
-            query_str = f"SELECT a.coin_id, a.balance_type, wallet_data, created_at FROM wallets a, ({inner_str}) b WHERE a.coin_id = b.coin_id AND a.balance_type = b.balance_type AND a.created_at = b.max_created_at"
-
-            q = cursor.execute(query_str, query_data)
-            for row in q:
-                coin_id = row[0]
-
+            wallets_info = self.getWalletsInfoCache(cursor)
+            entries = []
+            for key in sorted(wallets_info.keys()):
+                coin_id, balance_type = key
+                if filter_coin_id is not None and coin_id != filter_coin_id:
+                    continue
                 if self.isCoinActive(coin_id) is False:
                     # Skip cached info if coin was disabled
                     continue
+                entries.append((coin_id, balance_type) + wallets_info[key])
 
-                wallet_data = json.loads(row[2])
-                if row[1] == 1:
-                    wallet_data["lastupdated"] = row[3]
-                    wallet_data["updating"] = self._updating_wallets_info.get(
-                        coin_id, False
-                    )
-
-                    # Ensure the latest addresses are displayed
+            # Ensure the latest addresses are displayed
+            address_keys = []
+            for coin_id, balance_type, _, _ in entries:
+                if balance_type == 1:
                     coin_name: str = chainparams[coin_id]["name"]
-                    c2 = self.getNewDBCursor()
-                    q2 = c2.execute(
-                        "SELECT key, value FROM kv_string WHERE key = ? OR key = ?",
-                        (f"receive_addr_{coin_name}", f"stealth_addr_{coin_name}"),
-                    )
-                    for row2 in q2:
-                        if row2[0].startswith("stealth"):
-                            if coin_id == Coins.LTC:
-                                wallet_data["mweb_address"] = row2[1]
-                            elif coin_id == Coins.FIRO:
-                                wallet_data["spark_address"] = row2[1]
-                            else:
-                                wallet_data["stealth_address"] = row2[1]
-                        else:
-                            wallet_data["deposit_address"] = row2[1]
-                    c2.close()
-
-                if coin_id in rv:
-                    rv[coin_id].update(wallet_data)
-                else:
-                    rv[coin_id] = wallet_data
+                    address_keys += [
+                        f"receive_addr_{coin_name}",
+                        f"stealth_addr_{coin_name}",
+                    ]
+            addresses = {}
+            if len(address_keys) > 0:
+                keys_str = ", ".join(["?"] * len(address_keys))
+                q = cursor.execute(
+                    f"SELECT key, value FROM kv_string WHERE key IN ({keys_str})",
+                    address_keys,
+                )
+                for row in q:
+                    addresses[row[0]] = row[1]
         finally:
-            self.closeDB(cursor)
+            self.closeDBRead(cursor)
+
+        for coin_id, balance_type, wallet_data, created_at in entries:
+            wallet_data = json.loads(wallet_data)
+            if balance_type == 1:
+                wallet_data["lastupdated"] = created_at
+                wallet_data["updating"] = self._updating_wallets_info.get(
+                    coin_id, False
+                )
+
+                coin_name: str = chainparams[coin_id]["name"]
+                stealth_address = addresses.get(f"stealth_addr_{coin_name}")
+                if stealth_address is not None:
+                    if coin_id == Coins.LTC:
+                        wallet_data["mweb_address"] = stealth_address
+                    elif coin_id == Coins.FIRO:
+                        wallet_data["spark_address"] = stealth_address
+                    else:
+                        wallet_data["stealth_address"] = stealth_address
+                deposit_address = addresses.get(f"receive_addr_{coin_name}")
+                if deposit_address is not None:
+                    wallet_data["deposit_address"] = deposit_address
 
-        if opts is not None and "coin_id" in opts:
+            if coin_id in rv:
+                rv[coin_id].update(wallet_data)
+            else:
+                rv[coin_id] = wallet_data
+
+        if filter_coin_id is not None:
             return rv
 
         for c in self.activeCoins():
@@ -15522,8 +16203,15 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
         finally:
             self.closeDB(cursor, commit=False)
 
-    def listOffers(self, sent: bool = False, filters={}):
-        cursor = self.openDB()
+    def listOffers(
+        self,
+        sent: bool = False,
+        filters={},
+        with_info: bool = False,
+        with_extra_info: bool = False,
+    ):
+        # with_info returns (offer, getOffersListInfo entry) pairs
+        cursor = self.openDBRead()
         try:
             rv = []
             now: int = self.getTime()
@@ -15589,9 +16277,12 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 except Exception as e:  # noqa: F841
                     continue
                 rv.append(offer)
+            if with_info:
+                info = self.getOffersListInfo(rv, cursor, with_extra_info)
+                return [(offer, info[offer.offer_id]) for offer in rv]
             return rv
         finally:
-            self.closeDB(cursor, commit=False)
+            self.closeDBRead(cursor)
 
     def activeBidsQueryStr(
         self, offer_table: str = "offers", bids_table: str = "bids"
@@ -15610,7 +16301,7 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
         for_html: bool = False,
         filters={},
     ):
-        cursor = self.openDB()
+        cursor = self.openDBRead()
         try:
             rv = []
             now: int = self.getTime()
@@ -15696,7 +16387,7 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
                 rv.append(result)
             return rv
         finally:
-            self.closeDB(cursor, commit=False)
+            self.closeDBRead(cursor)
 
     def listSwapsInProgress(self, for_html=False):
         self.mxDB.acquire()
@@ -16872,12 +17563,18 @@ class BasicSwap(BaseApp, BSXNetwork, UIApp):
         )
 
     def ws_new_client(self, client, server):
-        pass
+        self.ws_broadcaster.addClient(client)
 
     def ws_client_left(self, client, server):
-        pass
+        self.ws_broadcaster.removeClient(client)
 
     def ws_message_received(self, client, server, message):
+        try:
+            if self.ws_broadcaster.handleClientMessage(client, message):
+                return
+        except Exception as e:
+            self.log.debug(f'ws_message_received {client["id"]} error: {e}')
+            return
         if len(message) > 200:
             message = message[:200] + ".."
         self.log.debug(f'ws_message_received {client["id"]} {message}')
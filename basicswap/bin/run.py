@@ -224,7 +224,9 @@ def startXmrDaemon(node_dir, bin_dir, daemon_bin, opts=[]):
     )
 
 
-def startXmrWalletDaemon(node_dir, bin_dir, wallet_bin, opts=[]):
+def startXmrWalletDaemon(
+    node_dir, bin_dir, wallet_bin, opts=[], log_prefix: str = "wallet"
+):
     daemon_path = os.path.expanduser(os.path.join(bin_dir, wallet_bin))
     args = [daemon_path]
 
@@ -273,8 +275,8 @@ def startXmrWalletDaemon(node_dir, bin_dir, wallet_bin, opts=[]):
     logger.debug("Arguments {}".format(" ".join(args)))
 
     # TODO: return subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=data_dir)
-    wallet_stdout = open(os.path.join(data_dir, "wallet_stdout.log"), "w")
-    wallet_stderr = open(os.path.join(data_dir, "wallet_stderr.log"), "w")
+    wallet_stdout = open(os.path.join(data_dir, f"{log_prefix}_stdout.log"), "w")
+    wallet_stderr = open(os.path.join(data_dir, f"{log_prefix}_stderr.log"), "w")
     return Daemon(
         subprocess.Popen(
             args,
@@ -511,6 +513,26 @@ def runClient(
                     pid = daemons[-1].handle.pid
                     swap_client.log.info(f"Started {filename} {pid}")
 
+                    # Workers share the wallet dir and config of the main wallet-rpc
+                    for port in v.get("swap_wallet_rpc_ports", []):
+                        worker_opts = wallet_opts + [
+                            "--rpc-bind-port",
+                            str(port),
+                            "--log-file",
+                            os.path.join(v["datadir"], "wallets", f"wallet_{port}.log"),
+                        ]
+                        daemons.append(
+                            startXmrWalletDaemon(
+                                v["datadir"],
+                                v["bindir"],
+                                filename,
+                                worker_opts,
+                                log_prefix=f"wallet_{port}",
+                            )
+                        )
+                        pid = daemons[-1].handle.pid
+                        swap_client.log.info(f"Started {filename} {pid} on port {port}")
+
                 continue  # /monero
 
             if c == "decred":
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 The Basicswap developers
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE or http://www.opensource.org/licenses/mit-license.php.
+
+import collections
+
+
+class BlockPrefetcher:
+    """Fetch blocks ahead of the chain scanner.
+
+    Up to window blocks are requested concurrently on the executor, results are
+    returned strictly in height order.  Requesting a height other than the next
+    expected one (after a reorg step back or a jump to the prune height)
+    discards the queued requests and restarts the window from that height.
+    """
+
+    def __init__(self, executor, fetch_block, window: int):
+        self._executor = executor
+        self._fetch_block = fetch_block
+        self._window = max(1, window)
+        self._pending = collections.deque()
+        self._next_height = None
+
+    def reset(self, height: int = None) -> None:
+        while self._pending:
+            _, future = self._pending.popleft()
+            future.cancel()
+        self._next_height = height
+
+    def close(self) -> None:
+        self.reset()
+
+    def getBlock(self, height: int, max_height: int):
+        if self._executor is None or self._window < 2:
+            return self._fetch_block(height)
+
+        if len(self._pending) < 1 or self._pending[0][0] != height:
+            self.reset(height)
+
+        while (
+            len(self._pending) < self._window and self._next_height <= max_height
+        ) or len(self._pending) < 1:
+            self._pending.append(
+                (
+                    self._next_height,
+                    self._executor.submit(self._fetch_block, self._next_height),
+                )
+            )
+            self._next_height += 1
+
+        _, future = self._pending.popleft()
+        try:
+            return future.result()
+        except Exception:
+            # Blocks after a failed fetch will be requested again
+            self.reset()
+            raise
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 The Basicswap developers
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE or http://www.opensource.org/licenses/mit-license.php.
+
+import concurrent.futures
+
+
+class ChainQueryPrefetcher:
+    """Run read-only chain queries for the bids in progress concurrently.
+
+    Queries are grouped by coin and each coin's queries are split over at most
+    workers tasks, so no daemon receives more than workers concurrent requests.
+    The bid state checks still run serially and collect the results through
+    call(), a query that wasn't prefetched or that failed is run directly.
+    """
+
+    def __init__(self, executor, workers: int):
+        self._executor = executor
+        self._workers = max(1, workers)
+        self._queued = {}
+        self._results = {}
+        self._tasks = []
+
+    @staticmethod
+    def _key(ci, method: str, args, kwargs):
+        key = (id(ci), method, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def add(self, ci, method: str, *args, **kwargs) -> None:
+        key = self._key(ci, method, args, kwargs)
+        if key is None or key in self._queued or key in self._results:
+            return
+        self._queued[key] = (ci, method, args, kwargs)
+
+    def start(self) -> None:
+        by_coin = {}
+        for key, query in self._queued.items():
+            by_coin.setdefault(query[0].coin_type(), []).append(key)
+
+        for keys in by_coin.values():
+            num_tasks = min(self._workers, len(keys))
+            for i in range(num_tasks):
+                task_queries = []
+                for key in keys[i::num_tasks]:
+                    future = concurrent.futures.Future()
+                    self._results[key] = future
+                    task_queries.append((self._queued[key], future))
+                self._tasks.append(self._executor.submit(self._run, task_queries))
+        self._queued.clear()
+
+    @staticmethod
+    def _run(task_queries) -> None:
+        for (ci, method, args, kwargs), future in task_queries:
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(getattr(ci, method)(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
+    def call(self, ci, method: str, *args, **kwargs):
+        key = self._key(ci, method, args, kwargs)
+        future = None if key is None else self._results.get(key)
+        if future is not None and not future.cancelled():
+            try:
+                return future.result()
+            except Exception:
+                # Run the query again serially, errors are raised from there
+                pass
+        return getattr(ci, method)(*args, **kwargs)
+
+    def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for future in self._results.values():
+            future.cancel()
+        self._tasks.clear()
+        self._results.clear()
@@ -6,13 +6,14 @@
 # file LICENSE or http://www.opensource.org/licenses/mit-license.php.
 
 import inspect
+import queue
 import sqlite3
 import time
 
 from enum import IntEnum, auto
 from typing import Optional
 
-CURRENT_DB_VERSION = 37
+CURRENT_DB_VERSION = 38
 CURRENT_DB_DATA_VERSION = 9
 
 
@@ -71,6 +72,43 @@ def pack_state(new_state: int, now: int) -> bytes:
     return int(new_state).to_bytes(4, "little") + now.to_bytes(8, "little")
 
 
+class TableInfo:
+    """Column metadata for a Table class, gathered once on first use."""
+
+    def __init__(self, table_class):
+        self.table_name = getattr(table_class, "__tablename__", None)
+        # Sorted by name, matching the order inspect.getmembers returns
+        self.columns = tuple(
+            (mc_name, mc_obj.column_type)
+            for mc_name, mc_obj in inspect.getmembers(table_class)
+            if hasattr(mc_obj, "__sqlite3_column__")
+        )
+        self.column_names = tuple(c[0] for c in self.columns)
+        self.bool_columns = frozenset(c[0] for c in self.columns if c[1] == "bool")
+        self.unset_values = dict.fromkeys(self.column_names)
+        self.select_strs = {}
+
+
+_table_info = {}
+_statement_cache = {}
+_max_cached_statements = 2048
+
+
+def getTableInfo(table_class) -> TableInfo:
+    info = _table_info.get(table_class)
+    if info is None:
+        info = TableInfo(table_class)
+        _table_info[table_class] = info
+    return info
+
+
+def cacheStatement(key, query: str) -> str:
+    if len(_statement_cache) >= _max_cached_statements:
+        _statement_cache.clear()
+    _statement_cache[key] = query
+    return query
+
+
 class Table:
     __sqlite3_table__ = True
 
@@ -86,9 +124,8 @@ class Table:
         if init_all_columns is False:
             return
         # Init any unset columns to None
-        for mc in inspect.getmembers(self):
-            mc_name, mc_obj = mc
-            if hasattr(mc_obj, "__sqlite3_column__"):
+        for mc_name in getTableInfo(self.__class__).column_names:
+            if mc_name not in self.__dict__:
                 setattr(self, mc_name, None)
 
     def isSet(self, field: str):
@@ -936,6 +973,12 @@ def create_db(db_path: str, log) -> None:
 
 class DBMethods:
     _db_lock_depth = 0
+    _db_con = None
+
+    # Read-only connections for queries that need not wait on mxDB, 0 to disable
+    _db_read_pool_size = 0
+    _db_read_pool = None
+    _db_read_pool_count = 0
 
     def _db_lock_held(self) -> bool:
 
@@ -943,6 +986,19 @@ class DBMethods:
             return self.mxDB._is_owned()
         return self.mxDB.locked()
 
+    def _connectDB(self, read_only: bool = False):
+        # Connections are shared between threads, access is serialised by
+        # mxDB for the writer and by the read pool for readers.
+        con = sqlite3.connect(
+            self.sqlite_file, check_same_thread=False, cached_statements=256
+        )
+        con.execute("PRAGMA busy_timeout = 30000")
+        if read_only:
+            con.execute("PRAGMA query_only = 1")
+        else:
+            con.execute("PRAGMA journal_mode = WAL")
+        return con
+
     def openDB(self, cursor=None):
         if cursor:
             assert self._db_lock_held()
@@ -954,11 +1010,69 @@ class DBMethods:
 
         self.mxDB.acquire()
         self._db_lock_depth = 1
-        self._db_con = sqlite3.connect(self.sqlite_file)
-
-        self._db_con.execute("PRAGMA busy_timeout = 30000")
+        if self._db_con is None:
+            try:
+                self._db_con = self._connectDB()
+            except Exception:
+                self._db_lock_depth = 0
+                self.mxDB.release()
+                raise
         return self._db_con.cursor()
 
+    def openDBRead(self):
+        """Return a cursor for read only queries.
+
+        Uses a pooled read only connection where possible so long running UI
+        queries don't hold mxDB, must be released with closeDBRead.
+        Falls back to openDB if the lock is already held by this thread.
+        """
+        if (
+            self._db_read_pool is None
+            or self._db_read_pool_size < 1
+            or self._db_lock_held()
+            or self._db_con is None
+        ):
+            return self.openDB()
+
+        try:
+            con = self._db_read_pool.get_nowait()
+        except queue.Empty:
+            con = None
+            with self._mx_db_read_pool:
+                if self._db_read_pool_count < self._db_read_pool_size:
+                    self._db_read_pool_count += 1
+                    try:
+                        con = self._connectDB(read_only=True)
+                    except Exception:
+                        self._db_read_pool_count -= 1
+                        raise
+            if con is None:
+                con = self._db_read_pool.get(timeout=30)
+        return con.cursor()
+
+    def closeDBRead(self, cursor):
+        con = cursor.connection
+        if con is self._db_con:
+            self.closeDB(cursor, commit=False)
+            return
+        try:
+            cursor.close()
+        finally:
+            self._db_read_pool.put(con)
+
+    def closeDBConnections(self) -> None:
+        if self._db_read_pool is not None:
+            while True:
+                try:
+                    self._db_read_pool.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._db_read_pool_count = 0
+        with self.mxDB:
+            if self._db_con is not None:
+                self._db_con.close()
+                self._db_con = None
+
     def getNewDBCursor(self):
         assert self._db_lock_held()
         return self._db_con.cursor()
@@ -994,13 +1108,16 @@ class DBMethods:
             self._db_lock_depth -= 1
             return
 
-        if commit:
-            self._db_con.commit()
-
-        cursor.close()
-        self._db_con.close()
-        self._db_lock_depth = 0
-        self.mxDB.release()
+        try:
+            if commit:
+                self._db_con.commit()
+            else:
+                # The connection is kept open, discard any uncommitted changes
+                self._db_con.rollback()
+            cursor.close()
+        finally:
+            self._db_lock_depth = 0
+            self.mxDB.release()
 
         if commit:
             self._onDBCommitted()
@@ -1104,15 +1221,10 @@ class DBMethods:
         table_name: str = obj.__tablename__
 
         values = {}
-        query: str = f"INSERT INTO {table_name} ("
-
-        # See if the instance overwrote any class methods
-        for mc in inspect.getmembers(obj.__class__):
-            mc_name, mc_obj = mc
+        # See if the instance overwrote any class members
+        for mc_name in getTableInfo(obj.__class__).column_names:
             if columns_list is not None and mc_name not in columns_list:
                 continue
-            if not hasattr(mc_obj, "__sqlite3_column__"):
-                continue
 
             m_obj = getattr(obj, mc_name)
 
@@ -1122,23 +1234,28 @@ class DBMethods:
 
             values[mc_name] = m_obj
 
-        query_values: str = " VALUES ("
-        for i, key in enumerate(values):
-            if i > 0:
-                query += ", "
-                query_values += ", "
-            query += key
-            query_values += ":" + key
-        query += ") " + query_values + ")"
-
-        if upsert:
-            query += " ON CONFLICT DO UPDATE SET "
+        cache_key = ("add", table_name, tuple(values), upsert)
+        query = _statement_cache.get(cache_key)
+        if query is None:
+            query = f"INSERT INTO {table_name} ("
+            query_values: str = " VALUES ("
             for i, key in enumerate(values):
-                if not validColumnName(key):
-                    raise ValueError(f"Invalid column: {key}")
                 if i > 0:
                     query += ", "
-                query += f"{key}=:{key}"
+                    query_values += ", "
+                query += key
+                query_values += ":" + key
+            query += ") " + query_values + ")"
+
+            if upsert:
+                query += " ON CONFLICT DO UPDATE SET "
+                for i, key in enumerate(values):
+                    if not validColumnName(key):
+                        raise ValueError(f"Invalid column: {key}")
+                    if i > 0:
+                        query += ", "
+                    query += f"{key}=:{key}"
+            cacheStatement(cache_key, query)
 
         cursor.execute(query, values)
         return cursor.lastrowid
@@ -1159,21 +1276,23 @@ class DBMethods:
             raise ValueError("Querying invalid class")
         table_name: str = table_class.__tablename__
 
-        query: str = "SELECT "
-        columns = []
-
-        for mc in inspect.getmembers(table_class):
-            mc_name, mc_obj = mc
-            if columns_list is not None and mc_name not in columns_list:
-                continue
-            if not hasattr(mc_obj, "__sqlite3_column__"):
-                continue
-            if len(columns) > 0:
-                query += ", "
-            query += mc_name
-            columns.append((mc_name, mc_obj.column_type))
-
-        query += f" FROM {table_name} WHERE 1=1 "
+        table_info = getTableInfo(table_class)
+        columns_key = None if columns_list is None else tuple(columns_list)
+        select_info = table_info.select_strs.get(columns_key)
+        if select_info is None:
+            if columns_list is None:
+                column_names = table_info.column_names
+            else:
+                column_names = tuple(
+                    c for c in table_info.column_names if c in columns_list
+                )
+            select_info = (
+                "SELECT " + ", ".join(column_names) + f" FROM {table_name} WHERE 1=1 ",
+                column_names,
+                tuple(c for c in column_names if c in table_info.bool_columns),
+            )
+            table_info.select_strs[columns_key] = select_info
+        query, column_names, bool_columns = select_info
 
         query_data = {}
         for ck in constraints:
@@ -1214,16 +1333,18 @@ class DBMethods:
             query += query_suffix
 
         query_data.update(extra_query_data)
+        unset_values = table_info.unset_values
         rows = cursor.execute(query, query_data)
         for row in rows:
-            obj = table_class()
-            for i, column_info in enumerate(columns):
-                colname, coltype = column_info
-                value = row[i]
-                if coltype == "bool":
-                    if row[i] is not None:
-                        value = False if row[i] == 0 else True
-                setattr(obj, colname, value)
+            # Equivalent to table_class() followed by setattr for each column
+            obj = table_class.__new__(table_class)
+            obj_dict = obj.__dict__
+            obj_dict.update(unset_values)
+            obj_dict.update(zip(column_names, row))
+            for colname in bool_columns:
+                value = obj_dict[colname]
+                if value is not None:
+                    obj_dict[colname] = False if value == 0 else True
             yield obj
 
     def queryOne(
@@ -1255,16 +1376,10 @@ class DBMethods:
             raise ValueError("Updating invalid obj")
         table_name: str = obj.__tablename__
 
-        query: str = f"UPDATE {table_name} SET "
-
         values = {}
         constraint_values = {}
         set_columns = []
-        for mc in inspect.getmembers(obj.__class__):
-            mc_name, mc_obj = mc
-            if not hasattr(mc_obj, "__sqlite3_column__"):
-                continue
-
+        for mc_name in getTableInfo(obj.__class__).column_names:
             m_obj = getattr(obj, mc_name)
             # Column is not set in instance
             if hasattr(m_obj, "__sqlite3_column__"):
@@ -1276,14 +1391,19 @@ class DBMethods:
             if columns_list is not None and mc_name not in columns_list:
                 continue
 
-            set_columns.append(f"{mc_name} = :{mc_name}")
+            set_columns.append(mc_name)
             values[mc_name] = m_obj
 
-        query += ", ".join(set_columns)
-        query += " WHERE 1=1 "
+        cache_key = ("update", table_name, tuple(set_columns), tuple(constraints))
+        query = _statement_cache.get(cache_key)
+        if query is None:
+            query = f"UPDATE {table_name} SET "
+            query += ", ".join([f"{c} = :{c}" for c in set_columns])
+            query += " WHERE 1=1 "
 
-        for ck in constraints:
-            query += f" AND {ck} = :{ck} "
+            for ck in constraints:
+                query += f" AND {ck} = :{ck} "
+            cacheStatement(cache_key, query)
 
         values.update(constraint_values)
         cursor.execute(query, values)
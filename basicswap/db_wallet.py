@@ -43,6 +43,8 @@ class WalletState(Table):
     derivation_path_type = Column("string")
     last_sync_height = Column("integer")
     migration_complete = Column("bool")
+    scan_external_index = Column("integer")
+    scan_internal_index = Column("integer")
     created_at = Column("integer")
     updated_at = Column("integer")
 
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 The Basicswap developers
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE or http://www.opensource.org/licenses/mit-license.php.
+
+import threading
+
+
+class EventBus:
+    """Collect events published over a short window and pass them on together.
+
+    The handler is called from the bus thread with a list of
+    (event_type, event_data) in publish order, so a burst of events costs one
+    handler call instead of a task per event.
+    """
+
+    def __init__(self, handle_events, window: float = 0.25, log=None):
+        self._handle_events = handle_events
+        self._window = window
+        self._log = log
+        self._cv = threading.Condition()
+        self._stop_event = threading.Event()
+        self._events = []
+        self._handling: bool = False
+        self.num_events: int = 0
+        self.num_batches: int = 0
+        self._thread = threading.Thread(target=self._run, name="event_bus", daemon=True)
+        self._thread.start()
+
+    def publish(self, event_type, event_data) -> None:
+        with self._cv:
+            self._events.append((event_type, event_data))
+            self._cv.notify_all()
+
+    def publishMany(self, event_type, events) -> None:
+        with self._cv:
+            for event_data in events:
+                self._events.append((event_type, event_data))
+            self._cv.notify_all()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        # Wait until events published so far are handled
+        with self._cv:
+            return self._cv.wait_for(
+                lambda: len(self._events) < 1 and not self._handling, timeout
+            )
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        with self._cv:
+            self._cv.notify_all()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            with self._cv:
+                while len(self._events) < 1 and not self._stop_event.is_set():
+                    self._cv.wait()
+                if len(self._events) < 1:
+                    return
+            # Let the rest of a burst arrive, skipped when stopping
+            self._stop_event.wait(self._window)
+            with self._cv:
+                events, self._events = self._events, []
+                self._handling = True
+            try:
+                self._handle_events(events)
+            except Exception as e:
+                if self._log:
+                    self._log.error(f"EventBus handler failed: {e}")
+            finally:
+                with self._cv:
+                    self._handling = False
+                    self.num_events += len(events)
+                    self.num_batches += 1
+                    self._cv.notify_all()
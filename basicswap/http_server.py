@@ -12,6 +12,7 @@ import json
 import shlex
 import hashlib
 import secrets
+import time
 import traceback
 import threading
 import http.client
@@ -68,6 +69,10 @@ from .ui.page_amm import (
     amm_debug_api,
     amm_config_api,
     amm_state_api,
+    get_amm_active_count,
+    get_amm_config_path,
+    get_amm_state_path,
+    get_amm_status,
 )
 from .ui.page_bids import page_bids, page_bid
 from .ui.page_offers import page_offers, page_offer, page_newoffer
@@ -162,6 +167,7 @@ JSON_GET_ALLOWED = frozenset(
         "bids",
         "sentbids",
         "network",
+        "websocketstats",
         "smsgaddresses",
         "rate",
         "rates",
@@ -205,6 +211,20 @@ def json_requires_post(url_split) -> bool:
     return False
 
 
+def static_cache_control(url_split, query: str, static_v) -> str:
+    # static_v is None when the files may change under a running server
+    is_lib = len(url_split) > 4 and url_split[3] == "libs"
+    # Only the current ?v={{ static_v }} is immutable, static_v tracks the file
+    is_versioned = static_v is not None and parse.parse_qs(query).get("v") == [static_v]
+    if static_v is not None and (is_lib or is_versioned):
+        return "public, max-age=31536000, immutable"
+    if url_split[2] in ("css", "js"):
+        return "public, max-age=3600, must-revalidate"
+    if url_split[2] in ("images", "sequence_diagrams"):
+        return "public, max-age=86400"
+    return "public, max-age=3600"
+
+
 class HttpHandler(BaseHTTPRequestHandler):
     def _get_session_cookie(self):
         if "Cookie" in self.headers:
@@ -360,6 +380,7 @@ class HttpHandler(BaseHTTPRequestHandler):
         extra_headers=None,
     ) -> bytes:
         swap_client = self.server.swap_client
+        page_context = self.server.page_context
         if swap_client.ws_server:
             args_dict["ws_port"] = swap_client.ws_server.client_port
         if swap_client.debug:
@@ -374,17 +395,13 @@ class HttpHandler(BaseHTTPRequestHandler):
         if is_authenticated:
             if swap_client.use_tor_proxy:
                 args_dict["use_tor_proxy"] = True
-                try:
-                    tor_state = get_tor_established_state(swap_client)
-                    args_dict["tor_established"] = True if tor_state == "1" else False
-                except Exception:
-                    args_dict["tor_established"] = False
-
-            from .ui.page_amm import get_amm_status, get_amm_active_count
+                args_dict["tor_established"] = page_context.torEstablished()
 
             try:
                 args_dict["current_status"] = get_amm_status()
-                args_dict["amm_active_count"] = get_amm_active_count(swap_client)
+                args_dict["amm_active_count"] = page_context.ammActiveCount(
+                    args_dict["current_status"]
+                )
             except Exception:
                 args_dict["current_status"] = "stopped"
                 args_dict["amm_active_count"] = 0
@@ -449,17 +466,7 @@ class HttpHandler(BaseHTTPRequestHandler):
         args_dict["update_available"] = getattr(swap_client, "_update_available", False)
         args_dict["latest_version"] = getattr(swap_client, "_latest_version", None)
 
-        try:
-            static_dir = os.path.join(os.path.dirname(__file__), "static")
-            mtimes = []
-            for rel in (
-                os.path.join("css", "style.css"),
-                os.path.join("js", "pages", "offer-new-page.js"),
-            ):
-                mtimes.append(int(os.path.getmtime(os.path.join(static_dir, rel))))
-            args_dict["static_v"] = "{}-{}".format(version, max(mtimes))
-        except Exception:
-            args_dict["static_v"] = version
+        args_dict["static_v"] = page_context.staticVersion(version)
 
         self.putHeaders(status_code, "text/html", extra_headers=extra_headers)
         return bytes(
@@ -986,58 +993,15 @@ class HttpHandler(BaseHTTPRequestHandler):
 
         if page == "static":
             try:
-                static_path = os.path.join(os.path.dirname(__file__), "static")
-                mime_type = ""
-                filepath = ""
-                if len(url_split) > 3 and url_split[2] == "sequence_diagrams":
-                    filepath = os.path.join(
-                        static_path, "sequence_diagrams", url_split[3]
-                    )
-                    mime_type = "image/svg+xml"
-                elif len(url_split) > 3 and url_split[2] == "images":
-                    filename = os.path.join(*url_split[3:])
-                    filepath = os.path.join(static_path, "images", filename)
-                    _, extension = os.path.splitext(filename)
-                    mime_type = {
-                        ".svg": "image/svg+xml",
-                        ".png": "image/png",
-                        ".jpg": "image/jpeg",
-                        ".gif": "image/gif",
-                        ".ico": "image/x-icon",
-                    }.get(extension, "")
-                elif len(url_split) > 3 and url_split[2] == "css":
-                    filename = os.path.join(*url_split[3:])
-                    filepath = os.path.join(static_path, "css", filename)
-                    mime_type = "text/css; charset=utf-8"
-                elif len(url_split) > 3 and url_split[2] == "js":
-                    filename = os.path.join(*url_split[3:])
-                    filepath = os.path.join(static_path, "js", filename)
-                    mime_type = "application/javascript"
-                else:
-                    return self.page_404(url_split)
-
-                if mime_type == "" or not filepath:
-                    raise ValueError("Unknown file type or path")
-
-                # Prevent path traversal. Require the resolved file to stay within static_path
-                static_real = os.path.realpath(static_path)
-                try:
-                    within_static = (
-                        os.path.commonpath((os.path.realpath(filepath), static_real))
-                        == static_real
-                    )
-                except ValueError:
-                    within_static = False
-                if not within_static:
+                static_file = self.server.static_files.get(url_split)
+                if static_file is None:
                     return self.page_404(url_split)
 
-                file_stat = os.stat(filepath)
-                mtime = file_stat.st_mtime
-                file_size = file_stat.st_size
-
-                etag_hash = hashlib.md5(f"{file_size}-{mtime}".encode()).hexdigest()
-                etag = f'"{etag_hash}"'
-                last_modified = formatdate(mtime, usegmt=True)
+                use_gzip: bool = (
+                    static_file.content_gzip is not None
+                    and "gzip" in self.headers.get("Accept-Encoding", "")
+                )
+                etag = static_file.etag_gzip if use_gzip else static_file.etag
 
                 if_none_match = self.headers.get("If-None-Match")
                 if if_none_match:
@@ -1054,48 +1018,42 @@ class HttpHandler(BaseHTTPRequestHandler):
                 if if_modified_since and not if_none_match:
                     try:
                         ims_time = parsedate_to_datetime(if_modified_since)
-                        file_time = datetime.fromtimestamp(int(mtime), tz=timezone.utc)
+                        file_time = datetime.fromtimestamp(
+                            int(static_file.mtime), tz=timezone.utc
+                        )
                         if file_time <= ims_time:
                             self.send_response(304)
-                            self.send_header("Last-Modified", last_modified)
+                            self.send_header("Last-Modified", static_file.last_modified)
                             self.send_header("Cache-Control", "public")
                             self.end_headers()
                             return b""
                     except (TypeError, ValueError):
                         pass
 
-                is_lib = len(url_split) > 4 and url_split[3] == "libs"
-                if is_lib:
-                    cache_control = "public, max-age=31536000, immutable"
-                elif url_split[2] in ("css", "js"):
-                    cache_control = "public, max-age=3600, must-revalidate"
-                elif url_split[2] in ("images", "sequence_diagrams"):
-                    cache_control = "public, max-age=86400"
-                else:
-                    cache_control = "public, max-age=3600"
-
-                with open(filepath, "rb") as fp:
-                    content = fp.read()
+                static_v = (
+                    None
+                    if swap_client.debug
+                    else self.server.page_context.staticVersion(__version__)
+                )
+                cache_control = static_cache_control(url_split, parsed.query, static_v)
 
                 extra_headers = [
                     ("Cache-Control", cache_control),
-                    ("Last-Modified", last_modified),
+                    ("Last-Modified", static_file.last_modified),
                     ("ETag", etag),
                 ]
-
-                is_compressible = mime_type in (
-                    "text/css; charset=utf-8",
-                    "application/javascript",
-                    "image/svg+xml",
-                )
-                accept_encoding = self.headers.get("Accept-Encoding", "")
-                if is_compressible and "gzip" in accept_encoding:
-                    content = gzip.compress(content)
-                    extra_headers.append(("Content-Encoding", "gzip"))
+                if static_file.content_gzip is not None:
                     extra_headers.append(("Vary", "Accept-Encoding"))
+                if use_gzip:
+                    content = static_file.content_gzip
+                    extra_headers.append(("Content-Encoding", "gzip"))
+                else:
+                    content = static_file.content
 
                 extra_headers.append(("Content-Length", str(len(content))))
-                self.putHeaders(status_code, mime_type, extra_headers=extra_headers)
+                self.putHeaders(
+                    status_code, static_file.mime_type, extra_headers=extra_headers
+                )
                 return content
 
             except FileNotFoundError:
@@ -1278,6 +1236,203 @@ class HttpHandler(BaseHTTPRequestHandler):
         self.end_headers()
 
 
+class PageContextCache:
+    """Values rendered on every page, cached so loading a page doesn't query the
+    tor controller, scan the network offers or stat the static files each time.
+
+    Each value is kept until its key changes or its ttl passes.
+    """
+
+    tor_state_ttl: int = 30
+    amm_count_ttl: int = 60
+
+    def __init__(self, swap_client):
+        self._swap_client = swap_client
+        self._lock = threading.Lock()
+        self._value_locks = {}
+        self._values = {}  # name: (key, expire_at, value)
+        self._amm_paths = None
+
+    def _get(self, name: str, key, ttl: float, get_value):
+        with self._lock:
+            value_lock = self._value_locks.setdefault(name, threading.Lock())
+        # Concurrent requests wait for the first to fill the value
+        with value_lock:
+            now = time.time()
+            entry = self._values.get(name)
+            if entry is not None and entry[0] == key and now < entry[1]:
+                return entry[2]
+            value = get_value()
+            self._values[name] = (key, now + ttl, value)
+            return value
+
+    @staticmethod
+    def _mtime(path: str):
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return None
+
+    def torEstablished(self) -> bool:
+        def get_value() -> bool:
+            try:
+                return get_tor_established_state(self._swap_client) == "1"
+            except Exception:
+                return False
+
+        return self._get("tor_established", None, self.tor_state_ttl, get_value)
+
+    def ammActiveCount(self, amm_status: str) -> int:
+        if amm_status != "running":
+            return 0
+        if self._amm_paths is None:
+            self._amm_paths = (
+                get_amm_state_path(self._swap_client),
+                get_amm_config_path(self._swap_client),
+            )
+        # Refreshed when the AMM rewrites its files or offers change
+        key = (
+            amm_status,
+            self._mtime(self._amm_paths[0]),
+            self._mtime(self._amm_paths[1]),
+            getattr(self._swap_client, "_offers_version", 0),
+        )
+        return self._get(
+            "amm_active_count",
+            key,
+            self.amm_count_ttl,
+            lambda: get_amm_active_count(self._swap_client),
+        )
+
+    def staticVersion(self, version: str) -> str:
+        def get_value() -> str:
+            try:
+                static_dir = os.path.join(os.path.dirname(__file__), "static")
+                mtimes = []
+                for rel in (
+                    os.path.join("css", "style.css"),
+                    os.path.join("js", "pages", "offer-new-page.js"),
+                ):
+                    mtimes.append(int(os.path.getmtime(os.path.join(static_dir, rel))))
+                return "{}-{}".format(version, max(mtimes))
+            except Exception:
+                return version
+
+        # Static files only change while developing
+        ttl = 0 if self._swap_client.debug else float("inf")
+        return self._get("static_v", version, ttl, get_value)
+
+
+class StaticFile:
+    """A static file held in memory, with a gzip variant for text types."""
+
+    compressible_types = (
+        "text/css; charset=utf-8",
+        "application/javascript",
+        "image/svg+xml",
+    )
+
+    def __init__(self, mime_type: str, content: bytes, mtime: float):
+        self.mime_type = mime_type
+        self.content = content
+        self.mtime = mtime
+        self.last_modified = formatdate(mtime, usegmt=True)
+        content_hash = hashlib.sha256(content).hexdigest()[:32]
+        self.etag = f'"{content_hash}"'
+
+        self.content_gzip = None
+        self.etag_gzip = None
+        if mime_type in self.compressible_types:
+            compressed = gzip.compress(content, compresslevel=9, mtime=0)
+            if len(compressed) < len(content):
+                self.content_gzip = compressed
+                self.etag_gzip = f'"{content_hash}-gz"'
+
+
+class StaticFileCache:
+    """Static files loaded on first request and then served from memory.
+
+    With check_mtime set, files are stat'ed on each request and reloaded if
+    changed, for editing the ui while the server runs.
+    """
+
+    image_types = {
+        ".svg": "image/svg+xml",
+        ".png": "image/png",
+        ".jpg": "image/jpeg",
+        ".gif": "image/gif",
+        ".ico": "image/x-icon",
+    }
+
+    def __init__(self, static_path: str, check_mtime: bool = False):
+        self.static_path = static_path
+        self.static_real = os.path.realpath(static_path)
+        self.check_mtime = check_mtime
+        self._lock = threading.Lock()
+        self._files = {}  # url path: StaticFile
+
+    def _resolve(self, url_split):
+        # Returns the file path and mime type for a /static url, None if unknown
+        if len(url_split) < 4:
+            return None
+        if url_split[2] == "sequence_diagrams":
+            filepath = os.path.join(self.static_path, "sequence_diagrams", url_split[3])
+            return filepath, "image/svg+xml"
+        filepath = os.path.join(self.static_path, url_split[2], *url_split[3:])
+        if url_split[2] == "images":
+            _, extension = os.path.splitext(filepath)
+            mime_type = self.image_types.get(extension, "")
+        elif url_split[2] == "css":
+            mime_type = "text/css; charset=utf-8"
+        elif url_split[2] == "js":
+            mime_type = "application/javascript"
+        else:
+            return None
+        if mime_type == "":
+            raise ValueError("Unknown file type or path")
+        return filepath, mime_type
+
+    def _load(self, url_split):
+        resolved = self._resolve(url_split)
+        if resolved is None:
+            return None
+        filepath, mime_type = resolved
+
+        # Prevent path traversal. Require the resolved file to stay within static_path
+        try:
+            within_static = (
+                os.path.commonpath((os.path.realpath(filepath), self.static_real))
+                == self.static_real
+            )
+        except ValueError:
+            within_static = False
+        if not within_static:
+            return None
+
+        with open(filepath, "rb") as fp:
+            mtime = os.fstat(fp.fileno()).st_mtime
+            content = fp.read()
+        return filepath, StaticFile(mime_type, content, mtime)
+
+    def get(self, url_split):
+        # Raises FileNotFoundError if the file is missing
+        key = "/".join(url_split[2:])
+        with self._lock:
+            entry = self._files.get(key)
+        if entry is not None:
+            filepath, static_file = entry
+            if not self.check_mtime or os.stat(filepath).st_mtime == static_file.mtime:
+                return static_file
+
+        # Missing paths are not cached, keeping the cache bounded by the static dir
+        entry = self._load(url_split)
+        if entry is None:
+            return None
+        with self._lock:
+            self._files[key] = entry
+        return entry[1]
+
+
 class HttpThread(threading.Thread, ThreadingHTTPServer):
     daemon_threads = True
 
@@ -1295,6 +1450,11 @@ class HttpThread(threading.Thread, ThreadingHTTPServer):
         self.active_sessions = {}
         self.env = env
         self.msg_id_counter = 0
+        self.page_context = PageContextCache(swap_client)
+        self.static_files = StaticFileCache(
+            os.path.join(os.path.dirname(__file__), "static"),
+            check_mtime=swap_client.debug,
+        )
 
         self.session_lock = threading.Lock()
         self.msg_id_lock = threading.Lock()
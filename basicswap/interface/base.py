@@ -188,6 +188,10 @@ class CoinInterface:
     def use_tx_vsize(self) -> bool:
         return self._use_segwit
 
+    def use_raw_block_scan(self) -> bool:
+        # Parse raw blocks in checkForSpends instead of verbose getblock output
+        return False
+
     def getLockTxSwapOutputValue(self, bid, xmr_swap) -> int:
         return bid.amount
 
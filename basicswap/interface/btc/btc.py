@@ -71,6 +71,7 @@ from coincurve.ecdsaotves import (
 from basicswap.contrib.test_framework import segwit_addr
 from basicswap.contrib.test_framework.descriptors import descsum_create
 from basicswap.contrib.test_framework.messages import (
+    CBlock,
     COIN,
     COutPoint,
     CTransaction,
@@ -191,6 +192,8 @@ def extractScriptLockRefundScriptValues(script_bytes: bytes):
 class BTCInterface(FeeValidator, Secp256k1Interface):
     _scantxoutset_lock = threading.Lock()
     _MAX_SCANTXOUTSET_RETRIES = 3
+    ELECTRUM_WATCH_BATCH_SIZE = 50
+    ELECTRUM_TX_CACHE_SIZE = 1000
 
     @staticmethod
     def coin_type():
@@ -321,6 +324,10 @@ class BTCInterface(FeeValidator, Secp256k1Interface):
         self._connection_type = coin_settings["connection_type"]
         self._expect_seedid_hex = None
         self._altruistic = coin_settings.get("altruistic", True)
+        # Scan blocks for watched outputs from raw block data
+        self._raw_block_scan = coin_settings.get(
+            "raw_block_scan", self.coin_type() == Coins.BTC
+        )
         self._use_descriptors = coin_settings.get("use_descriptors", False)
         # Use hardened account indices to match existing wallet keys, only applies when use_descriptors is True
         self._use_legacy_key_paths = coin_settings.get("use_legacy_key_paths", False)
@@ -333,6 +340,9 @@ class BTCInterface(FeeValidator, Secp256k1Interface):
         self._merkle_verified: Dict[str, int] = {}
         self._median_time_cache: Optional[int] = None
         self._median_time_cache_height: Optional[int] = None
+        # Electrum watch state, txid -> (tx_hex, tx) and (txid, vout) -> scripthash
+        self._electrum_tx_cache: Dict[str, tuple] = {}
+        self._electrum_output_scripthashes: Dict[tuple, str] = {}
 
     def setBackend(self, backend) -> None:
         self._backend = backend
@@ -1362,6 +1372,14 @@ class BTCInterface(FeeValidator, Secp256k1Interface):
         tx.deserialize(BytesIO(tx_bytes), allow_witness)
         return tx
 
+    def loadBlock(self, block_bytes: bytes) -> CBlock:
+        f = BytesIO(block_bytes)
+        block = CBlock()
+        block.deserialize(f)
+        # Catch extension data (e.g. mweb) the deserializer doesn't understand
+        ensure(f.tell() == len(block_bytes), "Unexpected data after block txns")
+        return block
+
     def createSCLockTx(
         self, value: int, script: bytearray, vkbv: bytes = None
     ) -> bytes:
@@ -3529,86 +3547,165 @@ class BTCInterface(FeeValidator, Secp256k1Interface):
     def scriptToScripthash(self, script: bytes) -> str:
         return sha256(script)[::-1].hex()
 
-    def checkWatchedOutput(self, txid_hex: str, vout: int):
+    def _electrumBatch(self, method: str, params_list: list) -> list:
         backend = self.getBackend()
-        if not backend:
-            return None
+        rv = []
+        for i in range(0, len(params_list), self.ELECTRUM_WATCH_BATCH_SIZE):
+            chunk = params_list[i : i + self.ELECTRUM_WATCH_BATCH_SIZE]
+            rv.extend(
+                backend._server.call_batch_background(
+                    [(method, params) for params in chunk]
+                )
+            )
+        return rv
 
-        try:
-            tx_hex = backend._server.call_background(
-                "blockchain.transaction.get", [txid_hex, False]
+    def _getElectrumTxns(self, txids) -> Dict[str, tuple]:
+        # Returns txid -> (tx_hex, tx), fetching txns not cached in one batch
+        cache = self._electrum_tx_cache
+        fetch = [txid for txid in dict.fromkeys(txids) if txid not in cache]
+        if fetch:
+            results = self._electrumBatch(
+                "blockchain.transaction.get", [[txid, False] for txid in fetch]
             )
-            if not tx_hex:
-                return None
+            for txid, tx_hex in zip(fetch, results):
+                if not tx_hex:
+                    continue
+                try:
+                    cache[txid] = (tx_hex, self.loadTx(bytes.fromhex(tx_hex)))
+                except Exception as e:
+                    self._log.debug(f"_getElectrumTxns decode error for {txid}: {e}")
+        return {txid: cache[txid] for txid in txids if txid in cache}
 
-            tx = self.loadTx(bytes.fromhex(tx_hex))
-            script_hex = tx.vout[vout].scriptPubKey.hex()
-            scripthash = self.scriptToScripthash(bytes.fromhex(script_hex))
+    def checkWatchedBatch(self, watched_outputs, watched_scripts):
+        """Find spends of watched outputs and txns paying to watched scripts.
 
-            history = backend._server.call_background(
-                "blockchain.scripthash.get_history", [scripthash]
-            )
-            self._log.debug(
-                f"checkWatchedOutput {txid_hex}:{vout} - history has {len(history)} entries"
+        watched_outputs is a list of (txid_hex, vout) and watched_scripts a list
+        of scripts. All histories are fetched in one batch request and then all
+        txns not seen before in one more, decoded txns are cached by txid.
+        Returns ({(txid_hex, vout): spend_info}, {script: found}).
+        """
+        spends = {}
+        found_scripts = {}
+        backend = self.getBackend()
+        if not backend or (not watched_outputs and not watched_scripts):
+            return spends, found_scripts
+
+        output_scripthashes = self._electrum_output_scripthashes
+        missing = [o for o in watched_outputs if o not in output_scripthashes]
+        if missing:
+            funding_txns = self._getElectrumTxns([o[0] for o in missing])
+            for txid_hex, vout in missing:
+                if txid_hex not in funding_txns:
+                    continue
+                tx = funding_txns[txid_hex][1]
+                if vout >= len(tx.vout):
+                    continue
+                output_scripthashes[(txid_hex, vout)] = self.scriptToScripthash(
+                    tx.vout[vout].scriptPubKey
+                )
+
+        watched = {}
+        for o in watched_outputs:
+            if o in output_scripthashes:
+                watched[o] = output_scripthashes[o]
+        for script in watched_scripts:
+            watched[script] = self.scriptToScripthash(script)
+
+        scripthashes = list(dict.fromkeys(watched.values()))
+        histories = dict(
+            zip(
+                scripthashes,
+                self._electrumBatch(
+                    "blockchain.scripthash.get_history", [[sh] for sh in scripthashes]
+                ),
             )
+        )
 
-            for tx_entry in history:
-                self._log.debug(
-                    f"  history entry: {tx_entry.get('tx_hash')[:16]}... height={tx_entry.get('height', 0)}"
-                )
-                if tx_entry.get("tx_hash") != txid_hex:
-                    spend_hex = backend._server.call_background(
-                        "blockchain.transaction.get", [tx_entry["tx_hash"], False]
-                    )
-                    if not spend_hex:
+        txids = []
+        for key, scripthash in watched.items():
+            for tx_entry in histories.get(scripthash) or []:
+                if isinstance(key, tuple) and tx_entry["tx_hash"] == key[0]:
+                    continue
+                txids.append(tx_entry["tx_hash"])
+        txns = self._getElectrumTxns(txids)
+
+        for key, scripthash in watched.items():
+            for tx_entry in histories.get(scripthash) or []:
+                txid = tx_entry["tx_hash"]
+                if txid not in txns:
+                    continue
+                tx_hex, tx = txns[txid]
+                if isinstance(key, tuple):
+                    if txid == key[0]:
                         continue
-                    spend_tx = self.loadTx(bytes.fromhex(spend_hex))
-                    for i, inp in enumerate(spend_tx.vin):
-                        inp_txid = f"{inp.prevout.hash:064x}"
-                        if inp_txid == txid_hex and inp.prevout.n == vout:
-                            self._log.debug(f"  Found spend in {tx_entry['tx_hash']}")
-                            return {
-                                "txid": tx_entry["tx_hash"],
+                    for i, inp in enumerate(tx.vin):
+                        if (
+                            inp.prevout.n == key[1]
+                            and f"{inp.prevout.hash:064x}" == key[0]
+                        ):
+                            spends[key] = {
+                                "txid": txid,
                                 "vin": i,
                                 "height": tx_entry.get("height", 0),
+                                "hex": tx_hex,
+                                "tx": tx,
+                            }
+                            break
+                else:
+                    for i, out in enumerate(tx.vout):
+                        if out.scriptPubKey == key:
+                            found_scripts[key] = {
+                                "txid": txid,
+                                "vout": i,
+                                "height": tx_entry.get("height", 0),
                             }
+                            break
+                if key in spends or key in found_scripts:
+                    break
+
+        # Keep the caches to the items still watched
+        if len(self._electrum_tx_cache) > self.ELECTRUM_TX_CACHE_SIZE:
+            keep = set(txids).union(o[0] for o in watched_outputs)
+            self._electrum_tx_cache = {
+                k: v for k, v in self._electrum_tx_cache.items() if k in keep
+            }
+        if len(output_scripthashes) > self.ELECTRUM_TX_CACHE_SIZE:
+            self._electrum_output_scripthashes = {
+                o: output_scripthashes[o]
+                for o in watched_outputs
+                if o in output_scripthashes
+            }
+        return spends, found_scripts
+
+    def getWatchedOutputScripthash(self, txid_hex: str, vout: int):
+        # Returns None if the funding tx can't be found yet
+        key = (txid_hex, vout)
+        if key not in self._electrum_output_scripthashes:
+            funding_txns = self._getElectrumTxns([txid_hex])
+            if txid_hex not in funding_txns:
+                return None
+            tx = funding_txns[txid_hex][1]
+            if vout >= len(tx.vout):
+                return None
+            self._electrum_output_scripthashes[key] = self.scriptToScripthash(
+                tx.vout[vout].scriptPubKey
+            )
+        return self._electrum_output_scripthashes[key]
+
+    def checkWatchedOutput(self, txid_hex: str, vout: int):
+        try:
+            spends, _ = self.checkWatchedBatch([(txid_hex, vout)], [])
+            return spends.get((txid_hex, vout))
         except Exception as e:
-            error_msg = str(e).lower()
-            if (
-                "no such mempool or blockchain transaction" not in error_msg
-                and "missing transaction" not in error_msg
-            ):
-                self._log.debug(
-                    f"checkWatchedOutput exception for {txid_hex}:{vout}: {e}"
-                )
+            self._log.debug(f"checkWatchedOutput exception for {txid_hex}:{vout}: {e}")
         return None
 
     def checkWatchedScript(self, script: bytes):
-        backend = self.getBackend()
-        if not backend:
-            return None
-
         try:
-            scripthash = self.scriptToScripthash(script)
-            history = backend._server.call_background(
-                "blockchain.scripthash.get_history", [scripthash]
-            )
-            for tx_entry in history:
-                tx_hex = backend._server.call_background(
-                    "blockchain.transaction.get", [tx_entry["tx_hash"], False]
-                )
-                if not tx_hex:
-                    continue
-                tx = self.loadTx(bytes.fromhex(tx_hex))
-                for i, out in enumerate(tx.vout):
-                    if out.scriptPubKey == script:
-                        return {
-                            "txid": tx_entry["tx_hash"],
-                            "vout": i,
-                            "height": tx_entry.get("height", 0),
-                        }
+            _, found_scripts = self.checkWatchedBatch([], [script])
+            return found_scripts.get(script)
         except Exception as e:
-            self._log.debug(f"_findOutputSpendingScript electrum error: {e}")
+            self._log.debug(f"checkWatchedScript electrum error: {e}")
         return None
 
     def getOutput(self, txid, dest_script, expect_value, xmr_swap=None):
@@ -3940,6 +4037,12 @@ class BTCInterface(FeeValidator, Secp256k1Interface):
             raise NotImplementedError("getBlockWithTxns not available in electrum mode")
         return self.rpc("getblock", [block_hash, 2])
 
+    def use_raw_block_scan(self) -> bool:
+        return self._raw_block_scan and self._connection_type == "rpc"
+
+    def getBlockRaw(self, block_hash: str) -> bytes:
+        return bytes.fromhex(self.rpc("getblock", [block_hash, 0]))
+
     def listUtxos(self):
         if self._connection_type == "electrum":
             return self._listUtxosElectrum()
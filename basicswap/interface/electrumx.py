@@ -27,6 +27,56 @@ def _close_socket_safe(sock):
             pass
 
 
+class LineFramer:
+    """Split a byte stream into newline terminated messages.
+
+    Received data is appended to one bytearray and only bytes not yet searched
+    are scanned for a newline, so a response arriving over many reads is
+    framed in linear time. Consumed lines are dropped in one step once no
+    complete line remains.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._start = 0
+        self._scan = 0
+
+    def feed(self, data) -> None:
+        self._buffer += data
+
+    def read_line(self):
+        # Returns the next complete line without the newline, or None
+        pos = self._buffer.find(b"\n", self._scan)
+        if pos < 0:
+            if self._start > 0:
+                del self._buffer[: self._start]
+                self._start = 0
+            self._scan = len(self._buffer)
+            return None
+        line = self._buffer[self._start : pos]
+        self._start = pos + 1
+        self._scan = self._start
+        return line
+
+    def clear(self) -> None:
+        self._buffer.clear()
+        self._start = 0
+        self._scan = 0
+
+
+class _BatchRejected(Exception):
+    pass
+
+
+def _is_batch_rejection(error) -> bool:
+    # Null id errors can have other causes, only these reject a batch array
+    if isinstance(error, dict):
+        if error.get("code") in (-32600, -32700):
+            return True
+        error = error.get("message", "")
+    return "batch" in str(error).lower()
+
+
 DEFAULT_ELECTRUM_SERVERS = {
     "bitcoin": [
         {"host": "bitcoin.stackwallet.com", "port": 50002, "ssl": True},
@@ -54,6 +104,8 @@ DEFAULT_ONION_SERVERS = {
 
 
 class ElectrumConnection:
+    RECV_SIZE = 65536
+
     def __init__(
         self,
         host,
@@ -80,6 +132,11 @@ class ElectrumConnection:
         self._log = log
         self._proxy_host = proxy_host
         self._proxy_port = proxy_port
+        self._framer = LineFramer()
+        self._recv_buffer = memoryview(bytearray(self.RECV_SIZE))
+        # Batches are sent as one JSON array, cleared if the server rejects them
+        self._batch_arrays = True
+        self._pending_array_batches = []
 
     @staticmethod
     def _is_private_address(host: str) -> bool:
@@ -126,6 +183,7 @@ class ElectrumConnection:
                 self._socket = context.wrap_socket(sock, server_hostname=self._host)
             else:
                 self._socket = sock
+            self._framer.clear()
             self._connected = True
         except Exception as e:
             self._connected = False
@@ -163,27 +221,33 @@ class ElectrumConnection:
             self._listener_thread.join(timeout=2)
             self._listener_thread = None
 
+    def _recv(self) -> None:
+        # Read once from the socket into the framer
+        n = self._socket.recv_into(self._recv_buffer)
+        if n == 0:
+            raise TemporaryError("Connection closed")
+        self._framer.feed(self._recv_buffer[:n])
+
     def _listener_loop(self):
-        buffer = b""
         while self._listener_running and self._connected and self._socket:
             try:
+                while (line := self._framer.read_line()) is not None:
+                    try:
+                        message = json.loads(line)
+                        self._handle_message(message)
+                    except json.JSONDecodeError:
+                        if self._log:
+                            self._log.debug(
+                                f"Invalid JSON from electrum: {bytes(line[:100])}"
+                            )
                 self._socket.settimeout(1.0)
                 try:
-                    data = self._socket.recv(4096)
+                    self._recv()
                 except socket.timeout:
                     continue
-                if not data:
+                except TemporaryError:
                     self._connected = False
                     break
-                buffer += data
-                while b"\n" in buffer:
-                    line, buffer = buffer.split(b"\n", 1)
-                    try:
-                        message = json.loads(line.decode())
-                        self._handle_message(message)
-                    except json.JSONDecodeError:
-                        if self._log:
-                            self._log.debug(f"Invalid JSON from electrum: {line[:100]}")
             except Exception as e:
                 if self._listener_running and self._log:
                     self._log.debug(f"Electrum listener error: {e}")
@@ -191,12 +255,27 @@ class ElectrumConnection:
                 break
 
     def _handle_message(self, message):
+        if isinstance(message, list):
+            for item in message:
+                self._handle_message(item)
+            return
         if "id" in message and message["id"] is not None:
             request_id = message["id"]
             if request_id in self._response_queues:
                 self._response_queues[request_id].put(message)
         elif "method" in message:
             self._handle_notification(message)
+        elif message.get("error") and _is_batch_rejection(message["error"]):
+            # A batch array rejected as a whole is answered by one error with
+            # a null id, fail the oldest batch in flight.
+            with self._lock:
+                if len(self._pending_array_batches) < 1:
+                    return
+                request_ids = self._pending_array_batches.pop(0)
+            for request_id in request_ids:
+                q = self._response_queues.get(request_id)
+                if q is not None:
+                    q.put({"error": message["error"], "batch_rejected": True})
 
     def _handle_notification(self, message):
         method = message.get("method", "")
@@ -249,23 +328,20 @@ class ElectrumConnection:
         return request_id
 
     def _receive_response_sync(self, expected_id, timeout=30):
-        buffer = b""
         self._socket.settimeout(timeout)
         while True:
+            while (line := self._framer.read_line()) is not None:
+                response = json.loads(line)
+                if isinstance(response, list):
+                    continue
+                if response.get("id") == expected_id:
+                    if "error" in response and response["error"]:
+                        raise Exception(f"Electrum error: {response['error']}")
+                    return response.get("result")
+                elif "method" in response:
+                    self._handle_notification(response)
             try:
-                data = self._socket.recv(4096)
-                if not data:
-                    raise TemporaryError("Connection closed")
-                buffer += data
-                while b"\n" in buffer:
-                    line, buffer = buffer.split(b"\n", 1)
-                    response = json.loads(line.decode())
-                    if response.get("id") == expected_id:
-                        if "error" in response and response["error"]:
-                            raise Exception(f"Electrum error: {response['error']}")
-                        return response.get("result")
-                    elif "method" in response:
-                        self._handle_notification(response)
+                self._recv()
             except socket.timeout:
                 raise TemporaryError("Request timed out")
 
@@ -291,20 +367,14 @@ class ElectrumConnection:
         return self._receive_batch_responses_sync(expected_ids, timeout)
 
     def _receive_batch_responses_sync(self, expected_ids, timeout=30):
-        buffer = b""
         self._socket.settimeout(timeout)
         results = {}
         pending_ids = set(expected_ids)
 
         while pending_ids:
-            try:
-                data = self._socket.recv(4096)
-                if not data:
-                    raise TemporaryError("Connection closed")
-                buffer += data
-                while b"\n" in buffer:
-                    line, buffer = buffer.split(b"\n", 1)
-                    response = json.loads(line.decode())
+            while pending_ids and (line := self._framer.read_line()) is not None:
+                message = json.loads(line)
+                for response in message if isinstance(message, list) else (message,):
                     resp_id = response.get("id")
                     if resp_id in pending_ids:
                         if "error" in response and response["error"]:
@@ -314,6 +384,12 @@ class ElectrumConnection:
                         pending_ids.discard(resp_id)
                     elif "method" in response:
                         self._handle_notification(response)
+                    elif resp_id is None and _is_batch_rejection(response.get("error")):
+                        raise _BatchRejected(str(response["error"]))
+            if not pending_ids:
+                break
+            try:
+                self._recv()
             except socket.timeout:
                 raise TemporaryError(
                     f"Batch request timed out, {len(pending_ids)} responses pending"
@@ -337,6 +413,8 @@ class ElectrumConnection:
                 except queue.Empty:
                     continue
             try:
+                if response.get("batch_rejected"):
+                    raise _BatchRejected(str(response["error"]))
                 if "error" in response and response["error"]:
                     error_msg = str(response["error"])
                     if "Connection closed" in error_msg:
@@ -376,31 +454,62 @@ class ElectrumConnection:
             self._socket = None
             raise TemporaryError(f"Connection error: {e}")
 
+    def _send_batch(self, requests, as_array: bool):
+        # Write all requests with one sendall, as a JSON array or one per line
+        request_ids = []
+        with self._lock:
+            batch = []
+            for method, params in requests:
+                self._request_id += 1
+                request_id = self._request_id
+                request_ids.append(request_id)
+                batch.append(
+                    {
+                        "jsonrpc": "2.0",
+                        "id": request_id,
+                        "method": method,
+                        "params": params if params else [],
+                    }
+                )
+            if as_array:
+                request_data = json.dumps(batch) + "\n"
+            else:
+                request_data = "".join(json.dumps(req) + "\n" for req in batch)
+            if self._listener_running:
+                for request_id in request_ids:
+                    self._response_queues[request_id] = queue.Queue()
+                if as_array:
+                    self._pending_array_batches.append(request_ids)
+            self._socket.sendall(request_data.encode())
+        return request_ids
+
     def call_batch(self, requests):
+        if len(requests) < 1:
+            return []
         if not self.is_connected():
             self.connect()
         try:
-            request_ids = []
-            if self._listener_running:
-                with self._lock:
-                    for method, params in requests:
-                        self._request_id += 1
-                        request_id = self._request_id
-                        self._response_queues[request_id] = queue.Queue()
-                        request_ids.append(request_id)
-                        req = {
-                            "jsonrpc": "2.0",
-                            "id": request_id,
-                            "method": method,
-                            "params": params if params else [],
-                        }
-                        self._socket.sendall((json.dumps(req) + "\n").encode())
-            else:
-                for method, params in requests:
-                    request_id = self._send_request(method, params if params else [])
-                    request_ids.append(request_id)
-
-            responses = self._receive_batch_responses(request_ids)
+            as_array = self._batch_arrays
+            request_ids = array_ids = self._send_batch(requests, as_array)
+            try:
+                responses = self._receive_batch_responses(request_ids)
+            except _BatchRejected as e:
+                if not as_array:
+                    raise TemporaryError(f"Electrum batch error: {e}")
+                if self._log:
+                    self._log.debug(
+                        f"Electrum server {self._host} rejected batch array, sending requests individually: {e}"
+                    )
+                self._batch_arrays = False
+                for request_id in request_ids:
+                    self._response_queues.pop(request_id, None)
+                request_ids = self._send_batch(requests, False)
+                responses = self._receive_batch_responses(request_ids)
+            finally:
+                if as_array and self._listener_running:
+                    with self._lock:
+                        if array_ids in self._pending_array_batches:
+                            self._pending_array_batches.remove(array_ids)
 
             results = []
             for req_id in request_ids:
@@ -1259,6 +1368,20 @@ class ElectrumServer:
         status = self.call("blockchain.scripthash.subscribe", [scripthash])
         return status
 
+    def unsubscribe(self, scripthash):
+        self._notification_callbacks.pop(scripthash, None)
+        self._subscribed_scripthashes.discard(scripthash)
+
+        if self._connection:
+            self._connection._notification_callbacks.pop(scripthash, None)
+        try:
+            # Added in protocol 1.4.2, older servers keep sending notifications
+            # which are ignored without a callback.
+            self.call("blockchain.scripthash.unsubscribe", [scripthash])
+        except Exception as e:
+            if self._log:
+                self._log.debug(f"Failed to unsubscribe {scripthash[:16]}...: {e}")
+
     def discover_peers(self):
         try:
             peers = self.call("server.peers.subscribe")
@@ -8,6 +8,7 @@
 import logging
 import os
 import secrets
+import threading
 import time
 
 import basicswap.util_xmr as xmr_util
@@ -28,6 +29,7 @@ from basicswap.interface.base import (
     Curves,
 )
 from basicswap.util import i2b, b2i, b2h, dumpj, ensure, TemporaryError
+from basicswap.util.crypto import sha256
 from basicswap.util.network import is_private_ip_address
 from basicswap.rpc_xmr import make_xmr_rpc_func, make_xmr_rpc2_func
 from basicswap.chainparams import Coins
@@ -37,6 +39,19 @@ from basicswap.interface.base import CoinInterface
 ed25519_l = 2**252 + 27742317777372353535851937790883648493
 
 
+class SwapWalletWorker:
+    """A wallet-rpc instance the swap wallets are spread over.
+
+    Only one wallet can be open in a wallet-rpc at a time, the last swap wallet
+    opened is left open so repeated checks of the same swap don't reload it.
+    """
+
+    def __init__(self, rpc_wallet):
+        self.rpc_wallet = rpc_wallet
+        self.lock = threading.Lock()
+        self.open_filename = None
+
+
 class XMRInterface(CoinInterface):
     @staticmethod
     def curve_type():
@@ -194,15 +209,30 @@ class XMRInterface(CoinInterface):
             default_timeout=self._walletrpctimeout,
             tag="Wallet ",
         )
+        # Extra wallet-rpc instances to check swap wallets concurrently
+        self._swap_wallet_workers = [
+            SwapWalletWorker(
+                make_xmr_rpc_func(
+                    port,
+                    coin_settings["walletrpcauth"],
+                    host=coin_settings.get("walletrpchost", "127.0.0.1"),
+                    default_timeout=self._walletrpctimeout,
+                    tag=f"Wallet{i} ",
+                )
+            )
+            for i, port in enumerate(coin_settings.get("swap_wallet_rpc_ports", []))
+        ]
 
     def setFeePriority(self, new_priority):
         ensure(new_priority >= 0 and new_priority < 4, "Invalid fee_priority value")
         self._fee_priority = new_priority
 
-    def createWallet(self, params):
+    def createWallet(self, params, rpc_wallet=None):
+        if rpc_wallet is None:
+            rpc_wallet = self.rpc_wallet
         if self._wallet_password is not None:
             params["password"] = self._wallet_password
-        rv = self.rpc_wallet("generate_from_keys", params)
+        rv = rpc_wallet("generate_from_keys", params)
         if "address" in rv:
             new_address: str = rv["address"]
             is_watch_only: bool = "Watch-only" in rv.get("info", "")
@@ -239,13 +269,15 @@ class XMRInterface(CoinInterface):
             except Exception:
                 pass
 
-    def _openWallet(self, filename):
+    def _openWallet(self, filename, rpc_wallet=None):
+        if rpc_wallet is None:
+            rpc_wallet = self.rpc_wallet
         params = {"filename": filename}
         if self._wallet_password is not None:
             params["password"] = self._wallet_password
 
         try:
-            self.rpc_wallet("open_wallet", params)
+            rpc_wallet("open_wallet", params)
         except Exception as e:
             if "no connection to daemon" in str(e):
                 self._log.debug(f"{self.coin_name()} {e}")
@@ -291,12 +323,12 @@ class XMRInterface(CoinInterface):
                     raise
             else:
                 try:
-                    self.rpc_wallet("close_wallet")
+                    rpc_wallet("close_wallet")
                     self._log.debug(f"Closing {self.coin_name()} wallet")
                 except Exception as e:  # noqa: F841
                     pass
 
-            self.rpc_wallet("open_wallet", params)
+            rpc_wallet("open_wallet", params)
             self._log.debug(f"Attempting to open {self.coin_name()} wallet")
 
     def initialiseWallet(
@@ -551,82 +583,119 @@ class XMRInterface(CoinInterface):
         bid_sender: bool,
         check_amount: bool = True,
     ):
-        with self._mx_wallet:
-            Kbv = self.getPubkey(kbv)
-            address_b58 = xmr_util.encode_address(Kbv, Kbs, self._addr_prefix)
+        Kbv = self.getPubkey(kbv)
+        address_b58 = xmr_util.encode_address(Kbv, Kbs, self._addr_prefix)
+
+        kbv_le = kbv[::-1]
+        params = {
+            "restore_height": restore_height,
+            "filename": address_b58,
+            "address": address_b58,
+            "viewkey": b2h(kbv_le),
+        }
 
-            kbv_le = kbv[::-1]
-            params = {
-                "restore_height": restore_height,
-                "filename": address_b58,
-                "address": address_b58,
-                "viewkey": b2h(kbv_le),
-            }
+        worker = self._getSwapWalletWorker(address_b58)
+        if worker is not None:
+            with worker.lock:
+                try:
+                    self._openSwapWallet(worker, address_b58, params)
+                    return self._findTxBInOpenWallet(
+                        worker.rpc_wallet, address_b58, cb_swap_value, check_amount
+                    )
+                except Exception:
+                    # The wallet-rpc may have been restarted
+                    worker.open_filename = None
+                    raise
 
+        with self._mx_wallet:
             try:
                 self.openWallet(address_b58)
             except Exception as e:  # noqa: F841
                 self.createWallet(params)
                 self.openWallet(address_b58)
+            return self._findTxBInOpenWallet(
+                self.rpc_wallet, address_b58, cb_swap_value, check_amount
+            )
 
-            self.rpc_wallet("refresh")
-            self._log.debug(f"Refreshing {self.coin_name()} wallet")
+    def _getSwapWalletWorker(self, wallet_address: str):
+        # The same swap wallet is always opened in the same wallet-rpc
+        if len(self._swap_wallet_workers) < 1:
+            return None
+        worker_ind: int = int.from_bytes(sha256(wallet_address.encode())[:4], "big")
+        return self._swap_wallet_workers[worker_ind % len(self._swap_wallet_workers)]
 
-            """
-            # Debug
-            try:
-                current_height = self.rpc_wallet('get_height')['height']
-                self._log.info('findTxB XMR current_height %d\nAddress: %s', current_height, address_b58)
-            except Exception as e:
-                self._log.info('rpc failed %s', str(e))
-                current_height = None  # If the transfer is available it will be deep enough
-                #   and (current_height is None or current_height - transfer['block_height'] > cb_block_confirmed):
-            """
-            try:
-                open_wallet_addr = self.rpc_wallet("get_address")["address"]
-            except Exception:
-                open_wallet_addr = "UNKNOWN"
-            if open_wallet_addr != address_b58:
-                raise TemporaryError(
-                    f"findTxB open wallet {open_wallet_addr} does not match swap shared wallet {address_b58}; refusing to check coin B lock amount"
-                )
-            params = {"transfer_type": "available"}
-            transfers = self.rpc_wallet("incoming_transfers", params)
-            rv = None
-            if "transfers" in transfers:
-                for transfer in transfers["transfers"]:
-                    # unlocked <- wallet->is_transfer_unlocked() checks unlock_time and CRYPTONOTE_DEFAULT_TX_SPENDABLE_AGE
-                    if not transfer["unlocked"]:
-                        full_tx = self.rpc_wallet(
-                            "get_transfer_by_txid", {"txid": transfer["tx_hash"]}
-                        )
-                        unlock_time = full_tx["transfer"]["unlock_time"]
-                        if unlock_time != 0:
-                            self._log.warning(
-                                "Coin b lock txn is locked: {}, unlock_time {}".format(
-                                    transfer["tx_hash"], unlock_time
-                                )
-                            )
-                            rv = -1
-                            continue
-                    if transfer["amount"] == cb_swap_value or check_amount is False:
-                        return {
-                            "txid": transfer["tx_hash"],
-                            "amount": transfer["amount"],
-                            "height": (
-                                0
-                                if "block_height" not in transfer
-                                else transfer["block_height"]
-                            ),
-                        }
-                    else:
+    def _openSwapWallet(self, worker, filename: str, params) -> None:
+        if worker.open_filename == filename:
+            return
+        worker.open_filename = None
+        try:
+            self._openWallet(filename, worker.rpc_wallet)
+        except Exception as e:  # noqa: F841
+            self.createWallet(params, worker.rpc_wallet)
+            self._openWallet(filename, worker.rpc_wallet)
+        worker.open_filename = filename
+
+    def _findTxBInOpenWallet(
+        self, rpc_wallet, address_b58: str, cb_swap_value: int, check_amount: bool
+    ):
+        rpc_wallet("refresh")
+        self._log.debug(f"Refreshing {self.coin_name()} wallet")
+
+        """
+        # Debug
+        try:
+            current_height = rpc_wallet('get_height')['height']
+            self._log.info('findTxB XMR current_height %d\nAddress: %s', current_height, address_b58)
+        except Exception as e:
+            self._log.info('rpc failed %s', str(e))
+            current_height = None  # If the transfer is available it will be deep enough
+            #   and (current_height is None or current_height - transfer['block_height'] > cb_block_confirmed):
+        """
+        try:
+            open_wallet_addr = rpc_wallet("get_address")["address"]
+        except Exception:
+            open_wallet_addr = "UNKNOWN"
+        if open_wallet_addr != address_b58:
+            raise TemporaryError(
+                f"findTxB open wallet {open_wallet_addr} does not match swap shared wallet {address_b58}; refusing to check coin B lock amount"
+            )
+        params = {"transfer_type": "available"}
+        transfers = rpc_wallet("incoming_transfers", params)
+        rv = None
+        if "transfers" in transfers:
+            for transfer in transfers["transfers"]:
+                # unlocked <- wallet->is_transfer_unlocked() checks unlock_time and CRYPTONOTE_DEFAULT_TX_SPENDABLE_AGE
+                if not transfer["unlocked"]:
+                    full_tx = rpc_wallet(
+                        "get_transfer_by_txid", {"txid": transfer["tx_hash"]}
+                    )
+                    unlock_time = full_tx["transfer"]["unlock_time"]
+                    if unlock_time != 0:
                         self._log.warning(
-                            "Incorrect amount detected for coin b lock txn: {}".format(
-                                transfer["tx_hash"]
+                            "Coin b lock txn is locked: {}, unlock_time {}".format(
+                                transfer["tx_hash"], unlock_time
                             )
                         )
                         rv = -1
-            return rv
+                        continue
+                if transfer["amount"] == cb_swap_value or check_amount is False:
+                    return {
+                        "txid": transfer["tx_hash"],
+                        "amount": transfer["amount"],
+                        "height": (
+                            0
+                            if "block_height" not in transfer
+                            else transfer["block_height"]
+                        ),
+                    }
+                else:
+                    self._log.warning(
+                        "Incorrect amount detected for coin b lock txn: {}".format(
+                            transfer["tx_hash"]
+                        )
+                    )
+                    rv = -1
+        return rv
 
     def findTxnByHash(self, txid: str):
         # TODO: Use get_transfer_by_txid and sending wallet when destination address is not owned
@@ -818,43 +887,59 @@ class XMRInterface(CoinInterface):
     def estimateFee(self, value: int, addr_to: str, sweepall: bool) -> str:
         return self.withdrawCoin(value, addr_to, sweepall, estimate_fee=True)
 
+    def _getLockTransfers(self, rpc_wallet, wallet_file: str):
+        rpc_wallet("refresh")
+        self._log.debug(f"Refreshing {self.coin_name()} wallet")
+
+        rv = rpc_wallet(
+            "get_transfers",
+            {"in": True, "out": True, "pending": True, "failed": True},
+        )
+        rv["filename"] = wallet_file
+        return rv
+
     def showLockTransfers(self, kbv, Kbs, restore_height):
-        with self._mx_wallet:
-            try:
-                Kbv = self.getPubkey(kbv)
-                address_b58 = xmr_util.encode_address(Kbv, Kbs, self._addr_prefix)
+        try:
+            Kbv = self.getPubkey(kbv)
+            address_b58 = xmr_util.encode_address(Kbv, Kbs, self._addr_prefix)
+            kbv_le = kbv[::-1]
+            params = {
+                "restore_height": restore_height,
+                "filename": address_b58,
+                "address": address_b58,
+                "viewkey": b2h(kbv_le),
+            }
+            # The view only wallet is kept open in its worker if there is one
+            worker = self._getSwapWalletWorker(address_b58)
+            with self._mx_wallet:
                 wallet_file = address_b58 + "_spend"
+                have_spend_wallet: bool = True
                 try:
                     self.openWallet(wallet_file)
                 except Exception:
-                    wallet_file = address_b58
+                    have_spend_wallet = False
+                if have_spend_wallet:
+                    return self._getLockTransfers(self.rpc_wallet, wallet_file)
+                if worker is None:
                     try:
-                        self.openWallet(wallet_file)
+                        self.openWallet(address_b58)
                     except Exception:
                         self._log.info(
                             f"showLockTransfers trying to create wallet for address {address_b58}."
                         )
-                        kbv_le = kbv[::-1]
-                        params = {
-                            "restore_height": restore_height,
-                            "filename": address_b58,
-                            "address": address_b58,
-                            "viewkey": b2h(kbv_le),
-                        }
                         self.createWallet(params)
                         self.openWallet(address_b58)
+                    return self._getLockTransfers(self.rpc_wallet, address_b58)
 
-                self.rpc_wallet("refresh")
-                self._log.debug(f"Refreshing {self.coin_name()} wallet")
-
-                rv = self.rpc_wallet(
-                    "get_transfers",
-                    {"in": True, "out": True, "pending": True, "failed": True},
-                )
-                rv["filename"] = wallet_file
-                return rv
-            except Exception as e:
-                return {"error": str(e)}
+            with worker.lock:
+                try:
+                    self._openSwapWallet(worker, address_b58, params)
+                    return self._getLockTransfers(worker.rpc_wallet, address_b58)
+                except Exception:
+                    worker.open_filename = None
+                    raise
+        except Exception as e:
+            return {"error": str(e)}
 
     def getSpendableBalance(self) -> int:
         with self._mx_wallet:
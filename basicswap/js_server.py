@@ -49,7 +49,6 @@ from .ui.util import (
 )
 from .ui.page_offers import postNewOffer
 from .protocols.xmr_swap_1 import recoverNoScriptTxnWithKey, getChainBSplitKey
-from .db import Concepts
 
 
 def getFormData(post_string: str, is_json: bool):
@@ -479,9 +478,11 @@ def js_offers(self, url_split, post_string, is_json, sent=False) -> bytes:
         if have_data_entry(post_data, "with_extra_info"):
             with_extra_info = toBool(get_data_entry(post_data, "with_extra_info"))
 
-    offers = swap_client.listOffers(sent, filters)
+    offers = swap_client.listOffers(
+        sent, filters, with_info=True, with_extra_info=with_extra_info
+    )
     rv = []
-    for o in offers:
+    for o, info in offers:
         ci_from = swap_client.ci(o.coin_from)
         ci_to = swap_client.ci(o.coin_to)
         offer_data = {
@@ -508,13 +509,7 @@ def js_offers(self, url_split, post_string, is_json, sent=False) -> bytes:
         }
         offer_data["auto_accept_type"] = getattr(o, "auto_accept_type", 0)
 
-        try:
-            tracking = swap_client.getOfferTrackingSummary(o)
-        except Exception as e:
-            swap_client.log.debug(
-                f"getOfferTrackingSummary failed for {o.offer_id.hex()}: {e}"
-            )
-            tracking = None
+        tracking = info["tracking"]
         if tracking is not None:
             offer_data["tracking_mode"] = tracking["mode"]
             offer_data["tracking_mode_str"] = tracking["mode_str"]
@@ -543,7 +538,7 @@ def js_offers(self, url_split, post_string, is_json, sent=False) -> bytes:
             offer_data["amount_negotiable"] = o.amount_negotiable
             offer_data["rate_negotiable"] = o.rate_negotiable
             if o.swap_type == SwapTypes.XMR_SWAP:
-                _, xmr_offer = swap_client.getXmrOffer(o.offer_id)
+                xmr_offer = info["xmr_offer"]
                 offer_data["lock_time_1"] = xmr_offer.lock_time_1
                 offer_data["lock_time_2"] = xmr_offer.lock_time_2
 
@@ -556,20 +551,8 @@ def js_offers(self, url_split, post_string, is_json, sent=False) -> bytes:
             offer_data["automation_strat_id"] = getattr(o, "auto_accept_type", 0)
 
             if o.was_sent:
-                try:
-                    strategy = swap_client.getLinkedStrategy(Concepts.OFFER, o.offer_id)
-                    if strategy:
-                        offer_data["local_automation_strat_id"] = strategy[0]
-                        swap_client.log.debug(
-                            f"Found local automation strategy for own offer {o.offer_id.hex()}: {strategy[0]}"
-                        )
-                    else:
-                        offer_data["local_automation_strat_id"] = 0
-                except Exception as e:
-                    swap_client.log.debug(
-                        f"Error getting local automation strategy for offer {o.offer_id.hex()}: {e}"
-                    )
-                    offer_data["local_automation_strat_id"] = 0
+                strategy = info["strategy"]
+                offer_data["local_automation_strat_id"] = strategy[0] if strategy else 0
 
         rv.append(offer_data)
     return bytes(json.dumps(rv), "UTF-8")
@@ -875,6 +858,15 @@ def js_network(self, url_split, post_string, is_json) -> bytes:
     return bytes(json.dumps(swap_client.get_network_info()), "UTF-8")
 
 
+def js_websocketstats(self, url_split, post_string, is_json) -> bytes:
+    swap_client = self.server.swap_client
+    if swap_client.ws_broadcaster is None:
+        return bytes(json.dumps({"enabled": False}), "UTF-8")
+    rv = {"enabled": True}
+    rv.update(swap_client.ws_broadcaster.getStats())
+    return bytes(json.dumps(rv), "UTF-8")
+
+
 def js_revokeoffer(self, url_split, post_string, is_json) -> bytes:
     swap_client = self.server.swap_client
     swap_client.checkSystemStatus()
@@ -2123,6 +2115,7 @@ endpoints = {
     "bids": js_bids,
     "sentbids": js_sentbids,
     "network": js_network,
+    "websocketstats": js_websocketstats,
     "revokeoffer": js_revokeoffer,
     "smsgaddresses": js_smsgaddresses,
     "rate": js_rate,
@@ -40,7 +40,7 @@ from basicswap.util.address import (
     b58decode,
 )
 from basicswap.util.logging import LogCategories as LC
-from basicswap.util.smsg import smsgGetID
+from basicswap.util.smsg import getSmsgPow, setSmsgPowWorkers, smsgGetID
 
 
 def networkTypeToID(type: str) -> int:
@@ -102,6 +102,9 @@ class BSXNetwork:
             60 * 60
         )  # Note: Set smsgsregtestadjust=0 for regtest
 
+        # Processes used to grind the pow for smsg messages encrypted in process
+        setSmsgPowWorkers(self.settings.get("smsg_pow_workers", 0))
+
         self.num_group_simplex_messages_received = 0
         self.num_group_simplex_messages_sent = 0
         self.num_direct_simplex_messages_received = 0
@@ -120,6 +123,8 @@ class BSXNetwork:
             self._network.stopNetwork()
             self._network = None
 
+        getSmsgPow().close()
+
         if self.zmqContext:
             self.zmqContext.destroy()
 
@@ -748,6 +753,8 @@ class BSXNetwork:
                 [addr_from, send_to, payload_hex, False, msg_valid, False, options],
             )
             self.num_smsg_messages_sent += 1
+            if self._smsg_add_to_outbox is not False:
+                self._expiring_smsgs.add(ro["msgid"], self.getTime() + msg_valid)
             if return_msg:
                 return bytes.fromhex(ro["msgid"]), bytes.fromhex(ro["msg"])
             return bytes.fromhex(ro["msgid"])
@@ -832,6 +839,7 @@ class BSXNetwork:
                 else:
                     raise RuntimeError(f'"smsg" failed for {msg_id.hex()}: {e}')
 
+        self.trackSmsgExpiry(msg)
         self.processMsg(msg)
 
     def newPortal(self, network_from_id, network_to_id, now):
@@ -1181,8 +1189,7 @@ class BSXNetwork:
                     ["unread", "", options],
                     timeout=self._smsg_rpc_bulk_timeout,
                 )
-                for msg in msgs["messages"]:
-                    self.processMsg(msg)
+                self.processMsgs(msgs["messages"])
 
         try:
             if self._bridge_networks:
@@ -15,6 +15,7 @@ import websocket
 from queue import Queue, Empty
 
 from basicswap.util.smsg import (
+    getSmsgPow,
     smsgEncrypt,
     smsgDecrypt,
     smsgGetID,
@@ -199,6 +200,14 @@ def encryptMsg(
         msg_valid,
         difficulty_target=difficulty_target,
     )
+    pow_stats = getSmsgPow().getStats()
+    self.log.debug(
+        "smsg pow: {} hashes in {:.3f}s, {:.0f} hashes/s".format(
+            pow_stats["hashes"],
+            pow_stats["seconds"],
+            pow_stats["hashes_per_second"],
+        )
+    )
 
     return smsg_msg
 
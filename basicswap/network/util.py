@@ -1,10 +1,11 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-# Copyright (c) 2025 The Basicswap developers
+# Copyright (c) 2025-2026 The Basicswap developers
 # Distributed under the MIT software license, see the accompanying
 # file LICENSE or http://www.opensource.org/licenses/mit-license.php.
 
+from basicswap.chainparams import Coins
 from basicswap.util.address import b58decode
 
 
@@ -18,3 +19,23 @@ def getMsgPubkey(self, msg) -> bytes:
         ],
     )
     return b58decode(rv["publickey"])
+
+
+def getMsgPubkeys(self, msgs) -> dict:
+    # Map each sender address to its pubkey, or to the exception raised looking it up
+    rv = {}
+    for msg in msgs:
+        if "pubkey_from" in msg:
+            rv[msg["from"]] = bytes.fromhex(msg["pubkey_from"])
+    lookup = list({msg["from"] for msg in msgs if msg["from"] not in rv})
+    results = self.callcoinrpcbatch(
+        Coins.PART,
+        [("smsggetpubkey", [address]) for address in lookup],
+        raise_errors=False,
+    )
+    for address, result in zip(lookup, results):
+        if isinstance(result, Exception):
+            rv[address] = result
+        else:
+            rv[address] = b58decode(result["publickey"])
+    return rv
@@ -94,6 +94,23 @@ def offer_tracking_is_exhausted(row, in_flight: int = 0) -> bool:
     return False
 
 
+def offer_tracking_summary(row, in_flight: int = 0) -> dict:
+    remaining = offer_tracking_remaining(row, in_flight)
+    return {
+        "mode": int(row.mode),
+        "mode_str": strOfferTrackingMode(row.mode),
+        "per_swap_amount": int(row.per_swap_amount or 0),
+        "total_budget": int(row.total_budget or 0),
+        "filled_amount": int(row.filled_amount or 0),
+        "fills_completed": int(row.fills_completed or 0),
+        "max_fills": int(row.max_fills or 0),
+        "min_wallet_reserve": int(row.min_wallet_reserve or 0),
+        "in_flight_amount": int(in_flight),
+        "remaining": None if remaining is None else int(remaining),
+        "exhausted": bool(offer_tracking_is_exhausted(row, in_flight)),
+    }
+
+
 def init_offer_tracking(
     self,
     offer_id: bytes,
@@ -149,6 +166,18 @@ def get_offer_tracking(self, offer_id: bytes, cursor):
     return self.queryOne(OfferTracking, cursor, {"offer_id": offer_id})
 
 
+def get_offer_trackings(self, offer_ids, cursor) -> dict:
+    # Tracking rows for many offers, keyed by offer_id
+    rv = {}
+    offer_ids = list(offer_ids)
+    for i in range(0, len(offer_ids), 500):
+        batch = offer_ids[i : i + 500]
+        constraint = batch if len(batch) > 1 else batch[0]
+        for row in self.query(OfferTracking, cursor, {"offer_id": constraint}):
+            rv[row.offer_id] = row
+    return rv
+
+
 def offer_in_flight_amount(
     cursor, offer_id: bytes, accept_action_types, exclude_bid_id=None, reverse_bid=False
 ) -> int:
@@ -180,6 +209,32 @@ def offer_in_flight_amount(
     return total
 
 
+def offers_in_flight_amounts(
+    cursor, offer_ids, accept_action_types, reverse_bid_offer_ids=()
+) -> dict:
+    # offer_in_flight_amount for many offers, keyed by offer_id
+    action_in = ", ".join(str(int(at)) for at in accept_action_types) or "NULL"
+    rv = {}
+    offer_ids = list(offer_ids)
+    for i in range(0, len(offer_ids), 500):
+        batch = offer_ids[i : i + 500]
+        ids_in = ", ".join(["?"] * len(batch))
+        query = f"""SELECT bids.bid_id, bids.offer_id, bids.amount, bids.amount_to FROM bids
+               JOIN bidstates ON bidstates.state_id = bids.state AND bidstates.in_progress > 0
+               WHERE bids.active_ind = 1 AND bids.offer_id IN ({ids_in})
+               UNION
+               SELECT bids.bid_id, bids.offer_id, bids.amount, bids.amount_to FROM bids
+               JOIN actions ON actions.linked_id = bids.bid_id AND actions.active_ind = 1 AND actions.action_type IN ({action_in})
+               WHERE bids.active_ind = 1 AND bids.offer_id IN ({ids_in})
+            """
+        for row in cursor.execute(query, batch + batch):
+            _, offer_id, amount, amount_to = row
+            if offer_id in reverse_bid_offer_ids:
+                amount = amount_to
+            rv[offer_id] = rv.get(offer_id, 0) + (amount if amount else 0)
+    return rv
+
+
 def complete_offer_fill(self, offer_id: bytes, amount: int, cursor) -> bool:
     row = get_offer_tracking(self, offer_id, cursor)
     if row is None:
@@ -9,6 +9,7 @@ import base64
 import http.client
 import json
 import logging
+import select
 import socket
 import traceback
 import urllib
@@ -22,6 +23,24 @@ from .util import jsonDecimal
 _use_rpc_pooling = False
 _rpc_pool_settings = {}
 
+# Read only methods that are safe to resend after a failure following the send
+RETRYABLE_METHODS = frozenset(
+    (
+        "getbestblockhash",
+        "getblock",
+        "getblockchaininfo",
+        "getblockcount",
+        "getblockhash",
+        "getblockheader",
+        "getnetworkinfo",
+        "getrawtransaction",
+        "gettransaction",
+        "gettxout",
+        "getwalletinfo",
+        "listunspent",
+    )
+)
+
 
 def enable_rpc_pooling(settings):
     global _use_rpc_pooling, _rpc_pool_settings
@@ -74,6 +93,7 @@ class Jsonrpc:
         *,
         context=None,
         timeout=10,
+        keep_alive=False,
     ):
         # establish a "logical" server connection
 
@@ -117,32 +137,107 @@ class Jsonrpc:
 
         self.__request_id = 1
 
+        # Reuse one HTTP/1.1 connection across requests if keep_alive is set
+        self.__keep_alive = keep_alive
+        self.__connection = None
+        # False if the last request failed before it was completely sent
+        self.request_sent: bool = False
+
     def close(self):
+        self.__close_connection()
         if self.__transport is not None:
             self.__transport.close()
 
-    def json_request(self, method, params):
-        connection = None
+    def __close_connection(self):
+        if self.__connection is not None:
+            try:
+                self.__connection.close()
+            except Exception:
+                pass
+            self.__connection = None
+
+    def __connection_is_stale(self) -> bool:
+        # An idle keep-alive socket should have nothing to read, if it's readable
+        # the server has closed it or sent unexpected data.
+        sock = self.__connection.sock
+        if sock is None:
+            return True
         try:
-            connection = self.__transport.make_connection(self.__host)
-            headers = self.__transport._extra_headers[:]
-
-            request_body = {"method": method, "params": params, "id": self.__request_id}
+            readable, _, _ = select.select([sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return len(readable) > 0
 
-            connection.putrequest("POST", self.__handler)
-            headers.append(("Content-Type", "application/json"))
-            headers.append(("User-Agent", "jsonrpc"))
-
-            if self.__auth:
-                headers.append(("Authorization", self.__auth))
-
-            self.__transport.send_headers(connection, headers)
-            self.__transport.send_content(
-                connection,
-                json.dumps(request_body, default=jsonDecimal).encode("utf-8"),
+    def json_request(self, method, params):
+        request_body = {"method": method, "params": params, "id": self.__request_id}
+        self.__request_id += 1
+        return self.__send_request(request_body)
+
+    def json_batch_request(self, calls):
+        # Send a list of (method, params) in one JSON-RPC batch request.
+        # Returns the response objects in the same order as calls, None if missing.
+        request_body = []
+        for method, params in calls:
+            request_body.append(
+                {"method": method, "params": params, "id": self.__request_id}
             )
             self.__request_id += 1
 
+        r = json.loads(self.__send_request(request_body).decode("utf-8"))
+        if not isinstance(r, list):
+            # The whole batch was rejected
+            raise ValueError("RPC error " + str(r.get("error", r)))
+        responses = {}
+        for item in r:
+            responses[item.get("id")] = item
+        return [responses.get(request["id"]) for request in request_body]
+
+    def __send_request(self, request_body):
+        request_data = json.dumps(request_body, default=jsonDecimal).encode("utf-8")
+        self.request_sent = False
+        if not self.__keep_alive:
+            return self.__send_request_once(request_data)
+
+        # Replace a connection the server has closed before sending on it, a
+        # failure after sending is left to the caller as the request may have run.
+        if self.__connection is not None and self.__connection_is_stale():
+            self.__close_connection()
+        return self.__send_request_keep_alive(request_data)
+
+    def __put_request(self, connection, request_data):
+        headers = self.__transport._extra_headers[:]
+
+        connection.putrequest("POST", self.__handler)
+        headers.append(("Content-Type", "application/json"))
+        headers.append(("User-Agent", "jsonrpc"))
+
+        if self.__auth:
+            headers.append(("Authorization", self.__auth))
+
+        self.__transport.send_headers(connection, headers)
+        self.__transport.send_content(connection, request_data)
+        self.request_sent = True
+
+    def __send_request_keep_alive(self, request_data):
+        if self.__connection is None:
+            self.__connection = self.__transport.make_connection(self.__host)
+        try:
+            self.__put_request(self.__connection, request_data)
+            resp = self.__connection.getresponse()
+            result = resp.read()
+            if resp.will_close:
+                self.__close_connection()
+            return result
+        except Exception:
+            self.__close_connection()
+            raise
+
+    def __send_request_once(self, request_data):
+        connection = None
+        try:
+            connection = self.__transport.make_connection(self.__host)
+            self.__put_request(connection, request_data)
+
             resp = connection.getresponse()
             result = resp.read()
 
@@ -216,15 +311,6 @@ def callrpc_pooled(
 
         try:
             v = conn.json_request(method, params)
-            r = json.loads(v.decode("utf-8"))
-
-            if "error" in r and r["error"] is not None:
-                pool.discard_connection(conn)
-                raise ValueError("RPC error " + str(r["error"]))
-
-            pool.return_connection(conn)
-            return r["result"]
-
         except (
             http.client.RemoteDisconnected,
             http.client.IncompleteRead,
@@ -239,19 +325,82 @@ def callrpc_pooled(
             OSError,
         ) as ex:
             pool.discard_connection(conn)
-            if attempt < max_retries - 1:
+            # Only resend if the request can't have reached the server
+            if attempt < max_retries - 1 and (
+                not conn.request_sent or method in RETRYABLE_METHODS
+            ):
                 continue
             logging.warning(
-                f"RPC server error after {max_retries} attempts: {ex}, method: {method}"
+                f"RPC server error after {attempt + 1} attempts: {ex}, method: {method}"
             )
             raise ValueError(f"RPC server error: {ex}, method: {method}")
-        except ValueError:
-            raise
         except Exception as ex:
             pool.discard_connection(conn)
             logging.error(f"Unexpected RPC error: {ex}, method: {method}")
             raise ValueError(f"RPC server error: {ex}, method: {method}")
 
+        # The connection is still usable after an error response
+        pool.return_connection(conn)
+        try:
+            r = json.loads(v.decode("utf-8"))
+        except Exception as ex:
+            raise ValueError(f"RPC server error: {ex}, method: {method}")
+        if "error" in r and r["error"] is not None:
+            raise ValueError("RPC error " + str(r["error"]))
+        return r["result"]
+
+
+def callrpc_batch(
+    rpc_port,
+    auth,
+    calls,
+    wallet=None,
+    host="127.0.0.1",
+    timeout=None,
+    raise_errors: bool = True,
+):
+    # Call a list of (method, params) in one request, results are returned in order.
+    # If raise_errors is False failed calls return a ValueError in place of the result.
+    if len(calls) < 1:
+        return []
+
+    url = Jsonrpc.constructUrl(auth, host, rpc_port, wallet)
+    try:
+        if _use_rpc_pooling and not timeout:
+            from .rpc_pool import get_rpc_pool
+
+            max_connections = _rpc_pool_settings.get("max_connections_per_daemon", 5)
+            pool = get_rpc_pool(url, max_connections)
+            conn = pool.get_connection()
+            try:
+                responses = conn.json_batch_request(calls)
+            except Exception:
+                pool.discard_connection(conn)
+                raise
+            pool.return_connection(conn)
+        else:
+            x = Jsonrpc(url, timeout=timeout if timeout else 10)
+            try:
+                responses = x.json_batch_request(calls)
+            finally:
+                x.close()
+    except Exception as ex:
+        raise ValueError(f"RPC server error: {ex}, method: batch of {len(calls)}")
+
+    rv = []
+    for call, r in zip(calls, responses):
+        if r is None:
+            err = ValueError(f"RPC error no response, method: {call[0]}")
+        elif "error" in r and r["error"] is not None:
+            err = ValueError("RPC error " + str(r["error"]))
+        else:
+            rv.append(r["result"])
+            continue
+        if raise_errors:
+            raise err
+        rv.append(err)
+    return rv
+
 
 def openrpc(rpc_port, auth, wallet=None, host="127.0.0.1", timeout=10):
     try:
@@ -279,6 +428,18 @@ def make_rpc_func(port, auth, wallet=None, host="127.0.0.1"):
             timeout=timeout,
         )
 
+    def rpc_batch_func(calls, wallet_override=None, timeout=None, raise_errors=True):
+        return callrpc_batch(
+            port,
+            auth,
+            calls,
+            wallet if wallet_override is None else wallet_override,
+            host,
+            timeout=timeout,
+            raise_errors=raise_errors,
+        )
+
+    rpc_func.batch = rpc_batch_func
     return rpc_func
 
 
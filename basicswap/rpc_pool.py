@@ -1,12 +1,13 @@
 # -*- coding: utf-8 -*-
 
-# Copyright (c) 2025 The Basicswap developers
+# Copyright (c) 2025-2026 The Basicswap developers
 # Distributed under the MIT software license, see the accompanying
 # file LICENSE or http://www.opensource.org/licenses/mit-license.php.
 
 import queue
 import threading
 import time
+import urllib
 from basicswap.rpc import Jsonrpc
 
 
@@ -24,6 +25,29 @@ class RPCConnectionPool:
         self._created_connections = 0
         self._connection_timestamps = {}
 
+        self._stats_hits = 0
+        self._stats_creations = 0
+        self._stats_wait_time = 0.0
+        self._stats_waits = 0
+        self._in_use = 0
+
+    def _new_connection(self):
+        with self._lock:
+            self._stats_creations += 1
+        return Jsonrpc(self.url, timeout=self.timeout, keep_alive=True)
+
+    def _mark_in_use(self, conn, hit: bool = False):
+        with self._lock:
+            self._in_use += 1
+            if hit:
+                self._stats_hits += 1
+        return conn
+
+    def _mark_released(self):
+        with self._lock:
+            if self._in_use > 0:
+                self._in_use -= 1
+
     def get_connection(self):
         try:
             conn_data = self._pool.get(block=False)
@@ -40,18 +64,23 @@ class RPCConnectionPool:
                 with self._lock:
                     if self._created_connections > 0:
                         self._created_connections -= 1
-                return self._create_new_connection()
+                return self._mark_in_use(self._create_new_connection())
 
-            return conn
+            return self._mark_in_use(conn, hit=True)
         except queue.Empty:
-            return self._create_new_connection()
+            return self._mark_in_use(self._create_new_connection())
 
     def _create_new_connection(self):
         with self._lock:
             if self._created_connections < self.max_connections:
                 self._created_connections += 1
-                return Jsonrpc(self.url)
+                create = True
+            else:
+                create = False
+        if create:
+            return self._new_connection()
 
+        wait_start = time.time()
         try:
             conn_data = self._pool.get(block=True, timeout=self.timeout)
             conn, timestamp = (
@@ -64,20 +93,28 @@ class RPCConnectionPool:
                         f"RPC pool: discarding stale connection (idle for {time.time() - timestamp:.1f}s)"
                     )
                 conn.close()
-                with self._lock:
-                    if self._created_connections > 0:
-                        self._created_connections -= 1
-                return Jsonrpc(self.url)
+                self._recordWait(wait_start)
+                return self._new_connection()
 
+            self._recordWait(wait_start, hit=True)
             return conn
         except queue.Empty:
+            self._recordWait(wait_start)
             if self.logger:
                 self.logger.warning(
-                    f"RPC pool: timeout waiting for connection, creating temporary connection for {self.url}"
+                    f"RPC pool: timeout waiting for connection, creating temporary connection for {redact_url(self.url)}"
                 )
-            return Jsonrpc(self.url)
+            return self._new_connection()
+
+    def _recordWait(self, wait_start: float, hit: bool = False) -> None:
+        with self._lock:
+            self._stats_waits += 1
+            self._stats_wait_time += time.time() - wait_start
+            if hit:
+                self._stats_hits += 1
 
     def return_connection(self, conn):
+        self._mark_released()
         try:
             self._pool.put((conn, time.time()), block=False)
         except queue.Full:
@@ -87,11 +124,24 @@ class RPCConnectionPool:
                     self._created_connections -= 1
 
     def discard_connection(self, conn):
+        self._mark_released()
         conn.close()
         with self._lock:
             if self._created_connections > 0:
                 self._created_connections -= 1
 
+    def get_stats(self):
+        with self._lock:
+            return {
+                "hits": self._stats_hits,
+                "creations": self._stats_creations,
+                "waits": self._stats_waits,
+                "wait_time": self._stats_wait_time,
+                "in_use": self._in_use,
+                "idle": self._pool.qsize(),
+                "max_connections": self.max_connections,
+            }
+
     def close_all(self):
         while not self._pool.empty():
             try:
@@ -124,6 +174,19 @@ def get_rpc_pool(url, max_connections=5):
         return _rpc_pools[url]
 
 
+def redact_url(url: str) -> str:
+    parsed = urllib.parse.urlparse(url)
+    if "@" not in parsed.netloc:
+        return url
+    return parsed._replace(netloc=parsed.netloc.rsplit("@", 1)[1]).geturl()
+
+
+def get_pool_stats():
+    with _pool_lock:
+        pools = list(_rpc_pools.values())
+    return {redact_url(pool.url): pool.get_stats() for pool in pools}
+
+
 def close_all_pools():
     with _pool_lock:
         for pool in _rpc_pools.values():
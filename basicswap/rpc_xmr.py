@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
 
+import contextlib
+import http.client
 import os
 import json
+import select
 import socks
+import threading
 import time
 import urllib
 import hashlib
@@ -14,6 +18,24 @@ from xmlrpc.client import (
 from sockshandler import SocksiPyConnection
 from .util import jsonDecimal
 
+# Read only methods that are safe to resend if a reused connection fails
+RETRYABLE_METHODS = frozenset(
+    (
+        "get_address",
+        "get_balance",
+        "get_block_count",
+        "get_block_header_by_height",
+        "get_fee_estimate",
+        "get_height",
+        "get_info",
+        "get_languages",
+        "get_transfers",
+        "get_version",
+        "incoming_transfers",
+        "refresh",
+    )
+)
+
 
 class SocksTransport(Transport):
 
@@ -91,7 +113,15 @@ class JsonrpcDigest:
 
         self.__request_id = 0
 
+        # Digest auth state from the last challenge, reused until the server
+        # rejects the nonce as stale.
+        self.__auth_realm = None
+        self.__auth_nonce = None
+        self.__auth_nc = 0
+        self.__connected = False
+
     def close(self):
+        self.__connected = False
         if self.__transport is not None:
             self.__transport.close()
 
@@ -128,100 +158,194 @@ class JsonrpcDigest:
             self.__transport.close()
             raise
 
-    def json_request(self, request_body, username="", password="", timeout=None):
+    def __connection_is_stale(self, connection) -> bool:
+        # An idle keep-alive socket should have nothing to read, if it's readable
+        # the server has closed it or sent unexpected data.
+        if connection.sock is None:
+            return False
         try:
-            connection = self.__transport.make_connection(self.__host)
-            if timeout:
-                connection.timeout = timeout
-
-            headers = self.__transport._extra_headers[:]
-
-            connection.putrequest("POST", self.__handler)
-            headers.append(("Content-Type", "application/json"))
-            headers.append(("Connection", "keep-alive"))
-            self.__transport.send_headers(connection, headers)
-            self.__transport.send_content(
-                connection,
-                (
-                    json.dumps(request_body, default=jsonDecimal).encode("utf-8")
-                    if request_body
-                    else ""
-                ),
+            readable, _, _ = select.select([connection.sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return len(readable) > 0
+
+    def __read_challenge(self, resp_headers) -> None:
+        realm = ""
+        nonce = ""
+        for h in resp_headers:
+            if h[0].lower() != "www-authenticate":
+                continue
+            fields = h[1].split(",")
+            for f in fields:
+                key, value = f.split("=", 1)
+                if key == "algorithm" and value != "MD5":
+                    break
+                if key == "realm":
+                    realm = value.strip('"')
+                if key == "nonce":
+                    nonce = value.strip('"')
+            if realm != "" and nonce != "":
+                break
+
+        if realm == "" or nonce == "":
+            raise ValueError("Authenticate header not found.")
+        self.__auth_realm = realm
+        self.__auth_nonce = nonce
+        self.__auth_nc = 0
+
+    def __auth_header(self, username: str, password: str) -> str:
+        realm = self.__auth_realm
+        nonce = self.__auth_nonce
+        path = self.__handler
+        HA1 = hashlib.md5(f"{username}:{realm}:{password}".encode("utf-8")).hexdigest()
+
+        http_method = "POST"
+        HA2 = hashlib.md5(f"{http_method}:{path}".encode("utf-8")).hexdigest()
+
+        self.__auth_nc += 1
+        ncvalue = "{:08x}".format(self.__auth_nc)
+        s = ncvalue.encode("utf-8")
+        s += nonce.encode("utf-8")
+        s += time.ctime().encode("utf-8")
+        s += os.urandom(8)
+        cnonce = hashlib.sha1(s).hexdigest()[:16]
+
+        # MD5-SESS
+        HA1 = hashlib.md5(f"{HA1}:{nonce}:{cnonce}".encode("utf-8")).hexdigest()
+
+        respdig = hashlib.md5(
+            f"{HA1}:{nonce}:{ncvalue}:{cnonce}:auth:{HA2}".encode("utf-8")
+        ).hexdigest()
+
+        return f'Digest username="{username}", realm="{realm}", nonce="{nonce}", uri="{path}", response="{respdig}", algorithm="MD5-sess", qop="auth", nc={ncvalue}, cnonce="{cnonce}"'
+
+    def __send_json(self, connection, request_body, auth_header=None):
+        headers = self.__transport._extra_headers[:]
+        if auth_header is not None:
+            headers.append(("Authorization", auth_header))
+
+        connection.putrequest("POST", self.__handler)
+        headers.append(("Content-Type", "application/json"))
+        headers.append(("Connection", "keep-alive"))
+        self.__transport.send_headers(connection, headers)
+        self.__transport.send_content(
+            connection,
+            (
+                json.dumps(request_body, default=jsonDecimal).encode("utf-8")
+                if request_body
+                else ""
+            ),
+        )
+        return connection.getresponse()
+
+    def __json_request(self, request_body, username, password, timeout):
+        connection = self.__transport.make_connection(self.__host)
+        if timeout:
+            connection.timeout = timeout
+            if connection.sock is not None:
+                connection.sock.settimeout(timeout)
+
+        # Authenticate pre-emptively once a challenge has been received
+        auth_header = None
+        if self.__auth_nonce is not None:
+            auth_header = self.__auth_header(username, password)
+        resp = self.__send_json(connection, request_body, auth_header)
+
+        if resp.status == 401:
+            # First request or stale nonce
+            resp_headers = resp.getheaders()
+            _ = resp.read()
+            self.__read_challenge(resp_headers)
+            if resp.will_close:
+                self.__transport.close()
+                connection = self.__transport.make_connection(self.__host)
+                if timeout:
+                    connection.timeout = timeout
+            resp = self.__send_json(
+                connection, request_body, self.__auth_header(username, password)
             )
-            resp = connection.getresponse()
-
-            if resp.status == 401:
-                resp_headers = resp.getheaders()
-                _ = resp.read()
-
-                realm = ""
-                nonce = ""
-                for h in resp_headers:
-                    if h[0] != "WWW-authenticate":
-                        continue
-                    fields = h[1].split(",")
-                    for f in fields:
-                        key, value = f.split("=", 1)
-                        if key == "algorithm" and value != "MD5":
-                            break
-                        if key == "realm":
-                            realm = value.strip('"')
-                        if key == "nonce":
-                            nonce = value.strip('"')
-                    if realm != "" and nonce != "":
-                        break
-
-                if realm == "" or nonce == "":
-                    raise ValueError("Authenticate header not found.")
-
-                path = self.__handler
-                HA1 = hashlib.md5(
-                    f"{username}:{realm}:{password}".encode("utf-8")
-                ).hexdigest()
-
-                http_method = "POST"
-                HA2 = hashlib.md5(f"{http_method}:{path}".encode("utf-8")).hexdigest()
-
-                ncvalue = "{:08x}".format(1)
-                s = ncvalue.encode("utf-8")
-                s += nonce.encode("utf-8")
-                s += time.ctime().encode("utf-8")
-                s += os.urandom(8)
-                cnonce = hashlib.sha1(s).hexdigest()[:16]
-
-                # MD5-SESS
-                HA1 = hashlib.md5(f"{HA1}:{nonce}:{cnonce}".encode("utf-8")).hexdigest()
-
-                respdig = hashlib.md5(
-                    f"{HA1}:{nonce}:{ncvalue}:{cnonce}:auth:{HA2}".encode("utf-8")
-                ).hexdigest()
-
-                header_value = f'Digest username="{username}", realm="{realm}", nonce="{nonce}", uri="{path}", response="{respdig}", algorithm="MD5-sess", qop="auth", nc={ncvalue}, cnonce="{cnonce}"'
-                headers = self.__transport._extra_headers[:]
-                headers.append(("Authorization", header_value))
-
-                connection.putrequest("POST", self.__handler)
-                headers.append(("Content-Type", "application/json"))
-                headers.append(("Connection", "keep-alive"))
-                self.__transport.send_headers(connection, headers)
-                self.__transport.send_content(
-                    connection,
-                    (
-                        json.dumps(request_body, default=jsonDecimal).encode("utf-8")
-                        if request_body
-                        else ""
-                    ),
-                )
-                resp = connection.getresponse()
 
-            self.__request_id += 1
-            return resp.read()
+        self.__request_id += 1
+        rv = resp.read()
+        self.__connected = not resp.will_close
+        if not self.__connected:
+            self.__transport.close()
+        return rv
 
+    def json_request(self, request_body, username="", password="", timeout=None):
+        reused: bool = False
+        if self.__connected:
+            connection = self.__transport.make_connection(self.__host)
+            if self.__connection_is_stale(connection):
+                self.close()
+            else:
+                reused = True
+        try:
+            return self.__json_request(request_body, username, password, timeout)
         except Fault:
             raise
+        except (
+            http.client.RemoteDisconnected,
+            http.client.BadStatusLine,
+            BrokenPipeError,
+            ConnectionResetError,
+            ConnectionAbortedError,
+        ):
+            self.close()
+            # The request may have reached the server, only resend read only calls
+            method = request_body.get("method") if request_body else None
+            if not reused or method not in RETRYABLE_METHODS:
+                raise
         except Exception:
-            self.__transport.close()
+            self.close()
             raise
+        # The server closed the reused connection before responding, retry once
+        # on a new connection.
+        try:
+            return self.__json_request(request_body, username, password, timeout)
+        except Exception:
+            self.close()
+            raise
+
+
+class JsonrpcDigestCache:
+    """Keeps a JsonrpcDigest per url to reuse its connection and digest auth
+    state across calls.
+
+    A client in use by another thread isn't waited for, a temporary client is
+    used instead.
+    """
+
+    def __init__(self, proxy_host=None, proxy_port=None):
+        self._proxy_host = proxy_host
+        self._proxy_port = proxy_port
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _make_client(self, url: str) -> JsonrpcDigest:
+        transport = None
+        if self._proxy_host:
+            transport = SocksTransport()
+            transport.set_proxy(self._proxy_host, self._proxy_port)
+        return JsonrpcDigest(url, transport=transport)
+
+    @contextlib.contextmanager
+    def client(self, url: str):
+        with self._lock:
+            if url not in self._clients:
+                self._clients[url] = (self._make_client(url), threading.Lock())
+            client, client_lock = self._clients[url]
+        if client_lock.acquire(blocking=False):
+            try:
+                yield client
+            finally:
+                client_lock.release()
+            return
+        client = self._make_client(url)
+        try:
+            yield client
+        finally:
+            client.close()
 
 
 def callrpc_xmr(
@@ -234,12 +358,16 @@ def callrpc_xmr(
     timeout=120,
     transport=None,
     tag="",
+    client=None,
 ):
     # auth is a tuple: (username, password)
+    # If client is set its connection is left open to be reused.
     try:
-        url = JsonrpcDigest.constructUrl(rpc_host, rpc_port, path)
-
-        x = JsonrpcDigest(url, transport=transport)
+        if client is None:
+            url = JsonrpcDigest.constructUrl(rpc_host, rpc_port, path)
+            x = JsonrpcDigest(url, transport=transport)
+        else:
+            x = client
         request_body = {
             "method": method,
             "params": params,
@@ -252,7 +380,8 @@ def callrpc_xmr(
             )
         else:
             v = x.json_request(request_body, timeout=timeout)
-        x.close()
+        if client is None:
+            x.close()
         r = json.loads(v.decode("utf-8"))
     except Exception as ex:
         raise ValueError(f"{tag}RPC Server Error: {ex}")
@@ -272,18 +401,22 @@ def callrpc_xmr2(
     timeout=120,
     transport=None,
     tag="",
+    client=None,
 ):
     try:
-        url = JsonrpcDigest.constructUrl(rpc_host, rpc_port, method)
-
-        x = JsonrpcDigest(url, transport=transport)
+        if client is None:
+            url = JsonrpcDigest.constructUrl(rpc_host, rpc_port, method)
+            x = JsonrpcDigest(url, transport=transport)
+        else:
+            x = client
         if auth:
             v = x.json_request(
                 params, username=auth[0], password=auth[1], timeout=timeout
             )
         else:
             v = x.json_request(params, timeout=timeout)
-        x.close()
+        if client is None:
+            x.close()
         r = json.loads(v.decode("utf-8"))
     except Exception as ex:
         raise ValueError(f"{tag}RPC Server Error: {ex}")
@@ -303,25 +436,23 @@ def make_xmr_rpc2_func(
     port = port
     auth = auth
     host = host
-    transport = None
     default_timeout = default_timeout
     tag = tag
-
-    if proxy_host:
-        transport = SocksTransport()
-        transport.set_proxy(proxy_host, proxy_port)
+    clients = JsonrpcDigestCache(proxy_host, proxy_port)
 
     def rpc_func(method, params=None, wallet=None, timeout=default_timeout):
-        return callrpc_xmr2(
-            port,
-            method,
-            params,
-            auth=auth,
-            rpc_host=host,
-            timeout=timeout,
-            transport=transport,
-            tag=tag,
-        )
+        url = JsonrpcDigest.constructUrl(host, port, method)
+        with clients.client(url) as client:
+            return callrpc_xmr2(
+                port,
+                method,
+                params,
+                auth=auth,
+                rpc_host=host,
+                timeout=timeout,
+                tag=tag,
+                client=client,
+            )
 
     return rpc_func
 
@@ -338,24 +469,22 @@ def make_xmr_rpc_func(
     port = port
     auth = auth
     host = host
-    transport = None
     default_timeout = default_timeout
     tag = tag
-
-    if proxy_host:
-        transport = SocksTransport()
-        transport.set_proxy(proxy_host, proxy_port)
+    clients = JsonrpcDigestCache(proxy_host, proxy_port)
+    url = JsonrpcDigest.constructUrl(host, port, "json_rpc")
 
     def rpc_func(method, params=None, wallet=None, timeout=default_timeout):
-        return callrpc_xmr(
-            port,
-            method,
-            params,
-            rpc_host=host,
-            auth=auth,
-            timeout=timeout,
-            transport=transport,
-            tag=tag,
-        )
+        with clients.client(url) as client:
+            return callrpc_xmr(
+                port,
+                method,
+                params,
+                rpc_host=host,
+                auth=auth,
+                timeout=timeout,
+                tag=tag,
+                client=client,
+            )
 
     return rpc_func
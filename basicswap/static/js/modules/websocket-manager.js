@@ -251,6 +251,8 @@ const WebSocketManager = (function() {
 
             log('WebSocket connection established');
 
+            ws.send(JSON.stringify({ batch: true }));
+
             notifyHandlers('connect', { isConnected: true });
 
             if (typeof updateConnectionStatus === 'function') {
@@ -262,7 +264,11 @@ const WebSocketManager = (function() {
             try {
                 const message = JSON.parse(event.data);
                 log('WebSocket message received:', message);
-                notifyHandlers('message', message);
+                if (message.event === 'batch' && Array.isArray(message.events)) {
+                    message.events.forEach(e => notifyHandlers('message', e));
+                } else {
+                    notifyHandlers('message', message);
+                }
             } catch (error) {
                 log('Error processing message:', error);
                 if (typeof updateConnectionStatus === 'function') {
@@ -275,6 +275,12 @@ def start_amm_process(
         "--statefile",
         state_path,
     ]
+    if swap_client.ws_server:
+        # Passes run on node events instead of waiting out main_loop_delay
+        ws_host = swap_client.settings["wshost"]
+        if ws_host in ("0.0.0.0", "::", ""):
+            ws_host = "127.0.0.1"
+        cmd += ["--wshost", ws_host, "--wsport", str(swap_client.settings["wsport"])]
 
     cmd_str = " ".join(cmd)
     swap_client.log.info(f"Starting AMM process with command: {cmd_str}")
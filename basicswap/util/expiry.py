@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 The Basicswap developers
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE or http://www.opensource.org/licenses/mit-license.php.
+
+import heapq
+
+
+class ExpiryScheduler:
+    """Min-heap of record ids ordered by expire_at.
+
+    Adding an id again with a new expire_at supersedes the earlier entry, stale
+    heap entries are dropped when they reach the top.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._expire_at = {}
+
+    def __len__(self) -> int:
+        return len(self._expire_at)
+
+    def __contains__(self, record_id) -> bool:
+        return record_id in self._expire_at
+
+    def add(self, record_id, expire_at: int) -> None:
+        if self._expire_at.get(record_id) == expire_at:
+            return
+        self._expire_at[record_id] = expire_at
+        heapq.heappush(self._heap, (expire_at, record_id))
+
+    def remove(self, record_id) -> None:
+        self._expire_at.pop(record_id, None)
+
+    def popDue(self, now: int) -> list:
+        rv = []
+        while len(self._heap) > 0 and self._heap[0][0] <= now:
+            expire_at, record_id = heapq.heappop(self._heap)
+            if self._expire_at.get(record_id) != expire_at:
+                continue
+            del self._expire_at[record_id]
+            rv.append(record_id)
+        return rv
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._expire_at.clear()
@@ -5,13 +5,16 @@
 # Distributed under the MIT software license, see the accompanying
 # file LICENSE or http://www.opensource.org/licenses/mit-license.php.
 
+import concurrent.futures
 import hashlib
 import hmac
+import multiprocessing
 import secrets
+import threading
 import time
 
 
-from typing import Union, Dict
+from typing import Optional, Tuple, Union, Dict
 from coincurve.keys import (
     PublicKey,
     PrivateKey,
@@ -22,7 +25,6 @@ from basicswap.util.crypto import hash160, sha256, ripemd160
 from basicswap.util.ecc import getSecretInt
 from basicswap.contrib.test_framework.messages import (
     uint256_from_compact,
-    uint256_from_str,
 )
 
 AES_BLOCK_SIZE = 16
@@ -81,6 +83,149 @@ def smsgGetPOWHash(smsg_message: bytes) -> bytes:
     return m.digest()
 
 
+# HMAC pad translation tables, see RFC 2104
+_HMAC_IPAD = bytes((x ^ 0x36) for x in range(256))
+_HMAC_OPAD = bytes((x ^ 0x5C) for x in range(256))
+_HMAC_KEY_PAD = bytes(32)  # Nonce key is 32 bytes, sha256 block is 64
+
+SMSG_POW_MAX_NONCE = 1000000
+
+
+def smsgPowSearch(
+    message_tail: bytes, target: int, nonce_start: int, nonce_end: int
+) -> Tuple[Optional[int], Optional[bytes], int]:
+    """Search nonces in [nonce_start, nonce_end) for a valid smsg pow hash.
+
+    message_tail is the message after the hash and nonce fields.
+    Equivalent to smsgGetPOWHash, with the hmac pads built directly from the
+    nonce and the message tail passed to sha256 without copying.
+    Returns (nonce, pow_hash, hashes) with nonce and pow_hash None if not found.
+    """
+    sha256_new = hashlib.sha256
+    for nonce in range(nonce_start, nonce_end):
+        nonce_bytes: bytes = nonce.to_bytes(4, byteorder="little")
+        key: bytes = nonce_bytes * 8 + _HMAC_KEY_PAD
+        inner = sha256_new(key.translate(_HMAC_IPAD))
+        inner.update(nonce_bytes)
+        inner.update(message_tail)
+        pow_hash: bytes = sha256_new(
+            key.translate(_HMAC_OPAD) + inner.digest()
+        ).digest()
+        if int.from_bytes(pow_hash, byteorder="little") <= target:
+            return nonce, pow_hash, nonce - nonce_start + 1
+    return None, None, nonce_end - nonce_start
+
+
+class SmsgPow:
+    """Grind the smsg proof of work nonce.
+
+    With num_workers > 0 the nonce space is split into chunks searched by a
+    process pool, chunks are checked in order so the lowest valid nonce is
+    always returned, matching the single process search.
+    """
+
+    def __init__(self, num_workers: int = 0, chunk_size: int = 1 << 14):
+        self._num_workers = num_workers
+        self._chunk_size = chunk_size
+        self._executor = None
+        self._mx = threading.Lock()
+        self.last_hashes: int = 0
+        self.last_seconds: float = 0.0
+
+    def hashesPerSecond(self) -> float:
+        if self.last_seconds <= 0.0:
+            return 0.0
+        return self.last_hashes / self.last_seconds
+
+    def getStats(self) -> Dict:
+        return {
+            "workers": self._num_workers,
+            "hashes": self.last_hashes,
+            "seconds": self.last_seconds,
+            "hashes_per_second": self.hashesPerSecond(),
+        }
+
+    def close(self) -> None:
+        with self._mx:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _getExecutor(self):
+        with self._mx:
+            if self._executor is None:
+                # Don't fork the threaded parent process
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self._num_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _searchPool(self, message_tail: bytes, target: int, max_nonce: int):
+        executor = self._getExecutor()
+        pending = []
+        next_nonce: int = 0
+        hashes: int = 0
+
+        def submitChunk():
+            nonlocal next_nonce
+            if next_nonce >= max_nonce:
+                return
+            nonce_end = min(next_nonce + self._chunk_size, max_nonce)
+            pending.append(
+                executor.submit(
+                    smsgPowSearch, message_tail, target, next_nonce, nonce_end
+                )
+            )
+            next_nonce = nonce_end
+
+        try:
+            for i in range(self._num_workers * 2):
+                submitChunk()
+            while len(pending) > 0:
+                nonce, pow_hash, chunk_hashes = pending.pop(0).result()
+                hashes += chunk_hashes
+                if nonce is not None:
+                    return nonce, pow_hash, hashes
+                submitChunk()
+        finally:
+            for future in pending:
+                future.cancel()
+        return None, None, hashes
+
+    def find(
+        self, smsg_message: bytes, target: int, max_nonce: int = SMSG_POW_MAX_NONCE
+    ) -> bytes:
+        # Returns smsg_message with the pow hash and nonce fields set
+        message_tail: bytes = smsg_message[8:]
+        time_start: float = time.perf_counter()
+        if self._num_workers > 0:
+            nonce, pow_hash, hashes = self._searchPool(message_tail, target, max_nonce)
+        else:
+            nonce, pow_hash, hashes = smsgPowSearch(message_tail, target, 0, max_nonce)
+        self.last_seconds = time.perf_counter() - time_start
+        self.last_hashes = hashes
+        if nonce is None:
+            raise ValueError("Failed to set POW hash.")
+        return pow_hash[:4] + nonce.to_bytes(4, byteorder="little") + message_tail
+
+
+_smsg_pow = SmsgPow()
+
+
+def setSmsgPowWorkers(num_workers: int) -> None:
+    global _smsg_pow
+    if num_workers == _smsg_pow._num_workers:
+        return
+    old_pow = _smsg_pow
+    _smsg_pow = SmsgPow(num_workers)
+    old_pow.close()
+
+
+def getSmsgPow() -> SmsgPow:
+    return _smsg_pow
+
+
 def smsgGetID(smsg_message: bytes) -> bytes:
     assert len(smsg_message) > SMSG_HDR_LEN
     smsg_timestamp = smsgGetTimestamp(smsg_message)
@@ -96,6 +241,7 @@ def smsgEncrypt(
     payload_format: int = 2,
     smsg_ttl: int = SMSG_MIN_TTL,
     difficulty_target=0x1EFFFFFF,
+    pow_engine: SmsgPow = None,
 ) -> bytes:
     # assert len(payload) < 128  # Requires lz4 if payload > 128 bytes
     # TODO: Add lz4 to match core smsg
@@ -177,17 +323,7 @@ def smsgEncrypt(
     )
 
     target: int = uint256_from_compact(difficulty_target)
-    for i in range(1000000):
-        pow_hash = smsgGetPOWHash(smsg_message)
-        if uint256_from_str(pow_hash) > target:
-            smsg_nonce = (int.from_bytes(smsg_nonce, byteorder="little") + 1).to_bytes(
-                4, byteorder="little"
-            )
-            smsg_message = pow_hash[:4] + smsg_nonce + smsg_message[8:]
-            continue
-        smsg_message = pow_hash[:4] + smsg_message[4:]
-        return smsg_message
-    raise ValueError("Failed to set POW hash.")
+    return (pow_engine if pow_engine else _smsg_pow).find(smsg_message, target)
 
 
 def smsgDecrypt(
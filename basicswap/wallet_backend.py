@@ -192,6 +192,8 @@ class ElectrumBackend(WalletBackend):
 
         self._realtime_callback = None
         self._address_to_scripthash = {}
+        self._watch_callback = None
+        self._watch_scripthashes = set()
 
         self._cached_height = 0
         self._cached_height_time = 0
@@ -708,6 +710,24 @@ class ElectrumBackend(WalletBackend):
 
         return result
 
+    def getBatchHistory(self, scripthashes: List[str]) -> Dict[str, List[dict]]:
+        # Raises if any history is missing, an error must not read as unused
+        if not scripthashes:
+            return {}
+        calls = [("blockchain.scripthash.get_history", [sh]) for sh in scripthashes]
+        responses = self._call_batch(calls)
+        if responses is None or len(responses) != len(scripthashes):
+            raise ValueError("getBatchHistory: incomplete batch response")
+        result = {}
+        for sh, history in zip(scripthashes, responses):
+            if history is None:
+                raise ValueError(f"getBatchHistory: no history for {sh[:16]}...")
+            result[sh] = [
+                {"txid": h.get("tx_hash"), "height": h.get("height", 0)}
+                for h in history
+            ]
+        return result
+
     def getBatchUnspent(
         self, scripthashes: List[str], min_confirmations: int = 0
     ) -> Dict[str, List[dict]]:
@@ -756,6 +776,12 @@ class ElectrumBackend(WalletBackend):
         return callback
 
     def _handle_scripthash_notification(self, scripthash, new_status):
+        if self._watch_callback and scripthash in self._watch_scripthashes:
+            try:
+                self._watch_callback(self._coin_type, scripthash)
+            except Exception as e:
+                self._log.debug(f"Error in watch callback: {e}")
+
         if not self._realtime_callback:
             return
 
@@ -793,6 +819,30 @@ class ElectrumBackend(WalletBackend):
             self._log.debug(f"Failed to subscribe to {address}: {e}")
             return None
 
+    def setWatchCallback(self, callback) -> None:
+        # callback(coin_type, scripthash) runs on the listener thread
+        self._watch_callback = callback
+        self._server.enable_realtime_notifications()
+
+    def subscribeWatchScripthash(self, scripthash: str):
+        self._watch_scripthashes.add(scripthash)
+        status = self._server.subscribe_with_callback(
+            scripthash, self._create_scripthash_callback(scripthash)
+        )
+        self._subscribed_scripthashes.add(scripthash)
+        return status
+
+    def unsubscribeWatchScripthash(self, scripthash: str) -> None:
+        self._watch_scripthashes.discard(scripthash)
+        if scripthash in self._address_to_scripthash.values():
+            # Still needed for wallet balance notifications
+            return
+        self._subscribed_scripthashes.discard(scripthash)
+        self._server.unsubscribe(scripthash)
+
+    def getLastReconnectTime(self) -> float:
+        return getattr(self._server, "_last_reconnect_time", 0)
+
     def getSyncStatus(self) -> dict:
         import time
 
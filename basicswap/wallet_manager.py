@@ -24,7 +24,7 @@ from .db_wallet import (
     WalletWatchOnly,
 )
 from .util.crypto import hash160, sha256
-from .util.extkey import ExtKeyPair
+from .util.extkey import BIP32Hash, ExtKeyPair
 
 # Imported private keys are stored AEAD-encrypted as:
 #   version(1) | nonce(24) | mac(16) | ciphertext
@@ -626,16 +626,20 @@ class WalletManager:
         except Exception:
             return 0
 
-    def syncBalances(self, coin_type: Coins, backend, funded_only: bool = False) -> int:
+    def syncBalances(
+        self, coin_type: Coins, backend, funded_only: bool = False
+    ) -> Optional[List[str]]:
+        # Returns the addresses whose cached balance changed, None if skipped
+        # or the sync failed
 
         if not self.isInitialized(coin_type):
-            return 0
+            return []
 
         if not self._balance_sync_lock.acquire(blocking=False):
             self._log.debug(
                 f"syncBalances: skipping, already in progress for {Coins(coin_type).name}"
             )
-            return 0
+            return None
 
         try:
             addresses = []
@@ -677,60 +681,82 @@ class WalletManager:
                 self._swap_client.closeDB(cursor, commit=False)
 
             if not addresses:
-                return 0
+                return []
 
             try:
                 balances = backend.getBalance(addresses)
             except Exception as e:
                 self._log.warning(f"syncBalances network error: {e}")
-                return 0
+                return None
 
             if not balances:
-                return 0
+                return []
 
             cursor = self._swap_client.openDB()
             try:
-                now = int(time.time())
-                updated = 0
-
+                rows = []
                 for addr, balance in balances.items():
                     if addr not in addr_info:
                         continue
-
                     record_type, _, _ = addr_info[addr]
-                    if record_type == "wallet":
-                        record = self._swap_client.queryOne(
-                            WalletAddress,
-                            cursor,
-                            {"coin_type": int(coin_type), "address": addr},
-                        )
-                    else:
-                        record = self._swap_client.queryOne(
-                            WalletWatchOnly,
-                            cursor,
-                            {"coin_type": int(coin_type), "address": addr},
-                        )
+                    rows.append((addr, record_type == "wallet", balance))
+                if not rows:
+                    return []
 
-                    if record:
-                        old_balance = record.cached_balance or 0
-                        if balance != old_balance or balance > 0:
-                            record.cached_balance = balance
-                            record.is_funded = balance > 0
-                            if record_type == "wallet":
-                                record.cached_balance_time = now
-                                if balance > 0:
-                                    record.ever_used = True
-                            self._swap_client.updateDB(
-                                record, cursor, constraints=["coin_type", "address"]
-                            )
-                            updated += 1
+                # Stage the balances in a temp table so each wallet table is
+                # reconciled in one statement rather than a query per address.
+                cursor.execute(
+                    "CREATE TEMP TABLE IF NOT EXISTS wallet_balance_sync (address TEXT PRIMARY KEY, is_wallet INTEGER, balance INTEGER)"
+                )
+                cursor.execute("DELETE FROM wallet_balance_sync")
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO wallet_balance_sync (address, is_wallet, balance) VALUES (?, ?, ?)",
+                    rows,
+                )
+
+                changed = []
+                cursor.execute(
+                    "SELECT w.address FROM wallet_addresses w JOIN wallet_balance_sync b ON b.address = w.address AND b.is_wallet = 1 WHERE w.coin_type = ? AND b.balance != COALESCE(w.cached_balance, 0)",
+                    (int(coin_type),),
+                )
+                changed.extend(row[0] for row in cursor.fetchall())
+                cursor.execute(
+                    "SELECT w.address FROM wallet_watch_only w JOIN wallet_balance_sync b ON b.address = w.address AND b.is_wallet = 0 WHERE w.coin_type = ? AND b.balance != COALESCE(w.cached_balance, 0)",
+                    (int(coin_type),),
+                )
+                changed.extend(row[0] for row in cursor.fetchall())
+
+                # Funded rows are rewritten too, to refresh cached_balance_time
+                cursor.execute(
+                    """UPDATE wallet_addresses SET
+                        cached_balance = (SELECT b.balance FROM wallet_balance_sync b WHERE b.address = wallet_addresses.address),
+                        is_funded = (SELECT b.balance > 0 FROM wallet_balance_sync b WHERE b.address = wallet_addresses.address),
+                        ever_used = CASE WHEN (SELECT b.balance > 0 FROM wallet_balance_sync b WHERE b.address = wallet_addresses.address) THEN 1 ELSE ever_used END,
+                        cached_balance_time = ?
+                    WHERE coin_type = ? AND EXISTS (
+                        SELECT 1 FROM wallet_balance_sync b
+                        WHERE b.address = wallet_addresses.address AND b.is_wallet = 1
+                        AND (b.balance != COALESCE(wallet_addresses.cached_balance, 0) OR b.balance > 0))""",
+                    (int(time.time()), int(coin_type)),
+                )
+                cursor.execute(
+                    """UPDATE wallet_watch_only SET
+                        cached_balance = (SELECT b.balance FROM wallet_balance_sync b WHERE b.address = wallet_watch_only.address),
+                        is_funded = (SELECT b.balance > 0 FROM wallet_balance_sync b WHERE b.address = wallet_watch_only.address)
+                    WHERE coin_type = ? AND EXISTS (
+                        SELECT 1 FROM wallet_balance_sync b
+                        WHERE b.address = wallet_watch_only.address AND b.is_wallet = 0
+                        AND (b.balance != COALESCE(wallet_watch_only.cached_balance, 0) OR b.balance > 0))""",
+                    (int(coin_type),),
+                )
+                cursor.execute("DELETE FROM wallet_balance_sync")
 
                 self._swap_client.commitDB()
-                return updated
+                return changed
             except Exception as e:
                 self._log.warning(f"syncBalances DB error: {e}")
                 self._swap_client.rollbackDB()
-                return 0
+                return None
             finally:
                 self._swap_client.closeDB(cursor, commit=False)
         finally:
@@ -1483,127 +1509,208 @@ class WalletManager:
         finally:
             self._swap_client.closeDB(cursor, commit=False)
 
-    def scanForFundedAddresses(
-        self, coin_type: Coins, backend, gap_limit: int = None
-    ) -> int:
-        if gap_limit is None:
-            gap_limit = self.getGapLimit(coin_type)
-        if not self.isInitialized(coin_type):
-            return 0
-
-        addresses_to_check = []
+    def _deriveAddresses(
+        self, coin_type: Coins, start: int, count: int, internal: bool = False
+    ) -> List[Tuple[str, str, bytes]]:
+        # Public (CKDpub) derivation from the chain key, the parent pubkey and
+        # HRP are computed once for the whole range.
+        chain = (
+            self._internal_chains[coin_type]
+            if internal
+            else self._external_chains[coin_type]
+        )
+        parent_pubkey = chain.get_pubkey()
+        K = PublicKey(parent_pubkey)
+        hrp = self._getHRP(coin_type)
+        rv = []
+        for index in range(start, start + count):
+            new_hash = BIP32Hash(
+                chain._chaincode, index, parent_pubkey[0], parent_pubkey[1:]
+            )
+            pubkey = K.add(new_hash[:32]).format()
+            pkh = hash160(pubkey)
+            address = segwit_addr.encode(hrp, 0, pkh)
+            scripthash = sha256(bytes([0x00, 0x14]) + pkh)[::-1].hex()
+            rv.append((address, scripthash, pubkey))
+        return rv
+
+    def _getScanWindow(
+        self, coin_type: Coins, internal: bool, start: int, count: int
+    ) -> List[Tuple[int, str, str, bool]]:
+        # Returns (index, address, scripthash, is_funded) for start..start+count,
+        # deriving and storing any addresses not yet in the db.
         cursor = self._swap_client.openDB()
         try:
-            bip44_coin = self.BIP84_COIN_TYPES.get(coin_type, 0)
-            now = int(time.time())
+            cursor.execute(
+                "SELECT derivation_index, address, scripthash, is_funded FROM wallet_addresses"
+                " WHERE coin_type = ? AND is_internal = ?"
+                " AND derivation_index >= ? AND derivation_index < ?",
+                (int(coin_type), internal, start, start + count),
+            )
+            existing = {row[0]: row for row in cursor.fetchall()}
 
-            for internal in [False, True]:
+            missing = [i for i in range(start, start + count) if i not in existing]
+            if missing:
+                bip44_coin = self.BIP84_COIN_TYPES.get(coin_type, 0)
                 chain_idx = 1 if internal else 0
-                for index in range(gap_limit):
-                    record = self._swap_client.queryOne(
-                        WalletAddress,
-                        cursor,
-                        {
-                            "coin_type": int(coin_type),
-                            "derivation_index": index,
-                            "is_internal": internal,
-                        },
-                    )
-                    if record is None:
-                        address, scripthash, pubkey = self._deriveAddress(
-                            coin_type, index, internal
-                        )
-                        record = WalletAddress(
-                            coin_type=int(coin_type),
-                            derivation_index=index,
-                            is_internal=internal,
-                            derivation_path=f"m/84'/{bip44_coin}'/0'/{chain_idx}/{index}",
-                            address=address,
-                            scripthash=scripthash,
-                            pubkey=pubkey,
-                            is_funded=False,
-                            ever_used=False,
-                            created_at=now,
+                now = int(time.time())
+                derived = self._deriveAddresses(coin_type, start, count, internal)
+                rows = []
+                for index in missing:
+                    address, scripthash, pubkey = derived[index - start]
+                    rows.append(
+                        (
+                            int(coin_type),
+                            index,
+                            internal,
+                            f"m/84'/{bip44_coin}'/0'/{chain_idx}/{index}",
+                            address,
+                            scripthash,
+                            pubkey,
+                            now,
                         )
-                        self._swap_client.add(record, cursor)
-
-                    if not record.is_funded:
-                        addresses_to_check.append((record.address, index, internal))
-
-            self._swap_client.commitDB()
+                    )
+                    existing[index] = (index, address, scripthash, False)
+                cursor.executemany(
+                    "INSERT INTO wallet_addresses (coin_type, derivation_index, is_internal, derivation_path, address, scripthash, pubkey, is_funded, ever_used, cached_balance, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, 0, 0, 0, ?)",
+                    rows,
+                )
+                self._swap_client.commitDB()
         finally:
             self._swap_client.closeDB(cursor, commit=False)
 
-        if not addresses_to_check:
-            return 0
-
-        funded_addresses = []
-        try:
-            addr_list = [a[0] for a in addresses_to_check]
-            balances = backend.getBalance(addr_list)
-            for addr, balance in balances.items():
-                if balance > 0:
-                    for check_addr, index, internal in addresses_to_check:
-                        if check_addr == addr:
-                            funded_addresses.append((addr, index, internal, balance))
-                            break
-        except Exception:
-            return 0
-
-        if not funded_addresses:
-            return 0
+        rv = []
+        for index in range(start, start + count):
+            _, address, scripthash, is_funded = existing[index]
+            if not scripthash:
+                scripthash = self._computeScripthash(coin_type, address)
+            rv.append((index, address, scripthash, bool(is_funded)))
+        return rv
+
+    def _queryScanWindow(self, backend, window) -> Dict[int, int]:
+        # Returns {derivation_index: balance} for the used addresses in window
+        if hasattr(backend, "getBatchHistory"):
+            histories = backend.getBatchHistory([w[2] for w in window])
+            used = [w for w in window if histories.get(w[2])]
+            if not used:
+                return {}
+            balances = backend.getBatchBalance([w[2] for w in used])
+            return {w[0]: balances.get(w[2], 0) for w in used}
+
+        balances = backend.getBalance([w[1] for w in window])
+        return {w[0]: balances[w[1]] for w in window if balances.get(w[1], 0) > 0}
+
+    def _getScanStart(
+        self, coin_type: Coins, internal: bool, cursor
+    ) -> Tuple[int, int]:
+        # Returns the index to resume scanning from and the gap leading up to it
+        state = self._swap_client.queryOne(
+            WalletState, cursor, {"coin_type": int(coin_type)}
+        )
+        start = None
+        if state:
+            start = state.scan_internal_index if internal else state.scan_external_index
+        if start is None:
+            return 0, 0
+        cursor.execute(
+            "SELECT MAX(derivation_index) FROM wallet_addresses"
+            " WHERE coin_type = ? AND is_internal = ? AND derivation_index < ?"
+            " AND (ever_used = 1 OR is_funded = 1)",
+            (int(coin_type), internal, start),
+        )
+        last_used = cursor.fetchone()[0]
+        if last_used is None:
+            last_used = -1
+        return start, start - last_used - 1
 
+    def _storeScanWindow(
+        self, coin_type: Coins, internal: bool, used: Dict[int, int], next_index: int
+    ) -> None:
         cursor = self._swap_client.openDB()
         try:
-            found = 0
-            max_ext_index = max_int_index = None
-
-            for addr, index, internal, balance in funded_addresses:
-                record = self._swap_client.queryOne(
-                    WalletAddress,
-                    cursor,
-                    {"coin_type": int(coin_type), "address": addr},
+            now = int(time.time())
+            if used:
+                cursor.executemany(
+                    "UPDATE wallet_addresses SET ever_used = 1, is_funded = ?, cached_balance = ?, cached_balance_time = ?"
+                    " WHERE coin_type = ? AND is_internal = ? AND derivation_index = ?",
+                    [
+                        (balance > 0, balance, now, int(coin_type), internal, index)
+                        for index, balance in used.items()
+                    ],
                 )
-                if record and not record.is_funded:
-                    record.is_funded = True
-                    record.cached_balance = balance
-                    record.cached_balance_time = int(time.time())
-                    self._swap_client.updateDB(
-                        record, cursor, constraints=["coin_type", "address"]
-                    )
-                    found += 1
-
-                    if internal:
-                        max_int_index = max(max_int_index or 0, index)
-                    else:
-                        max_ext_index = max(max_ext_index or 0, index)
 
-            if max_ext_index is not None or max_int_index is not None:
-                state = self._swap_client.queryOne(
-                    WalletState, cursor, {"coin_type": int(coin_type)}
-                )
-                if state:
-                    if max_ext_index and (
-                        state.last_external_index is None
-                        or max_ext_index > state.last_external_index
+            state = self._swap_client.queryOne(
+                WalletState, cursor, {"coin_type": int(coin_type)}
+            )
+            if state:
+                max_used = max(used) if used else None
+                if internal:
+                    state.scan_internal_index = next_index
+                    if max_used is not None and max_used > (
+                        state.last_internal_index or 0
                     ):
-                        state.last_external_index = max_ext_index
-                    if max_int_index and (
-                        state.last_internal_index is None
-                        or max_int_index > state.last_internal_index
+                        state.last_internal_index = max_used
+                else:
+                    state.scan_external_index = next_index
+                    if max_used is not None and max_used > (
+                        state.last_external_index or 0
                     ):
-                        state.last_internal_index = max_int_index
-                    state.updated_at = int(time.time())
-                    self._swap_client.updateDB(state, cursor, constraints=["coin_type"])
-
+                        state.last_external_index = max_used
+                state.updated_at = now
+                self._swap_client.updateDB(state, cursor, constraints=["coin_type"])
             self._swap_client.commitDB()
-            return found
         except Exception:
             self._swap_client.rollbackDB()
-            return 0
+            raise
         finally:
             self._swap_client.closeDB(cursor, commit=False)
 
+    def scanForFundedAddresses(
+        self, coin_type: Coins, backend, gap_limit: int = None
+    ) -> int:
+        # Discover used addresses on both chains until gap_limit consecutive
+        # unused addresses are seen. Windows of gap_limit addresses are derived
+        # and queried together and progress is stored after each window, so an
+        # interrupted scan resumes where it stopped. A completed scan stores the
+        # index after the last used address, later scans recheck from there.
+        if gap_limit is None:
+            gap_limit = self.getGapLimit(coin_type)
+        if not self.isInitialized(coin_type):
+            return 0
+
+        found = 0
+        for internal in (False, True):
+            cursor = self._swap_client.openDB()
+            try:
+                index, gap = self._getScanStart(coin_type, internal, cursor)
+            finally:
+                self._swap_client.closeDB(cursor, commit=False)
+
+            while gap < gap_limit:
+                window = self._getScanWindow(coin_type, internal, index, gap_limit)
+                try:
+                    used = self._queryScanWindow(backend, window)
+                except Exception as e:
+                    self._log.warning(
+                        f"scanForFundedAddresses {Coins(coin_type).name}: stopped at index {index}: {e}"
+                    )
+                    return found
+
+                for w in window:
+                    if w[0] in used:
+                        gap = 0
+                    else:
+                        gap += 1
+                index += len(window)
+                found += sum(1 for w in window if not w[3] and used.get(w[0], 0) > 0)
+                self._storeScanWindow(
+                    coin_type,
+                    internal,
+                    used,
+                    index - gap if gap >= gap_limit else index,
+                )
+        return found
+
     def updateFundedStatus(
         self, coin_type: Coins, address: str, is_funded: bool
     ) -> bool:
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 The Basicswap developers
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE or http://www.opensource.org/licenses/mit-license.php.
+
+import collections
+import json
+import threading
+
+MAX_CLIENT_TOPICS: int = 256
+MAX_TOPIC_LENGTH: int = 128
+
+
+def eventTopics(event: dict) -> set:
+    """Topics a websocket event is published on.
+
+    offers, offers:<coin_from>-<coin_to>, offer:<offer_id>, bids, bid:<bid_id>,
+    wallets, wallet:<ticker> and system.
+    """
+    event_type = event.get("event", "")
+    topics = set()
+    if event_type in ("new_offer", "offer_created", "offer_revoked", "offer_expired"):
+        topics.add("offers")
+        if "coin_from" in event and "coin_to" in event:
+            topics.add("offers:{}-{}".format(event["coin_from"], event["coin_to"]))
+    elif event_type in ("new_bid", "bid_accepted", "bid_changed", "swap_completed"):
+        topics.add("bids")
+        if "bid_id" in event:
+            topics.add("bid:" + event["bid_id"])
+    elif event_type in ("coin_balance_updated", "sweep_completed"):
+        topics.add("wallets")
+        if "coin" in event:
+            topics.add("wallet:" + event["coin"])
+    else:
+        topics.add("system")
+    if "offer_id" in event:
+        topics.add("offer:" + event["offer_id"])
+    return topics
+
+
+def eventCoalesceKey(event: dict):
+    # Events where only the latest queued frame matters to a client
+    event_type = event.get("event", "")
+    if event_type == "bid_changed":
+        return "bid_changed:" + event.get("bid_id", "")
+    if event_type == "coin_balance_updated":
+        return "coin_balance_updated:" + event.get("coin", "")
+    return None
+
+
+class ClientQueue:
+    """Outbound frames for one websocket client, written by its own thread.
+
+    When the queue is full the oldest frame is dropped.  A queued frame with the
+    same coalesce key is replaced in place.
+    """
+
+    def __init__(self, client, max_frames: int):
+        self.client = client
+        self.topics = None  # None receives all topics
+        self.batch: bool = False  # Receive event bursts as one batch frame
+        self._max_frames = max(1, max_frames)
+        self._cv = threading.Condition()
+        self._frames = collections.OrderedDict()
+        self._frame_counter: int = 0
+        self._running: bool = True
+        self.num_sent: int = 0
+        self.num_dropped: int = 0
+        self.num_coalesced: int = 0
+        self._thread = threading.Thread(
+            target=self._run, name="ws_client_{}".format(client["id"]), daemon=True
+        )
+        self._thread.start()
+
+    def wants(self, topics: set) -> bool:
+        return self.topics is None or not self.topics.isdisjoint(topics)
+
+    def depth(self) -> int:
+        return len(self._frames)
+
+    def put(self, payload: str, coalesce_key=None) -> None:
+        with self._cv:
+            if not self._running:
+                return
+            if coalesce_key is not None and coalesce_key in self._frames:
+                self._frames[coalesce_key] = payload
+                self.num_coalesced += 1
+                return
+            if len(self._frames) >= self._max_frames:
+                self._frames.popitem(last=False)
+                self.num_dropped += 1
+            if coalesce_key is None:
+                self._frame_counter += 1
+                coalesce_key = self._frame_counter
+            self._frames[coalesce_key] = payload
+            self._cv.notify()
+
+    def stop(self) -> None:
+        with self._cv:
+            self._running = False
+            self.num_dropped += len(self._frames)
+            self._frames.clear()
+            self._cv.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cv:
+                while self._running and len(self._frames) < 1:
+                    self._cv.wait()
+                if not self._running:
+                    return
+                _, payload = self._frames.popitem(last=False)
+            try:
+                # Blocks this thread only while the client is slow
+                self.client["handler"].send_message(payload)
+                self.num_sent += 1
+            except Exception:
+                self.stop()
+                return
+
+
+class WebSocketBroadcaster:
+    """Fan-out of events to websocket clients without blocking the caller.
+
+    Events are serialised once and queued for each client subscribed to one of
+    their topics.  Clients receive all topics until they send a subscription:
+        {"subscribe": ["offers:1-2", "bid:<bid_id>"]}
+        {"unsubscribe": ["bid:<bid_id>"]}
+        {"subscribe": ["*"]} to receive all topics again.
+    Clients sending {"batch": true} receive bursts from broadcastMany as:
+        {"event": "batch", "events": [...]}
+    """
+
+    def __init__(self, max_frames: int = 256):
+        self._max_frames = max_frames
+        self._lock = threading.Lock()
+        self._clients = {}  # client id: ClientQueue
+        self._num_sent_left: int = 0
+        self._num_dropped_left: int = 0
+        self._num_coalesced_left: int = 0
+
+    def addClient(self, client) -> None:
+        client_queue = ClientQueue(client, self._max_frames)
+        with self._lock:
+            self._clients[client["id"]] = client_queue
+
+    def removeClient(self, client) -> None:
+        if client is None:
+            return
+        with self._lock:
+            client_queue = self._clients.pop(client["id"], None)
+        if client_queue is None:
+            return
+        client_queue.stop()
+        with self._lock:
+            self._num_sent_left += client_queue.num_sent
+            self._num_dropped_left += client_queue.num_dropped
+            self._num_coalesced_left += client_queue.num_coalesced
+
+    def stop(self) -> None:
+        with self._lock:
+            client_queues = list(self._clients.values())
+            self._clients.clear()
+        for client_queue in client_queues:
+            client_queue.stop()
+
+    def broadcast(self, event: dict) -> None:
+        topics = eventTopics(event)
+        coalesce_key = eventCoalesceKey(event)
+        payload = None
+        with self._lock:
+            client_queues = list(self._clients.values())
+        for client_queue in client_queues:
+            if not client_queue.wants(topics):
+                continue
+            if payload is None:
+                payload = json.dumps(event)
+            client_queue.put(payload, coalesce_key)
+
+    def broadcastMany(self, events) -> None:
+        if len(events) == 1:
+            self.broadcast(events[0])
+            return
+        with self._lock:
+            client_queues = list(self._clients.values())
+        if len(client_queues) < 1:
+            return
+        # Serialise each event once, a batch frame joins the serialised events
+        prepared = [
+            (eventTopics(event), eventCoalesceKey(event), json.dumps(event))
+            for event in events
+        ]
+        for client_queue in client_queues:
+            if client_queue.batch:
+                payloads = [
+                    payload
+                    for topics, _, payload in prepared
+                    if client_queue.wants(topics)
+                ]
+                if len(payloads) == 1:
+                    client_queue.put(payloads[0])
+                elif len(payloads) > 1:
+                    client_queue.put(
+                        '{"event": "batch", "events": [' + ", ".join(payloads) + "]}"
+                    )
+                continue
+            for topics, coalesce_key, payload in prepared:
+                if client_queue.wants(topics):
+                    client_queue.put(payload, coalesce_key)
+
+    def handleClientMessage(self, client, message: str) -> bool:
+        # Returns True if the message was a subscription request
+        try:
+            data = json.loads(message)
+        except ValueError:
+            return False
+        if not isinstance(data, dict):
+            return False
+        subscribe = data.get("subscribe")
+        unsubscribe = data.get("unsubscribe")
+        batch = data.get("batch")
+        if (
+            not isinstance(subscribe, list)
+            and not isinstance(unsubscribe, list)
+            and not isinstance(batch, bool)
+        ):
+            return False
+        with self._lock:
+            client_queue = self._clients.get(client["id"])
+        if client_queue is None:
+            return True
+        if isinstance(batch, bool):
+            client_queue.batch = batch
+            if not isinstance(subscribe, list) and not isinstance(unsubscribe, list):
+                return True
+
+        topics = set() if client_queue.topics is None else set(client_queue.topics)
+        for topic in subscribe if isinstance(subscribe, list) else []:
+            if topic == "*":
+                topics = None
+                break
+            if isinstance(topic, str) and len(topic) <= MAX_TOPIC_LENGTH:
+                topics.add(topic)
+        if topics is not None:
+            for topic in unsubscribe if isinstance(unsubscribe, list) else []:
+                topics.discard(topic)
+            if len(topics) > MAX_CLIENT_TOPICS:
+                raise ValueError("Too many websocket topics")
+        client_queue.topics = topics
+        return True
+
+    def getStats(self) -> dict:
+        with self._lock:
+            client_queues = list(self._clients.values())
+            num_sent = self._num_sent_left
+            num_dropped = self._num_dropped_left
+            num_coalesced = self._num_coalesced_left
+        depths = []
+        for client_queue in client_queues:
+            depths.append(client_queue.depth())
+            num_sent += client_queue.num_sent
+            num_dropped += client_queue.num_dropped
+            num_coalesced += client_queue.num_coalesced
+        return {
+            "clients": len(client_queues),
+            "max_frames": self._max_frames,
+            "queued_frames": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "sent_frames": num_sent,
+            "dropped_frames": num_dropped,
+            "coalesced_frames": num_coalesced,
+        }
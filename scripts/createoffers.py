@@ -17,6 +17,7 @@ Create offers
     "wallet_port_override": Used for testing.
     "prune_state_delay": Seconds between pruning old state data, set to 0 to disable pruning.
     "main_loop_delay": Seconds between main loop iterations.
+    "event_loop_delay": Seconds between main loop iterations while receiving events from the node's websocket, default 300.
     "prune_state_after_seconds": Seconds to keep old state data for.
     "auth": Basicswap API auth string, e.g., "admin:password". Ignored if client auth is not enabled.
     "offers": [
@@ -71,6 +72,8 @@ Create offers
 """
 
 import argparse
+import copy
+import http.client
 import json
 import os
 import random
@@ -83,11 +86,12 @@ import traceback
 import urllib
 import urllib.error
 import base64
-from urllib.request import urlopen
+import websocket
 
 from basicswap import AMM_VERSION
 
 delay_event = threading.Event()
+wake_event = threading.Event()  # Set by the event listener and signal handler
 shutdown_in_progress = False
 coins_map = {}
 read_json_api = None
@@ -102,18 +106,10 @@ DEFAULT_LOCK_HOURS: int = 24
 
 MIN_BUDGET_DELTA: float = 1e-8
 
-
-def post_req(url: str, json_data=None, auth_header_val=None):
-    req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
-    if auth_header_val:
-        req.add_header("Authorization", auth_header_val)
-    if json_data is not None:
-        req.add_header("Content-Type", "application/json; charset=utf-8")
-        post_bytes = json.dumps(json_data).encode("utf-8")
-        req.add_header("Content-Length", len(post_bytes))
-    else:
-        post_bytes = None
-    return urlopen(req, data=post_bytes, timeout=300)
+# Seconds to collect a burst of node events before running a pass
+EVENT_SETTLE_SECONDS: float = 0.2
+# Minimum seconds between passes started by node events
+MIN_SECONDS_BETWEEN_EVENT_PASSES: float = 5
 
 
 def make_json_api_func(host: str, port: int, auth_string: str = None):
@@ -121,6 +117,7 @@ def make_json_api_func(host: str, port: int, auth_string: str = None):
     port = port
     _auth_header_val = None
     _auth_required_confirmed = False
+    _conn = None
     if auth_string:
         try:
             if auth_string and ":" in auth_string:
@@ -141,27 +138,67 @@ def make_json_api_func(host: str, port: int, auth_string: str = None):
         except Exception as e:
             print(f"Error processing authentication: {e}")
 
+    def send_req(url_path: str, json_data, auth_header_val, timeout):
+        # The connection is kept open while the server allows it
+        nonlocal _conn
+        headers = {"User-Agent": "Mozilla/5.0"}
+        if auth_header_val:
+            headers["Authorization"] = auth_header_val
+        method = "GET"
+        post_bytes = None
+        if json_data is not None:
+            method = "POST"
+            headers["Content-Type"] = "application/json; charset=utf-8"
+            post_bytes = json.dumps(json_data).encode("utf-8")
+
+        for attempt in range(2):
+            if _conn is None:
+                _conn = http.client.HTTPConnection(host, port, timeout=timeout)
+            reused: bool = _conn.sock is not None
+            if reused:
+                _conn.sock.settimeout(timeout)
+            else:
+                _conn.timeout = timeout
+            try:
+                _conn.request(method, url_path, body=post_bytes, headers=headers)
+                response = _conn.getresponse()
+                response_bytes = response.read()
+            except (
+                http.client.RemoteDisconnected,
+                ConnectionResetError,
+                BrokenPipeError,
+            ) as e:
+                _conn.close()
+                # An idle connection closed by the server, retry on a new one
+                if reused and attempt == 0:
+                    continue
+                raise urllib.error.URLError(e)
+            except OSError as e:
+                _conn.close()
+                raise urllib.error.URLError(e)
+            except Exception:
+                _conn.close()
+                raise
+            if response.status >= 400:
+                raise urllib.error.HTTPError(
+                    f"http://{host}:{port}{url_path}",
+                    response.status,
+                    response.reason,
+                    response.headers,
+                    None,
+                )
+            return response_bytes
+
     def api_func(path=None, json_data=None, timeout=300):
         nonlocal _auth_required_confirmed
-        url = f"http://{host}:{port}/json"
+        url_path = "/json"
         if path is not None:
-            url += "/" + path
+            url_path += "/" + path
 
         current_auth_header = _auth_header_val if _auth_required_confirmed else None
 
         try:
-            if json_data is not None:
-                response_obj = post_req(
-                    url, json_data, auth_header_val=current_auth_header
-                )
-            else:
-                headers = {"User-Agent": "Mozilla/5.0"}
-                if current_auth_header:
-                    headers["Authorization"] = current_auth_header
-                req = urllib.request.Request(url, headers=headers)
-                response_obj = urlopen(req, timeout=timeout)
-
-            response_bytes = response_obj.read()
+            response_bytes = send_req(url_path, json_data, current_auth_header, timeout)
             return json.loads(response_bytes)
 
         except urllib.error.HTTPError as e:
@@ -172,18 +209,9 @@ def make_json_api_func(host: str, port: int, auth_string: str = None):
                     )
                     _auth_required_confirmed = True
                     try:
-                        if json_data is not None:
-                            response_obj = post_req(
-                                url, json_data, auth_header_val=_auth_header_val
-                            )
-                        else:
-                            headers = {
-                                "User-Agent": "Mozilla/5.0",
-                                "Authorization": _auth_header_val,
-                            }
-                            req = urllib.request.Request(url, headers=headers)
-                            response_obj = urlopen(req, timeout=timeout)
-                        response_bytes = response_obj.read()
+                        response_bytes = send_req(
+                            url_path, json_data, _auth_header_val, timeout
+                        )
                         return json.loads(response_bytes)
                     except urllib.error.HTTPError as retry_e:
                         if retry_e.code == 401:
@@ -214,6 +242,176 @@ def make_json_api_func(host: str, port: int, auth_string: str = None):
     return api_func
 
 
+class PassCachedApi:
+    """Wraps a json api function so reads repeated within one pass over the
+    templates, such as the wallet of a coin shared by several templates, are
+    requested once.
+
+    Cleared at the start of each pass and after any call that changes node state.
+    """
+
+    cached_paths = ("sentoffers", "offers", "rates", "wallets")
+
+    def __init__(self, api_func):
+        self.api_func = api_func
+        self.responses = {}
+
+    def clear(self) -> None:
+        self.responses.clear()
+
+    @staticmethod
+    def is_write(path, json_data) -> bool:
+        if path in ("offers/new", "bids/new"):
+            return True
+        if path == "bids" and json_data is not None:
+            return True
+        return path is not None and path.startswith("revokeoffer/")
+
+    def __call__(self, path=None, json_data=None, timeout=300):
+        if self.is_write(path, json_data):
+            try:
+                return self.api_func(path, json_data, timeout)
+            finally:
+                self.clear()
+        path_base = None if path is None else path.split("/")[0]
+        if path_base not in self.cached_paths:
+            return self.api_func(path, json_data, timeout)
+        key = (path, json.dumps(json_data, sort_keys=True))
+        if key not in self.responses:
+            self.responses[key] = self.api_func(path, json_data, timeout)
+        # Callers may modify the response
+        return copy.deepcopy(self.responses[key])
+
+
+class EventListener(threading.Thread):
+    """Receives events from the node's websocket and wakes the main loop."""
+
+    def __init__(self, url: str, debug: bool = False):
+        super().__init__(daemon=True)
+        self.url: str = url
+        self.debug: bool = debug
+        self.ws = None
+        self.connected: bool = False
+        self.mutex = threading.Lock()
+        self.events = []
+
+    def on_message(self, ws, message):
+        try:
+            event = json.loads(message)
+        except ValueError:
+            return
+        if not isinstance(event, dict) or "event" not in event:
+            return
+        with self.mutex:
+            self.events.append(event)
+        wake_event.set()
+
+    def on_error(self, ws, error):
+        if self.debug:
+            print(f"Event listener error: {error}")
+
+    def on_close(self, ws, close_status_code, close_msg):
+        if self.connected:
+            print("Event listener disconnected, polling until reconnected")
+        self.connected = False
+
+    def on_open(self, ws):
+        print(f"Event listener connected to {self.url}")
+        self.connected = True
+
+    def take_events(self) -> list:
+        with self.mutex:
+            events, self.events = self.events, []
+        return events
+
+    def run(self):
+        self.ws = websocket.WebSocketApp(
+            self.url,
+            on_message=self.on_message,
+            on_error=self.on_error,
+            on_open=self.on_open,
+            on_close=self.on_close,
+        )
+        while not delay_event.is_set():
+            # The node only accepts the html ui's Origin, scripts send none
+            self.ws.run_forever(suppress_origin=True)
+            delay_event.wait(5)
+
+    def stop(self):
+        if self.ws:
+            self.ws.close()
+
+
+def get_event_filter(config, script_state) -> dict:
+    # Collect what the templates and tracked offers and bids depend on
+    pairs = set()
+    tickers = set()
+    for template in config.get("offers", []) + config.get("bids", []):
+        if template.get("enabled", True) is False:
+            continue
+        coin_from_data = coins_map.get(template["coin_from"])
+        coin_to_data = coins_map.get(template["coin_to"])
+        if coin_from_data is None or coin_to_data is None:
+            continue
+        pairs.add((coin_from_data["id"], coin_to_data["id"]))
+        tickers.add(coin_from_data["ticker"])
+        tickers.add(coin_to_data["ticker"])
+
+    offer_ids = set()
+    for template_group in script_state.get("offers", {}).values():
+        for offer in template_group:
+            offer_ids.add(offer["offer_id"])
+    bid_ids = set()
+    for template_group in script_state.get("bids", {}).values():
+        for bid in template_group:
+            bid_ids.add(bid["bid_id"])
+
+    return {"pairs": pairs, "tickers": tickers, "offers": offer_ids, "bids": bid_ids}
+
+
+def is_relevant_event(event, event_filter) -> bool:
+    event_type = event.get("event")
+    if event_type == "new_offer":
+        # Market changed for a pair the templates offer or bid on
+        pair = (event.get("coin_from"), event.get("coin_to"))
+        return pair in event_filter["pairs"]
+    if event_type in ("offer_expired", "offer_revoked"):
+        return event.get("offer_id") in event_filter["offers"]
+    if event_type in ("bid_changed", "bid_accepted"):
+        return event.get("bid_id") in event_filter["bids"]
+    if event_type == "coin_balance_updated":
+        return event.get("coin") in event_filter["tickers"]
+    if event_type == "swap_completed":
+        return True
+    return False
+
+
+def wait_for_events(
+    event_listener, config, script_state, timeout, last_pass_time
+) -> None:
+    # Returns after the first relevant event, or after timeout seconds
+    event_filter = get_event_filter(config, script_state)
+    end_time: float = time.time() + timeout
+    while not delay_event.is_set():
+        remaining: float = end_time - time.time()
+        if remaining <= 0:
+            return
+        wake_event.wait(remaining)
+        wake_event.clear()
+        for event in event_listener.take_events():
+            if is_relevant_event(event, event_filter):
+                if event_listener.debug:
+                    print(f"Node event: {event['event']}")
+                next_pass_time: float = (
+                    last_pass_time + MIN_SECONDS_BETWEEN_EVENT_PASSES
+                )
+                delay_event.wait(
+                    max(EVENT_SETTLE_SECONDS, next_pass_time - time.time())
+                )
+                event_listener.take_events()
+                return
+
+
 def signal_handler(sig, _) -> None:
     global shutdown_in_progress
     os.write(
@@ -221,6 +419,7 @@ def signal_handler(sig, _) -> None:
     )
     shutdown_in_progress = True
     delay_event.set()
+    wake_event.set()
 
 
 def findCoin(coin: str, known_coins) -> str:
@@ -455,6 +654,9 @@ def readConfig(args, known_coins):
         print("Setting main_loop_delay to 1000")
         config["main_loop_delay"] = 1000
         num_changes += 1
+    config["event_loop_delay"] = min(
+        max(config.get("event_loop_delay", 300), config["main_loop_delay"]), 1000
+    )
     config["prune_state_delay"] = config.get("prune_state_delay", 120)
 
     # Add market-based rate adjustment option (default: false)
@@ -2058,6 +2260,22 @@ def main():
         default=12700,
         required=False,
     )
+    parser.add_argument(
+        "--wshost",
+        dest="wshost",
+        help="WebSocket host (default=--host)",
+        type=str,
+        default=None,
+        required=False,
+    )
+    parser.add_argument(
+        "--wsport",
+        dest="wsport",
+        help="WebSocket port, when set passes run on node events (default=none)",
+        type=int,
+        default=None,
+        required=False,
+    )
     parser.add_argument(
         "--oneshot",
         dest="oneshot",
@@ -2103,11 +2321,11 @@ def main():
 
     auth_info = initial_config.get("auth")
 
-    read_json_api = make_json_api_func(args.host, args.port, auth_info)
+    read_json_api = PassCachedApi(make_json_api_func(args.host, args.port, auth_info))
     wallet_api_port_override = initial_config.get("wallet_port_override")
     if wallet_api_port_override:
-        read_json_api_wallet_auth = make_json_api_func(
-            args.host, int(wallet_api_port_override), auth_info
+        read_json_api_wallet_auth = PassCachedApi(
+            make_json_api_func(args.host, int(wallet_api_port_override), auth_info)
         )
     else:
         read_json_api_wallet_auth = read_json_api_wallet
@@ -2160,8 +2378,15 @@ def main():
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
+    event_listener = None
+    if args.wsport and not args.oneshot:
+        wshost = args.host if args.wshost is None else args.wshost
+        event_listener = EventListener(f"ws://{wshost}:{args.wsport}", args.debug)
+        event_listener.start()
+
     last_summary_time = 0
     summary_interval = 600
+    last_pass_time = 0
 
     try:
         while not delay_event.is_set():
@@ -2178,6 +2403,10 @@ def main():
 
             # Skip processing if shutdown is in progress
             if not shutdown_in_progress:
+                last_pass_time = time.time()
+                read_json_api.clear()
+                if read_json_api_wallet is not read_json_api:
+                    read_json_api_wallet.clear()
                 try:
                     process_offers(args, config, script_state)
 
@@ -2224,6 +2453,10 @@ def main():
             if args.oneshot or shutdown_in_progress:
                 break
 
+            loop_delay = config["main_loop_delay"]
+            if event_listener is not None and event_listener.connected:
+                loop_delay = config["event_loop_delay"]
+
             current_time = int(time.time())
             if args.debug and current_time - last_summary_time > summary_interval:
                 active_offers = sum(
@@ -2235,12 +2468,19 @@ def main():
                     for template_group in script_state.get("bids", {}).values()
                 )
                 print(
-                    f"AMM Summary: {active_offers} active offers, {active_bids} active bids, next check in {config['main_loop_delay']}s"
+                    f"AMM Summary: {active_offers} active offers, {active_bids} active bids, next check in {loop_delay}s"
                 )
                 last_summary_time = current_time
 
-            delay_event.wait(config["main_loop_delay"])
+            if event_listener is None:
+                delay_event.wait(loop_delay)
+            else:
+                wait_for_events(
+                    event_listener, config, script_state, loop_delay, last_pass_time
+                )
 
+        if event_listener is not None:
+            event_listener.stop()
         print("Done.")
         return 0
     except KeyboardInterrupt:
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 The Basicswap developers
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE or http://www.opensource.org/licenses/mit-license.php.
+
+import json
+import time
+import unittest
+
+import scripts.createoffers as createoffers
+from basicswap.basicswap import BasicSwap
+from basicswap.contrib.websocket_server import WebsocketServer
+from scripts.createoffers import (
+    EventListener,
+    PassCachedApi,
+    get_event_filter,
+    is_relevant_event,
+)
+
+
+class PassCachedApiTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def api_func(path=None, json_data=None, timeout=300):
+            self.calls.append(path)
+            if path == "wallets/part":
+                return {"balance": "1.0", "utxos": [{"amount": 1}]}
+            return {"path": path}
+
+        self.api = PassCachedApi(api_func)
+
+    def test_reads_cached(self):
+        assert self.api("wallets/part") == self.api("wallets/part")
+        assert self.api("rates", {"coin_from": 1}) == {"path": "rates"}
+        self.api("rates", {"coin_from": 1})
+        self.api("rates", {"coin_from": 2})
+        assert self.calls == ["wallets/part", "rates", "rates"]
+
+        # Paths not in cached_paths are always requested
+        self.api("bids/1")
+        self.api("bids/1")
+        assert self.calls[-2:] == ["bids/1", "bids/1"]
+
+    def test_write_clears_cache(self):
+        self.api("wallets/part")
+        self.api("offers")
+        self.api("offers/new", {"coin_from": 1})
+        assert self.api.responses == {}
+        self.api("wallets/part")
+        assert self.calls == ["wallets/part", "offers", "offers/new", "wallets/part"]
+
+        self.api("revokeoffer/aa")
+        self.api("wallets/part")
+        self.api("bids", {"offer_id": "aa"})
+        self.api("wallets/part")
+        assert self.calls.count("wallets/part") == 4
+
+        # Listing bids is a read
+        self.api("wallets/part")
+        self.api("bids")
+        self.api("wallets/part")
+        assert self.calls.count("wallets/part") == 4
+
+    def test_write_clears_cache_on_error(self):
+        def api_func(path=None, json_data=None, timeout=300):
+            if path == "bids/new":
+                raise ValueError("failed")
+            return {}
+
+        api = PassCachedApi(api_func)
+        api("offers")
+        with self.assertRaises(ValueError):
+            api("bids/new", {"offer_id": "aa"})
+        assert api.responses == {}
+
+    def test_responses_are_copies(self):
+        wallet = self.api("wallets/part")
+        wallet["balance"] = "0.0"
+        wallet["utxos"][0]["amount"] = 0
+        wallet = self.api("wallets/part")
+        assert wallet == {"balance": "1.0", "utxos": [{"amount": 1}]}
+        assert self.calls == ["wallets/part"]
+
+
+class EventFilterTest(unittest.TestCase):
+    def setUp(self):
+        self.coins_map = {
+            "Particl": {"name": "Particl", "id": 1, "ticker": "PART"},
+            "Bitcoin": {"name": "Bitcoin", "id": 2, "ticker": "BTC"},
+            "Monero": {"name": "Monero", "id": 6, "ticker": "XMR"},
+            "Litecoin": {"name": "Litecoin", "id": 3, "ticker": "LTC"},
+        }
+        createoffers.coins_map.update(self.coins_map)
+        self.addCleanup(createoffers.coins_map.clear)
+
+        config = {
+            "offers": [
+                {"name": "offer_a", "coin_from": "Particl", "coin_to": "Monero"},
+                {
+                    "name": "offer_b",
+                    "coin_from": "Litecoin",
+                    "coin_to": "Particl",
+                    "enabled": False,
+                },
+                {"name": "offer_c", "coin_from": "Unknown", "coin_to": "Particl"},
+            ],
+            "bids": [{"name": "bid_a", "coin_from": "Bitcoin", "coin_to": "Particl"}],
+        }
+        script_state = {
+            "offers": {"offer_a": [{"offer_id": "o1"}, {"offer_id": "o2"}]},
+            "bids": {"bid_a": [{"bid_id": "b1"}]},
+        }
+        self.event_filter = get_event_filter(config, script_state)
+
+    def test_get_event_filter(self):
+        assert self.event_filter == {
+            "pairs": {(1, 6), (2, 1)},
+            "tickers": {"PART", "XMR", "BTC"},
+            "offers": {"o1", "o2"},
+            "bids": {"b1"},
+        }
+
+    def test_relevant_events(self):
+        for event in (
+            {"event": "new_offer", "coin_from": 1, "coin_to": 6},
+            {"event": "new_offer", "coin_from": 2, "coin_to": 1},
+            {"event": "offer_expired", "offer_id": "o1"},
+            {"event": "offer_revoked", "offer_id": "o2"},
+            {"event": "bid_changed", "bid_id": "b1"},
+            {"event": "bid_accepted", "bid_id": "b1"},
+            {"event": "coin_balance_updated", "coin": "XMR"},
+            {"event": "swap_completed"},
+        ):
+            assert is_relevant_event(event, self.event_filter), event
+
+    def test_irrelevant_events(self):
+        for event in (
+            # Reversed pair and disabled template pair
+            {"event": "new_offer", "coin_from": 6, "coin_to": 1},
+            {"event": "new_offer", "coin_from": 3, "coin_to": 1},
+            {"event": "offer_expired", "offer_id": "o3"},
+            {"event": "offer_revoked"},
+            {"event": "bid_changed", "bid_id": "b2"},
+            {"event": "bid_accepted", "bid_id": "o1"},
+            {"event": "coin_balance_updated", "coin": "LTC"},
+            {"event": "unknown_event"},
+            {},
+        ):
+            assert not is_relevant_event(event, self.event_filter), event
+
+
+class EventListenerTest(unittest.TestCase):
+    def test_connects_to_node(self):
+        # The node's websocket server checks the Origin against the html port
+        class Stub:
+            settings = {"htmlhost": "127.0.0.1", "htmlport": 12700}
+
+        server = WebsocketServer(
+            lambda headers: BasicSwap._ws_origin_allowed(Stub(), headers),
+            host="127.0.0.1",
+            port=0,
+        )
+        server.run_forever(threaded=True)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown_abruptly)
+
+        listener = EventListener(f"ws://127.0.0.1:{server.port}")
+        listener.start()
+
+        def stop_listener():
+            createoffers.delay_event.set()
+            listener.stop()
+            listener.join(5)
+            createoffers.delay_event.clear()
+            createoffers.wake_event.clear()
+
+        self.addCleanup(stop_listener)
+
+        for _ in range(100):
+            if listener.connected and len(server.clients) > 0:
+                break
+            time.sleep(0.05)
+        assert listener.connected
+
+        event = {"event": "new_offer", "coin_from": 1, "coin_to": 6}
+        server.send_message_to_all(json.dumps(event))
+        assert createoffers.wake_event.wait(5)
+        assert listener.take_events() == [event]
+
+
+if __name__ == "__main__":
+    unittest.main()
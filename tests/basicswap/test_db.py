@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 The Basicswap developers
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE or http://www.opensource.org/licenses/mit-license.php.
+
+import inspect
+import logging
+import threading
+import unittest
+
+from basicswap.db import (
+    Bid,
+    create_db_,
+    DBMethods,
+    getTableInfo,
+    KnownIdentity,
+    Offer,
+    SwapTx,
+    XmrSwap,
+)
+
+logger = logging.getLogger()
+
+
+def reflective_query(table_class, cursor, constraints={}):
+    # The query path used before column metadata was cached.
+    query: str = "SELECT "
+    columns = []
+    for mc_name, mc_obj in inspect.getmembers(table_class):
+        if not hasattr(mc_obj, "__sqlite3_column__"):
+            continue
+        if len(columns) > 0:
+            query += ", "
+        query += mc_name
+        columns.append((mc_name, mc_obj.column_type))
+    query += f" FROM {table_class.__tablename__} WHERE 1=1 "
+    for ck in constraints:
+        query += f" AND {ck} = :{ck} "
+    for row in cursor.execute(query, constraints):
+        obj = table_class()
+        for mc_name, mc_obj in inspect.getmembers(obj):
+            if hasattr(mc_obj, "__sqlite3_column__"):
+                setattr(obj, mc_name, None)
+        for i, (colname, coltype) in enumerate(columns):
+            value = row[i]
+            if coltype == "bool" and value is not None:
+                value = False if value == 0 else True
+            setattr(obj, colname, value)
+        yield obj
+
+
+def reflective_add(obj, cursor):
+    values = {}
+    for mc_name, mc_obj in inspect.getmembers(obj.__class__):
+        if not hasattr(mc_obj, "__sqlite3_column__"):
+            continue
+        m_obj = getattr(obj, mc_name)
+        if hasattr(m_obj, "__sqlite3_column__"):
+            continue
+        values[mc_name] = m_obj
+    query = f"INSERT INTO {obj.__tablename__} ({', '.join(values)}) VALUES ("
+    query += ", ".join([":" + k for k in values]) + ")"
+    cursor.execute(query, values)
+
+
+class DBTest(unittest.TestCase):
+    def _new_db(self):
+        db = DBMethods()
+        db.sqlite_file = ":memory:"
+        db.mxDB = threading.RLock()
+        cursor = db.openDB()
+        create_db_(db._db_con, logger)
+        return db, cursor
+
+    def _make_bid(self, i: int) -> Bid:
+        return Bid(
+            bid_id=i.to_bytes(28, "big"),
+            offer_id=bytes(28),
+            active_ind=1,
+            created_at=1000 + i,
+            amount=i * 100,
+            was_sent=True,
+            was_received=False,
+        )
+
+    def test_table_info(self):
+        for table_class in (Bid, Offer, SwapTx, XmrSwap, KnownIdentity):
+            info = getTableInfo(table_class)
+            expect = [
+                (n, o.column_type)
+                for n, o in inspect.getmembers(table_class)
+                if hasattr(o, "__sqlite3_column__")
+            ]
+            assert list(info.columns) == expect
+            assert getTableInfo(table_class) is info
+
+        bid = Bid(amount=5)
+        assert bid.amount == 5
+        assert bid.rate is None
+        assert bid.isSet("rate") is False
+        bid = Bid(_init_all_columns=False, amount=5)
+        assert bid.isSet("rate") is False
+        assert hasattr(bid.rate, "__sqlite3_column__")
+
+    def test_query_matches_reflection(self):
+        db, cursor = self._new_db()
+        try:
+            for i in range(10):
+                db.add(self._make_bid(i), cursor)
+            bid = db.queryOne(Bid, cursor, {"bid_id": (3).to_bytes(28, "big")})
+            assert bid.amount == 300
+            assert bid.was_sent is True
+            assert bid.was_received is False
+            assert bid.rate is None
+
+            bid.amount = 301
+            db.updateDB(bid, cursor, ["bid_id"], columns_list=["amount"])
+
+            new_rows = list(db.query(Bid, cursor, order_by={"created_at": "asc"}))
+            old_rows = list(reflective_query(Bid, cursor))
+            assert len(new_rows) == len(old_rows) == 10
+            for new_row, old_row in zip(new_rows, old_rows):
+                assert new_row.__dict__ == old_row.__dict__
+            assert new_rows[3].amount == 301
+
+            partial = db.queryOne(Bid, cursor, columns_list=["bid_id", "amount"])
+            assert partial.amount is not None
+            assert partial.created_at is None
+        finally:
+            db.closeDB(cursor)
+
+    def test_add_matches_reflection(self):
+        db, cursor = self._new_db()
+        try:
+            for i in range(10):
+                reflective_add(self._make_bid(i), cursor)
+            old_rows = cursor.execute("SELECT * FROM bids ORDER BY bid_id").fetchall()
+            cursor.execute("DELETE FROM bids")
+
+            for i in range(10):
+                db.add(self._make_bid(i), cursor)
+            new_rows = cursor.execute("SELECT * FROM bids ORDER BY bid_id").fetchall()
+            assert len(new_rows) == 10
+            assert new_rows == old_rows
+        finally:
+            db.closeDB(cursor)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -46,6 +46,7 @@ cp -r ${TEST_PATH}/bin/* ~/tmp/basicswap_bin/
 
 """
 
+import concurrent.futures
 import json
 import logging
 import os
@@ -55,12 +56,14 @@ import sqlite3
 import struct
 import subprocess
 import sys
+import threading
 import unittest
 from hashlib import sha256
 from io import BytesIO
 from types import SimpleNamespace
 
 import basicswap.config as cfg
+from basicswap.basicswap import BasicSwap
 from basicswap.basicswap_util import (
     BidStates,
     DebugTypes,
@@ -76,7 +79,12 @@ from basicswap.chainparams import (
 )
 from basicswap.util.daemon import Daemon
 from basicswap.wallet_manager import WalletManager
-from basicswap.contrib.test_framework.messages import CTransaction
+from basicswap.contrib.test_framework.messages import (
+    COutPoint,
+    CTransaction,
+    CTxIn,
+    CTxOut,
+)
 
 from tests.basicswap.util.common import (
     prepare_balance,
@@ -1598,6 +1606,249 @@ class TestElectrumMedianTime(unittest.TestCase):
         self.assertFalse(ci.isAbsLockTimeMature(500000001))
 
 
+class WatchStubServer:
+    def __init__(self):
+        self.txns = {}
+        self.histories = {}
+        self.batches = []
+
+    def addTx(self, tx, height=0, history_scripts=()):
+        txid = tx.rehash()
+        self.txns[txid] = tx.serialize().hex()
+        for script in history_scripts:
+            scripthash = sha256(script).digest()[::-1].hex()
+            self.histories.setdefault(scripthash, []).append(
+                {"tx_hash": txid, "height": height}
+            )
+        return txid
+
+    def call_batch_background(self, requests, timeout=30):
+        self.batches.append(requests)
+        rv = []
+        for method, params in requests:
+            if method == "blockchain.scripthash.get_history":
+                rv.append(self.histories.get(params[0], []))
+            elif method == "blockchain.transaction.get":
+                rv.append(self.txns.get(params[0]))
+            else:
+                raise RuntimeError(f"unexpected call {method}")
+        return rv
+
+
+def make_watch_interface(server):
+    ci = BTCInterface.__new__(BTCInterface)
+    ci._log = StubLog()
+    ci._backend = StubBackend(server)
+    ci._electrum_tx_cache = {}
+    ci._electrum_output_scripthashes = {}
+    return ci
+
+
+class TestElectrumWatchBatch(unittest.TestCase):
+    script_a = bytes.fromhex("0014" + "11" * 20)
+    script_b = bytes.fromhex("0014" + "22" * 20)
+    script_c = bytes.fromhex("0014" + "33" * 20)
+
+    def make_tx(self, prevouts, scripts):
+        tx = CTransaction()
+        tx.vin = [CTxIn(COutPoint(int(txid, 16), n)) for txid, n in prevouts]
+        tx.vout = [CTxOut(1000, script) for script in scripts]
+        return tx
+
+    def test_batch_finds_spends_and_scripts(self):
+        server = WatchStubServer()
+        fund_txid = server.addTx(
+            self.make_tx([("aa" * 32, 0)], [self.script_a, self.script_b]),
+            height=10,
+            history_scripts=(self.script_a, self.script_b),
+        )
+        spend_txid = server.addTx(
+            self.make_tx([("bb" * 32, 1), (fund_txid, 1)], [self.script_c]),
+            height=12,
+            history_scripts=(self.script_b, self.script_c),
+        )
+
+        ci = make_watch_interface(server)
+        watched_outputs = [(fund_txid, 0), (fund_txid, 1), ("cc" * 32, 0)]
+        spends, found = ci.checkWatchedBatch(watched_outputs, [self.script_c])
+
+        self.assertEqual(list(spends.keys()), [(fund_txid, 1)])
+        self.assertEqual(spends[(fund_txid, 1)]["txid"], spend_txid)
+        self.assertEqual(spends[(fund_txid, 1)]["vin"], 1)
+        self.assertEqual(spends[(fund_txid, 1)]["height"], 12)
+        self.assertEqual(spends[(fund_txid, 1)]["hex"], server.txns[spend_txid])
+        self.assertEqual(found[self.script_c]["txid"], spend_txid)
+        self.assertEqual(found[self.script_c]["vout"], 0)
+
+        # Funding txns, all histories, then the unseen txns
+        self.assertEqual(
+            [len(b) for b in server.batches],
+            [2, 3, 1],
+        )
+        self.assertEqual(server.batches[0][0][0], "blockchain.transaction.get")
+        self.assertEqual(
+            {b[0] for b in server.batches[1]}, {"blockchain.scripthash.get_history"}
+        )
+
+        # Scripthashes and txns are cached, only histories are fetched again
+        server.batches.clear()
+        spends_again, found_again = ci.checkWatchedBatch(
+            watched_outputs, [self.script_c]
+        )
+        self.assertEqual(spends_again.keys(), spends.keys())
+        self.assertEqual(found_again.keys(), found.keys())
+        self.assertEqual(len(server.batches), 2)
+        self.assertEqual(server.batches[0][0][0], "blockchain.transaction.get")
+        self.assertEqual(server.batches[1][0][0], "blockchain.scripthash.get_history")
+
+    def test_single_output_wrapper(self):
+        server = WatchStubServer()
+        fund_txid = server.addTx(
+            self.make_tx([("aa" * 32, 0)], [self.script_a]),
+            history_scripts=(self.script_a,),
+        )
+        ci = make_watch_interface(server)
+        self.assertIsNone(ci.checkWatchedOutput(fund_txid, 0))
+        self.assertIsNone(ci.checkWatchedScript(self.script_b))
+        found = ci.checkWatchedScript(self.script_a)
+        self.assertEqual((found["txid"], found["vout"]), (fund_txid, 0))
+
+
+class ImmediateExecutor:
+    def submit(self, fn, *args, **kwargs):
+        future = concurrent.futures.Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+class SubscribeStubBackend:
+    def __init__(self):
+        self.watch_callback = None
+        self.subscribed = []
+        self.unsubscribed = []
+        self.last_reconnect_time = 0
+
+    def setWatchCallback(self, callback):
+        self.watch_callback = callback
+
+    def subscribeWatchScripthash(self, scripthash):
+        self.subscribed.append(scripthash)
+        # Watched outputs already have the funding tx in their history
+        return "status" if scripthash.startswith("out") else None
+
+    def unsubscribeWatchScripthash(self, scripthash):
+        self.unsubscribed.append(scripthash)
+
+    def getLastReconnectTime(self):
+        return self.last_reconnect_time
+
+
+class SubscribeStubInterface:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def getBackend(self):
+        return self._backend
+
+    def scriptToScripthash(self, script):
+        return "script_" + script.hex()
+
+    def getWatchedOutputScripthash(self, txid_hex, vout):
+        return f"out_{txid_hex}_{vout}"
+
+
+def make_watch_swap_client():
+    swap_client = BasicSwap.__new__(BasicSwap)
+    swap_client.fp = None
+    swap_client.log = StubLog()
+    swap_client.delay_event = threading.Event()
+    swap_client.thread_pool = ImmediateExecutor()
+    swap_client.check_watched_seconds = 60
+    swap_client.check_watched_electrum_seconds = 600
+    swap_client.coin_clients = {
+        Coins.BTC: {
+            "connection_type": "electrum",
+            "watched_outputs": [],
+            "watched_scripts": [],
+        }
+    }
+    swap_client._electrum_spend_check_futures = {}
+    swap_client._electrum_watch_lock = threading.Lock()
+    swap_client._electrum_watch_scripthashes = {}
+    swap_client._electrum_watch_pending = {}
+    swap_client._electrum_watch_swept = {}
+    swap_client._electrum_watch_sync_requested = set()
+    swap_client._electrum_watch_sync_futures = {}
+
+    backend = SubscribeStubBackend()
+    ci = SubscribeStubInterface(backend)
+    swap_client.ci = lambda coin_type: ci
+    swap_client.fetched = []
+
+    def fetch_spends(coin_type, watched_outputs, watched_scripts):
+        swap_client.fetched.append(
+            (
+                [(o.txid_hex, o.vout) for o in watched_outputs],
+                [s.script for s in watched_scripts],
+            )
+        )
+        return {"outputs": [], "scripts": [], "chain_blocks": 0}
+
+    swap_client._fetchSpendsElectrum = fetch_spends
+    return swap_client, backend
+
+
+class TestElectrumWatchSubscriptions(unittest.TestCase):
+    def test_notifications_trigger_targeted_checks(self):
+        swap_client, backend = make_watch_swap_client()
+        c = swap_client.coin_clients[Coins.BTC]
+        bid_id = bytes(28)
+        script = bytes.fromhex("0020" + "44" * 32)
+        swap_client.addWatchedOutput(Coins.BTC, bid_id, "aa" * 32, 0, 1)
+        swap_client.addWatchedScript(Coins.BTC, bid_id, script, 2)
+
+        # Subscribes and runs the first full check
+        swap_client.checkWatchedElectrum(Coins.BTC, c, 1000)
+        out_sh = f"out_{'aa' * 32}_0"
+        script_sh = "script_" + script.hex()
+        self.assertEqual(backend.subscribed, [out_sh, script_sh])
+        self.assertEqual(swap_client.fetched, [([("aa" * 32, 0)], [script])])
+
+        # Nothing changed
+        swap_client.checkWatchedElectrum(Coins.BTC, c, 1100)
+        self.assertEqual(len(swap_client.fetched), 1)
+
+        backend.watch_callback(Coins.BTC, out_sh)
+        swap_client.checkWatchedElectrum(Coins.BTC, c, 1100)
+        self.assertEqual(swap_client.fetched[-1], ([("aa" * 32, 0)], []))
+
+        backend.watch_callback(Coins.BTC, script_sh)
+        backend.watch_callback(Coins.BTC, "unrelated")
+        swap_client.checkWatchedElectrum(Coins.BTC, c, 1101)
+        self.assertEqual(swap_client.fetched[-1], ([], [script]))
+
+        # Safety sweep at the slow interval
+        swap_client.checkWatchedElectrum(Coins.BTC, c, 1599)
+        self.assertEqual(len(swap_client.fetched), 3)
+        swap_client.checkWatchedElectrum(Coins.BTC, c, 1600)
+        self.assertEqual(swap_client.fetched[-1], ([("aa" * 32, 0)], [script]))
+
+        # Full check after a reconnection
+        backend.last_reconnect_time = 1650.5
+        swap_client.checkWatchedElectrum(Coins.BTC, c, 1700)
+        self.assertEqual(len(swap_client.fetched), 5)
+        swap_client.checkWatchedElectrum(Coins.BTC, c, 1701)
+        self.assertEqual(len(swap_client.fetched), 5)
+
+        swap_client.removeWatchedScript(Coins.BTC, bid_id, script)
+        swap_client.checkWatchedElectrum(Coins.BTC, c, 1702)
+        self.assertEqual(backend.unsubscribed, [script_sh])
+        self.assertEqual(
+            list(swap_client._electrum_watch_scripthashes[Coins.BTC].values()),
+            [out_sh],
+        )
+
+
 class FakeDBCursor:
     def __init__(self):
         self.executed = []
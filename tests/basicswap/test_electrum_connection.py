@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 The Basicswap developers
+# Distributed under the MIT software license, see the accompanying
+# file LICENSE or http://www.opensource.org/licenses/mit-license.php.
+
+import json
+import socket
+import threading
+import unittest
+
+from basicswap.interface.electrumx import ElectrumConnection, LineFramer
+
+
+class StandInServer:
+    """Local socket stand-in for an Electrum server.
+
+    Each request line received is passed to handler, which returns the bytes
+    to send back.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.received = []
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.listen(1)
+        self.port = self._sock.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        conn, _ = self._sock.accept()
+        with conn, conn.makefile("rb") as fp:
+            for line in fp:
+                self.received.append(line)
+                conn.sendall(self.handler(json.loads(line)))
+
+    def close(self):
+        self._sock.close()
+
+
+def reply(request, result) -> dict:
+    return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+
+def make_history(num_entries: int) -> list:
+    return [
+        {"tx_hash": f"{i:064x}", "height": 800000 + i // 4, "fee": 141 + i % 7}
+        for i in range(num_entries)
+    ]
+
+
+class TestLineFramer(unittest.TestCase):
+    def test_split_lines(self):
+        framer = LineFramer()
+        framer.feed(b'{"id": 1}\n{"id"')
+        self.assertEqual(framer.read_line(), b'{"id": 1}')
+        self.assertIsNone(framer.read_line())
+        framer.feed(b": 2}")
+        self.assertIsNone(framer.read_line())
+        framer.feed(memoryview(b'\n{"id": 3}\n\n'))
+        self.assertEqual(framer.read_line(), b'{"id": 2}')
+        self.assertEqual(framer.read_line(), b'{"id": 3}')
+        self.assertEqual(framer.read_line(), b"")
+        self.assertIsNone(framer.read_line())
+
+        framer.feed(b"partial")
+        framer.clear()
+        framer.feed(b"next\n")
+        self.assertEqual(framer.read_line(), b"next")
+
+
+class TestElectrumConnection(unittest.TestCase):
+    def connect(self, server) -> ElectrumConnection:
+        conn = ElectrumConnection("127.0.0.1", server.port, use_ssl=False)
+        conn.connect()
+        self.addCleanup(conn.disconnect)
+        self.addCleanup(server.close)
+        return conn
+
+    def test_call_batch_single_array_write(self):
+        def handler(message):
+            # Answer out of order, results are matched by id
+            return (
+                json.dumps([reply(r, r["params"][0] * 2) for r in message[::-1]]) + "\n"
+            ).encode()
+
+        server = StandInServer(handler)
+        conn = self.connect(server)
+        results = conn.call_batch([("blockchain.test", [i]) for i in range(5)])
+        self.assertEqual(results, [0, 2, 4, 6, 8])
+        self.assertEqual(len(server.received), 1)
+        self.assertEqual(len(json.loads(server.received[0])), 5)
+
+    def test_call_batch_array_rejected(self):
+        def handler(message):
+            if isinstance(message, list):
+                error = {"code": -32600, "message": "invalid request"}
+                response = {"jsonrpc": "2.0", "id": None, "error": error}
+            else:
+                response = reply(message, message["params"][0] + 1)
+            return (json.dumps(response) + "\n").encode()
+
+        for use_listener in (False, True):
+            server = StandInServer(handler)
+            conn = self.connect(server)
+            if use_listener:
+                conn._start_listener()
+            for _ in range(2):
+                results = conn.call_batch([("blockchain.test", [i]) for i in range(3)])
+                self.assertEqual(results, [1, 2, 3])
+            self.assertFalse(conn._batch_arrays)
+            # One rejected array, then one line per request for both batches
+            self.assertEqual(len(server.received), 7)
+
+    def test_call_batch_null_id_error(self):
+        # An error with a null id that doesn't reject the batch is ignored
+        def handler(message):
+            error = {"code": -32000, "message": "server busy"}
+            response = [reply(r, r["params"][0] + 1) for r in message]
+            return (
+                json.dumps({"jsonrpc": "2.0", "id": None, "error": error})
+                + "\n"
+                + json.dumps(response)
+                + "\n"
+            ).encode()
+
+        for use_listener in (False, True):
+            server = StandInServer(handler)
+            conn = self.connect(server)
+            if use_listener:
+                conn._start_listener()
+            results = conn.call_batch([("blockchain.test", [i]) for i in range(3)])
+            self.assertEqual(results, [1, 2, 3])
+            self.assertTrue(conn._batch_arrays)
+            self.assertEqual(len(server.received), 1)
+            self.assertEqual(conn._pending_array_batches, [])
+
+    def test_large_history_response(self):
+        # A response spanning many reads, received back to back
+        history = make_history(30000)
+
+        def handler(message):
+            return (json.dumps(reply(message, history)) + "\n").encode()
+
+        server = StandInServer(handler)
+        conn = self.connect(server)
+        for _ in range(2):
+            request_id = conn._send_request(
+                "blockchain.scripthash.get_history", ["00" * 32]
+            )
+            self.assertEqual(conn._receive_response_sync(request_id), history)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -20,9 +20,11 @@ from basicswap.db import (
 from basicswap.offer_tracking import (
     OfferTrackingModes,
     complete_offer_fill,
+    get_offer_trackings,
     init_offer_tracking,
     offer_budget_allows,
     offer_in_flight_amount,
+    offers_in_flight_amounts,
     validate_offer_budget,
 )
 
@@ -255,6 +257,53 @@ class OfferTrackingIntegrationTest(unittest.TestCase):
         finally:
             db.closeDB(cursor)
 
+    def test_batched_tracking_matches_per_offer(self):
+        db, cursor = self._new_db()
+        try:
+            per_swap = 1_00000000
+            offer_ids = [bytes([0x20 + i]) * 28 for i in range(3)]
+            for i, oid in enumerate(offer_ids):
+                self._add_offer(db, cursor, oid)
+                if i < 2:
+                    init_offer_tracking(
+                        db, oid, OfferTrackingModes.STANDING, per_swap, cursor
+                    )
+            self._add_bid(
+                db, cursor, b"\xe1" * 28, offer_ids[0], per_swap, STATE_IN_PROGRESS
+            )
+            # Counted once though both UNION branches match
+            self._add_action(db, cursor, b"\xe1" * 28, ACTION_ACCEPT_BID)
+            self._add_bid(
+                db, cursor, b"\xe2" * 28, offer_ids[0], 2 * per_swap, STATE_RECEIVED
+            )
+            self._add_action(db, cursor, b"\xe2" * 28, ACTION_ACCEPT_AS_REV_BID)
+            self._add_bid(
+                db, cursor, b"\xe3" * 28, offer_ids[1], per_swap, STATE_COMPLETED
+            )
+            self._add_bid(
+                db, cursor, b"\xe4" * 28, offer_ids[2], per_swap, STATE_IN_PROGRESS
+            )
+
+            self.assertEqual(
+                set(get_offer_trackings(db, offer_ids, cursor).keys()),
+                set(offer_ids[:2]),
+            )
+            self.assertEqual(
+                set(get_offer_trackings(db, offer_ids[1:2], cursor).keys()),
+                {offer_ids[1]},
+            )
+            in_flight = offers_in_flight_amounts(
+                cursor, offer_ids, ACCEPT_ACTION_TYPES_ALL
+            )
+            for oid in offer_ids:
+                self.assertEqual(
+                    in_flight.get(oid, 0),
+                    offer_in_flight_amount(cursor, oid, ACCEPT_ACTION_TYPES_ALL),
+                )
+            self.assertEqual(in_flight[offer_ids[0]], 3 * per_swap)
+        finally:
+            db.closeDB(cursor)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -9,9 +9,12 @@ import logging
 import os
 import sqlite3
 import tempfile
+import threading
 import unittest
+from types import SimpleNamespace
 
 from basicswap.chainparams import Coins
+from basicswap.db import DBMethods, create_db_
 from basicswap.wallet_manager import WalletManager
 
 
@@ -20,6 +23,42 @@ class FakeSwapClient:
         self.sqlite_file = sqlite_file
 
 
+class FakeDBSwapClient(FakeSwapClient):
+    def __init__(self, sqlite_file: str):
+        super().__init__(sqlite_file)
+        self._conn = sqlite3.connect(sqlite_file)
+        self._conn.row_factory = sqlite3.Row
+
+    def openDB(self, cursor=None):
+        return self._conn.cursor()
+
+    def closeDB(self, cursor, commit=True):
+        cursor.close()
+
+    def commitDB(self):
+        self._conn.commit()
+
+    def rollbackDB(self):
+        self._conn.rollback()
+
+    def query(self, table_class, cursor, constraints={}):
+        cursor.execute(
+            f"SELECT * FROM {table_class.__tablename__} WHERE coin_type = ?",
+            (constraints["coin_type"],),
+        )
+        return [SimpleNamespace(**dict(row)) for row in cursor.fetchall()]
+
+
+class FakeBackend:
+    def __init__(self, balances):
+        self.balances = balances
+        self.requested = None
+
+    def getBalance(self, addresses):
+        self.requested = list(addresses)
+        return {addr: self.balances.get(addr, 0) for addr in addresses}
+
+
 def _make_db() -> str:
     fd, path = tempfile.mkstemp(suffix=".sqlite")
     os.close(fd)
@@ -31,13 +70,16 @@ def _make_db() -> str:
             is_internal INTEGER DEFAULT 0,
             is_funded INTEGER DEFAULT 0,
             cached_balance INTEGER DEFAULT 0,
-            derivation_index INTEGER DEFAULT 0
+            derivation_index INTEGER DEFAULT 0,
+            ever_used INTEGER DEFAULT 0,
+            cached_balance_time INTEGER
         )""")
     cursor.execute("""CREATE TABLE wallet_watch_only (
             coin_type INTEGER,
             address TEXT,
             is_funded INTEGER DEFAULT 0,
             cached_balance INTEGER DEFAULT 0,
+            cached_balance_time INTEGER,
             private_key_encrypted BLOB
         )""")
     conn.commit()
@@ -96,5 +138,215 @@ class TestWalletManagerBalance(unittest.TestCase):
         self.assertIn("swap_lock_addr", watched)
 
 
+class TestWalletManagerSyncBalances(unittest.TestCase):
+
+    def setUp(self):
+        self.db_path = _make_db()
+        coin = int(Coins.BTC)
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        for i, (addr, funded, balance) in enumerate(
+            (
+                ("addr_unchanged", 1, 5000),
+                ("addr_received", 0, 0),
+                ("addr_spent", 1, 7000),
+                ("addr_empty", 0, 0),
+            )
+        ):
+            cursor.execute(
+                "INSERT INTO wallet_addresses (coin_type, address, is_funded, cached_balance, derivation_index) VALUES (?, ?, ?, ?, ?)",
+                (coin, addr, funded, balance, i),
+            )
+        cursor.execute(
+            "INSERT INTO wallet_watch_only (coin_type, address, is_funded, cached_balance) VALUES (?, ?, 0, 0)",
+            (coin, "watch_received"),
+        )
+        # Another coin sharing an address string must not be touched
+        cursor.execute(
+            "INSERT INTO wallet_addresses (coin_type, address, is_funded, cached_balance, derivation_index) VALUES (?, ?, 0, 0, 0)",
+            (int(Coins.LTC), "addr_received"),
+        )
+        conn.commit()
+        conn.close()
+
+        self.swap_client = FakeDBSwapClient(self.db_path)
+        self.wm = WalletManager(self.swap_client, logging.getLogger())
+        self.wm._initialized.add(Coins.BTC)
+
+    def tearDown(self):
+        self.swap_client._conn.close()
+        os.remove(self.db_path)
+
+    def test_sync_balances_returns_changed_addresses(self):
+        backend = FakeBackend(
+            {"addr_unchanged": 5000, "addr_received": 2000, "watch_received": 300}
+        )
+        changed = self.wm.syncBalances(Coins.BTC, backend)
+        self.assertEqual(
+            set(changed), {"addr_received", "addr_spent", "watch_received"}
+        )
+        self.assertEqual(len(backend.requested), 5)
+
+        cursor = self.swap_client._conn.cursor()
+        cursor.execute(
+            "SELECT address, is_funded, cached_balance, ever_used, cached_balance_time FROM wallet_addresses WHERE coin_type = ?",
+            (int(Coins.BTC),),
+        )
+        rows = {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+        self.assertEqual(rows["addr_received"][:3], (1, 2000, 1))
+        self.assertIsNotNone(rows["addr_received"][3])
+        self.assertEqual(rows["addr_spent"][:3], (0, 0, 0))
+        self.assertEqual(rows["addr_unchanged"][:3], (1, 5000, 1))
+        # Unfunded and unchanged rows are left alone
+        self.assertEqual(rows["addr_empty"], (0, 0, 0, None))
+
+        cursor.execute(
+            "SELECT is_funded, cached_balance FROM wallet_watch_only WHERE address = ?",
+            ("watch_received",),
+        )
+        self.assertEqual(tuple(cursor.fetchone()), (1, 300))
+        cursor.execute(
+            "SELECT cached_balance FROM wallet_addresses WHERE coin_type = ?",
+            (int(Coins.LTC),),
+        )
+        self.assertEqual(cursor.fetchone()[0], 0)
+
+        self.assertEqual(self.wm.syncBalances(Coins.BTC, backend), [])
+
+        # Skipped and failed syncs are not reported as no changes
+        with self.wm._balance_sync_lock:
+            self.assertIsNone(self.wm.syncBalances(Coins.BTC, backend))
+        backend.balances = None
+        self.assertIsNone(self.wm.syncBalances(Coins.BTC, backend))
+
+    def test_sync_balances_funded_only(self):
+        backend = FakeBackend({"addr_unchanged": 4000})
+        changed = self.wm.syncBalances(Coins.BTC, backend, funded_only=True)
+        self.assertEqual(set(backend.requested), {"addr_unchanged", "addr_spent"})
+        self.assertEqual(set(changed), {"addr_unchanged", "addr_spent"})
+
+
+class FakeElectrumBackend:
+    def __init__(self, used, fail_after=None):
+        # used: {scripthash: balance}
+        self.used = used
+        self.fail_after = fail_after
+        self.history_requests = []
+
+    def getBatchHistory(self, scripthashes):
+        if (
+            self.fail_after is not None
+            and len(self.history_requests) >= self.fail_after
+        ):
+            raise ValueError("Connection lost")
+        self.history_requests.append(list(scripthashes))
+        return {
+            sh: [{"txid": "00" * 32, "height": 1}] if sh in self.used else []
+            for sh in scripthashes
+        }
+
+    def getBatchBalance(self, scripthashes):
+        return {sh: self.used[sh] for sh in scripthashes}
+
+
+class TestWalletManagerScan(unittest.TestCase):
+
+    def setUp(self):
+        class Stub(DBMethods):
+            chain = "regtest"
+
+        self.swap_client = Stub()
+        self.swap_client.sqlite_file = ":memory:"
+        self.swap_client.mxDB = threading.RLock()
+        cursor = self.swap_client.openDB()
+        try:
+            create_db_(self.swap_client._db_con, logging.getLogger())
+        finally:
+            self.swap_client.closeDB(cursor)
+
+        self.wm = WalletManager(self.swap_client, logging.getLogger())
+        self.wm.initialize(Coins.BTC, bytes(range(1, 33)))
+
+    def tearDown(self):
+        self.swap_client.closeDBConnections()
+
+    def scripthash(self, index: int, internal: bool = False) -> str:
+        return self.wm._deriveAddress(Coins.BTC, index, internal)[1]
+
+    def query(self, sql: str, params=()):
+        cursor = self.swap_client.openDB()
+        try:
+            return cursor.execute(sql, params).fetchall()
+        finally:
+            self.swap_client.closeDB(cursor, commit=False)
+
+    def test_derive_addresses_batch(self):
+        for internal in (False, True):
+            derived = self.wm._deriveAddresses(Coins.BTC, 18, 4, internal)
+            for i, addr_data in enumerate(derived):
+                self.assertEqual(
+                    addr_data, self.wm._deriveAddress(Coins.BTC, 18 + i, internal)
+                )
+
+    def test_scan_extends_gap_while_hits_continue(self):
+        backend = FakeElectrumBackend(
+            {
+                self.scripthash(3): 1000,
+                self.scripthash(12): 0,
+                self.scripthash(21): 500,
+                self.scripthash(0, True): 700,
+            }
+        )
+        found = self.wm.scanForFundedAddresses(Coins.BTC, backend, gap_limit=10)
+        self.assertEqual(found, 3)
+        # Four external windows up to index 40 then two internal windows
+        self.assertEqual([len(r) for r in backend.history_requests], [10] * 6)
+
+        rows = self.query(
+            "SELECT derivation_index, is_funded, ever_used, cached_balance FROM wallet_addresses WHERE is_internal = 0 AND ever_used = 1 ORDER BY derivation_index"
+        )
+        self.assertEqual(rows, [(3, 1, 1, 1000), (12, 0, 1, 0), (21, 1, 1, 500)])
+        self.assertEqual(
+            self.query("SELECT COUNT(*) FROM wallet_addresses WHERE is_internal = 0"),
+            [(40,)],
+        )
+        self.assertEqual(
+            self.query(
+                "SELECT last_external_index, scan_external_index, scan_internal_index FROM wallet_state"
+            ),
+            [(21, 22, 1)],
+        )
+
+    def test_scan_resumes_after_interruption(self):
+        used = {self.scripthash(3): 1000, self.scripthash(12): 2000}
+        backend = FakeElectrumBackend(used, fail_after=1)
+        self.assertEqual(
+            self.wm.scanForFundedAddresses(Coins.BTC, backend, gap_limit=10), 1
+        )
+        self.assertEqual(
+            self.query("SELECT scan_external_index FROM wallet_state"), [(10,)]
+        )
+
+        backend = FakeElectrumBackend(used)
+        self.assertEqual(
+            self.wm.scanForFundedAddresses(Coins.BTC, backend, gap_limit=10), 1
+        )
+        self.assertEqual(backend.history_requests[0][0], self.scripthash(10))
+        self.assertEqual(
+            self.query("SELECT scan_external_index FROM wallet_state"), [(13,)]
+        )
+
+        # A completed scan continues after the last used address
+        used[self.scripthash(20)] = 3000
+        backend = FakeElectrumBackend(used)
+        self.assertEqual(
+            self.wm.scanForFundedAddresses(Coins.BTC, backend, gap_limit=10), 1
+        )
+        self.assertEqual(backend.history_requests[0][0], self.scripthash(13))
+        self.assertEqual(
+            self.query("SELECT scan_external_index FROM wallet_state"), [(21,)]
+        )
+
+
 if __name__ == "__main__":
     unittest.main()